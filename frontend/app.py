@@ -14,6 +14,8 @@ st.set_page_config(page_title="Nexus Health", page_icon="🏥", layout="centered
 BACKEND_URL = st.secrets.get(
     "API_URL", os.getenv("API_URL", "http://localhost:8000/api/v1/agent/chat")
 )
+# Los thread_id los emite el backend (firmados): /agent/chat -> /agent/threads
+THREADS_URL = BACKEND_URL.removesuffix("/chat") + "/threads"
 MODEL_NAME = st.secrets.get(
     "LLM_MODEL_NAME", os.getenv("LLM_MODEL_NAME", "llama-3.1-8b-instant")
 )
@@ -28,6 +30,23 @@ st.markdown("---")
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
 
+
+def new_thread_id() -> str | None:
+    # Sin hilo el chat sigue funcionando, solo que sin memoria entre turnos
+    try:
+        response = requests.post(THREADS_URL, timeout=10)
+        response.raise_for_status()
+        return response.json()["thread_id"]
+    except Exception:
+        return None
+
+
+# Un hilo de conversacion por sesion del navegador (memoria en el backend).
+# Con checkpointer activo, las peticiones con thread_id no usan el cache
+# semantico: las respuestas dependen del historial del hilo
+if not st.session_state.get("thread_id"):
+    st.session_state["thread_id"] = new_thread_id()
+
 MessageType = dict[str, str]
 messages: list[MessageType] = cast(list[MessageType], st.session_state["messages"])
 
@@ -55,9 +74,10 @@ if prompt := st.chat_input("Escribe tu consulta clinica..."):
                 # Payload
                 payload = {  # type: ignore
                     "message": prompt,
-                    "thread_id": "demo_session",
                     "model": MODEL_NAME,
                 }
+                if st.session_state["thread_id"]:
+                    payload["thread_id"] = st.session_state["thread_id"]
 
                 response = requests.post(BACKEND_URL, json=payload)  # type: ignore
 
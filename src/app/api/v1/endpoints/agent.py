@@ -1,13 +1,27 @@
+import json
 import logging
+import time
+from collections.abc import AsyncIterator
 from typing import Any, TypedDict, cast
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 
 from app.core.config import settings
 from app.core.limiter import limiter
-from app.graph.workflow import graph
-from app.schemas.chat import ChatRequest, ChatResponse, ChatSafetyMeta
+from app.core.observability import (
+    AGENT_STREAM_FIRST_TOKEN_SECONDS,
+    AGENT_STREAM_RETRACTIONS_TOTAL,
+    increment_counter,
+    observe_histogram,
+)
+from app.core.thread_ids import issue_thread_id, verify_thread_id
+from app.graph.budget import RequestBudget, budget_config
+from app.graph.workflow import get_threaded_graph, graph
+from app.schemas.chat import ChatRequest, ChatResponse, ChatSafetyMeta, ThreadResponse
+from app.services.semantic_cache import SemanticCacheLookup, agent_answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +31,7 @@ router = APIRouter()
 class GraphResult(TypedDict, total=False):
     messages: list[Any]
     safety_meta: dict[str, object]
+    used_patient_data: bool
 
 
 def _safe_content(content: Any) -> str:
@@ -25,39 +40,122 @@ def _safe_content(content: Any) -> str:
     return str(content)
 
 
+def _is_cacheable(result: GraphResult) -> bool:
+    # Nunca se cachean respuestas con datos de pacientes ni escalamientos
+    if result.get("used_patient_data"):
+        return False
+    safety_meta = result.get("safety_meta") or {}
+    return not safety_meta.get("escalated")
+
+
+def _thread_key(thread_id: str | None) -> str | None:
+    # Solo se aceptan thread_id emitidos por POST /threads (firmados)
+    if thread_id is None:
+        return None
+    thread_key = verify_thread_id(thread_id)
+    if thread_key is None:
+        raise HTTPException(
+            status_code=403, detail="thread_id invalido: solicitar uno en /threads"
+        )
+    return thread_key
+
+
+def _select_graph(thread_key: str | None) -> tuple[Any, RunnableConfig | None]:
+    """
+    Con hilo (y checkpointer disponible) se usa el grafo con memoria: el
+    turno ve los reportes previos de los workers en lugar de recalcularlos.
+    Sin hilo cada peticion es independiente, como antes.
+    """
+    if thread_key:
+        threaded_graph = get_threaded_graph()
+        if threaded_graph is not None:
+            return threaded_graph, {"configurable": {"thread_id": thread_key}}
+        logger.warning("thread_id ignorado: checkpointer no disponible")
+    return graph, None
+
+
+def _turn_inputs(message: str) -> dict[str, Any]:
+    # En un hilo el estado guardado trae las claves del turno anterior: las
+    # propias de cada turno (sin reducer) se reinician al empezar
+    return {
+        "messages": [HumanMessage(content=message)],
+        "next": None,
+        "workers": [],
+        "pre_routed": False,
+        "used_patient_data": False,
+    }
+
+
+def _build_response(result: GraphResult) -> ChatResponse:
+    # Extraemos el ultimo mensaje (La respuesta final del asistente)
+    messages = result.get("messages", [])
+    if not messages:
+        logger.error("El grafo devolvio una lista de mensajes vacia.")
+        raise ValueError("No response from agent")
+
+    response_text = _safe_content(messages[-1].content)
+    logger.info(f"Respuesta generada: {response_text[:50]}....")
+
+    response = ChatResponse(response=response_text)
+    if settings.SAFETY_GATE_ENABLED and settings.SAFETY_GATE_EXPOSE_METADATA:
+        safety_meta = result.get("safety_meta")
+        if isinstance(safety_meta, dict):
+            response.safety = ChatSafetyMeta.model_validate(safety_meta)
+    return response
+
+
+@router.post("/threads", response_model=ThreadResponse)
+async def create_thread() -> ThreadResponse:
+    """
+    Emite un thread_id firmado para conversar con memoria en /chat y
+    /chat/stream. Un id que no salio de aqui se rechaza (403).
+    """
+    return ThreadResponse(thread_id=issue_thread_id())
+
+
 @router.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 @limiter.limit("7/hour; 10/day")  # type: ignore
 async def chat_with_agente(request: Request, body: ChatRequest):
     """
     Endpoint para conversar con el Workflow principal.
     """
+    thread_key = _thread_key(body.thread_id)
     try:
         logger.info(f" Recibido mensaje: '{body.message}'")
 
+        agent_graph, thread_config = _select_graph(thread_key)
+        # En un hilo la respuesta depende del historial: no se usa el cache
+        use_cache = settings.SEMANTIC_CACHE_ENABLED and thread_config is None
+
+        # Cache semantico: preguntas casi identicas reutilizan la respuesta
+        cache_lookup = SemanticCacheLookup()
+        if use_cache:
+            cache_lookup = await agent_answer_cache.lookup(body.message)
+            if cache_lookup.hit:
+                return ChatResponse.model_validate(cache_lookup.value)
+
+        started_at = time.perf_counter()
+
         # Preparamos el input para el grafo
-        # LangGraph espera un estado inicial.
-        inputs = {"messages": [HumanMessage(content=body.message)]}
+        # LangGraph espera un estado inicial (con hilo se suma al ya guardado).
+        inputs = _turn_inputs(body.message)
+
+        # Presupuesto de la peticion (tiempo, llamadas al LLM, tokens): viaja en
+        # la config del grafo y los nodos degradan al agotarse
+        config = budget_config(RequestBudget.from_settings(), thread_config)
 
         # Ejecucion asincrona
-        raw_result = await graph.ainvoke(inputs)  # type: ignore
+        raw_result = await agent_graph.ainvoke(inputs, config=config)  # type: ignore
         result = cast(GraphResult, raw_result)
 
-        # 2. Extraemos el ultimo mensaje (La respuesta final del asistente)
-        messages = result.get("messages", [])
-        if not messages:
-            logger.error("El grafo devolvio una lista de mensajes vacia.")
-            raise ValueError("No response from agent")
-
-        last_message = messages[-1]
+        response = _build_response(result)
 
-        response_text = _safe_content(last_message.content)
-        logger.info(f"Respuesta generada: {response_text[:50]}....")
-
-        response = ChatResponse(response=response_text)
-        if settings.SAFETY_GATE_ENABLED and settings.SAFETY_GATE_EXPOSE_METADATA:
-            safety_meta = result.get("safety_meta")
-            if isinstance(safety_meta, dict):
-                response.safety = ChatSafetyMeta.model_validate(safety_meta)
+        if use_cache and _is_cacheable(result):
+            agent_answer_cache.store(
+                cache_lookup,
+                response.model_dump(),
+                latency_seconds=time.perf_counter() - started_at,
+            )
 
         return response
 
@@ -66,3 +164,143 @@ async def chat_with_agente(request: Request, body: ChatRequest):
         raise HTTPException(  # noqa: B904
             status_code=500, detail="Error interno procesando la solicitud"
         )
+
+
+# --- Streaming (Server-Sent Events) ---
+
+# Nodos del grafo principal que se reportan como progreso
+_PROGRESS_NODES = {
+    "pre_router",
+    "supervisor",
+    "DOCS_AGENT",
+    "DATA_AGENT",
+    "specialist",
+    "safety_gate",
+}
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _node_of(event: dict[str, Any]) -> str | None:
+    # Solo eventos del propio nodo (no de sus sub-cadenas ni del sub-grafo ReAct)
+    node = event.get("metadata", {}).get("langgraph_node")
+    if node in _PROGRESS_NODES and event.get("name") == node:
+        return node
+    return None
+
+
+async def _stream_agent_events(
+    message: str, thread_key: str | None = None
+) -> AsyncIterator[str]:
+    """
+    Traduce graph.astream_events (v2) a eventos SSE:
+    - start: inmediato (el cliente recibe bytes antes de cualquier LLM)
+    - route: decision del supervisor o del pre-router
+    - node_start / node_end: progreso de workers
+    - token: fragmentos del borrador del especialista
+    - replace: el safety gate reemplazo el borrador (el cliente debe descartarlo)
+    - done: respuesta final (la misma que devolveria /chat); error si algo falla
+    """
+    yield _sse("start", {})
+    started_at = time.perf_counter()
+
+    try:
+        agent_graph, thread_config = _select_graph(thread_key)
+        use_cache = settings.SEMANTIC_CACHE_ENABLED and thread_config is None
+
+        cache_lookup = SemanticCacheLookup()
+        if use_cache:
+            cache_lookup = await agent_answer_cache.lookup(message)
+            if cache_lookup.hit:
+                cached = ChatResponse.model_validate(cache_lookup.value)
+                yield _sse("done", cached.model_dump(mode="json", exclude_none=True))
+                return
+
+        inputs = _turn_inputs(message)
+        config = budget_config(RequestBudget.from_settings(), thread_config)
+        first_token = True
+        result: GraphResult | None = None
+
+        async for event in agent_graph.astream_events(  # type: ignore
+            inputs, config=config, version="v2"
+        ):
+            kind = event["event"]
+            data = event.get("data", {})
+
+            if kind == "on_chat_model_stream":
+                if event.get("metadata", {}).get("langgraph_node") != "specialist":
+                    continue
+                text = _safe_content(data["chunk"].content)
+                if not text:
+                    continue
+                if first_token:
+                    first_token = False
+                    observe_histogram(
+                        AGENT_STREAM_FIRST_TOKEN_SECONDS,
+                        time.perf_counter() - started_at,
+                    )
+                yield _sse("token", {"text": text})
+                continue
+
+            if kind == "on_chain_end" and not event.get("parent_ids"):
+                # Fin del grafo raiz: estado final completo
+                result = cast(GraphResult, data.get("output") or {})
+                continue
+
+            node = _node_of(event)
+            if node is None:
+                continue
+
+            if kind == "on_chain_start":
+                yield _sse("node_start", {"node": node})
+            elif kind == "on_chain_end":
+                output = cast(dict[str, Any], data.get("output") or {})
+                if node == "supervisor" or output.get("pre_routed"):
+                    route: dict[str, Any] = {"next": output.get("next") or "FINISH"}
+                    if "workers" in output:
+                        route["workers"] = output["workers"]
+                    yield _sse("route", route)
+                elif node == "safety_gate" and output.get("messages"):
+                    increment_counter(AGENT_STREAM_RETRACTIONS_TOTAL)
+                    yield _sse(
+                        "replace",
+                        {"text": _safe_content(output["messages"][-1].content)},
+                    )
+                yield _sse("node_end", {"node": node})
+
+        if result is None:
+            raise ValueError("El grafo termino sin estado final")
+
+        response = _build_response(result)
+        if use_cache and _is_cacheable(result):
+            agent_answer_cache.store(
+                cache_lookup,
+                response.model_dump(),
+                latency_seconds=time.perf_counter() - started_at,
+            )
+        yield _sse("done", response.model_dump(mode="json", exclude_none=True))
+
+    except Exception as e:
+        logger.error(f"Error critico en endpoint /chat/stream: {e}", exc_info=True)
+        yield _sse("error", {"detail": "Error interno procesando la solicitud"})
+
+
+@router.post("/chat/stream")
+@limiter.limit("7/hour; 10/day")  # type: ignore
+async def chat_with_agente_stream(
+    request: Request, body: ChatRequest
+) -> StreamingResponse:
+    """
+    Igual que /chat pero por Server-Sent Events: progreso de los nodos y los
+    tokens del especialista a medida que se generan.
+    """
+    thread_key = _thread_key(body.thread_id)
+    logger.info(f" Recibido mensaje (stream): '{body.message}'")
+    return StreamingResponse(
+        _stream_agent_events(body.message, thread_key),
+        media_type="text/event-stream",
+        # Sin buffer en proxies (nginx) para que cada evento salga al momento
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,18 +1,28 @@
 import logging
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.config import settings
 from app.core.session import get_db
 from app.models.knowledge import KnowledgeBase
 from app.schemas.knowledge import (
     DocumentResponse,
+    IngestionJobAccepted,
+    IngestionJobRead,
     KnowledgeCreate,
+    KnowledgePage,
     KnowledgeRead,
-    PDFResponse,
+)
+from app.services.ingestion_jobs import (
+    IngestionQueueFullError,
+    ingestion_job_manager,
 )
 from app.services.knowledge_service import knowledge_service
+from app.services.pdf_parser import discard_pdf_source
 
 logger = logging.getLogger(__name__)
 
@@ -40,33 +50,89 @@ async def create_knowledge(
         raise HTTPException(status_code=500, detail="Error guardando el documento")  # noqa: B904
 
 
-# 2. GET
-@router.get("/", response_model=list[KnowledgeRead])
+# 2. GET (paginado por keyset; stream=true devuelve todo en NDJSON)
+@router.get("/", response_model=KnowledgePage)
 async def read_knowledge(
     session: SessionDep,
-) -> list[KnowledgeBase]:  # 👈 AQUI: Devolvemos una lista de objetos de BD
+    limit: Annotated[
+        int, Query(ge=1, le=settings.KNOWLEDGE_PAGE_SIZE_MAX)
+    ] = settings.KNOWLEDGE_PAGE_SIZE_DEFAULT,
+    after_id: Annotated[int | None, Query(ge=0)] = None,
+    source: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    stream: bool = False,
+) -> KnowledgePage | StreamingResponse:
     """
-    Obtiene todos los documentos de la base de conocimiento.
+    Lista los documentos de la base de conocimiento (sin embeddings).
+    - Paginas de 'limit' documentos ordenados por id; para la siguiente,
+      mandar next_cursor como 'after_id'.
+    - Filtros opcionales: source y rango [created_from, created_to).
+    - stream=true: todos los documentos (desde after_id) como NDJSON.
     """
-    return await knowledge_service.get_all_documents(session)
-
-
-# 3. Post para subir PDF
-@router.post("/upload-pdf", response_model=PDFResponse)
-async def upload_pdf(session: SessionDep, file: UploadFile = File(...)) -> PDFResponse:
+    if stream:
+        return StreamingResponse(
+            knowledge_service.stream_documents(
+                after_id=after_id,
+                source=source,
+                created_from=created_from,
+                created_to=created_to,
+            ),
+            media_type="application/x-ndjson",
+        )
+    return await knowledge_service.list_documents(
+        session,
+        limit=limit,
+        after_id=after_id,
+        source=source,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+# 3. Post para subir PDF (la ingesta corre en segundo plano)
+@router.post(
+    "/upload-pdf",
+    response_model=IngestionJobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_pdf(file: UploadFile = File(...)) -> IngestionJobAccepted:
     """
-    Sube un PDF, lo divide en fragmentos y lo guarda en la base vetorial
+    Sube un PDF y encola su ingesta. Devuelve el id del trabajo para
+    consultar el progreso en /knowledge/jobs/{job_id}
     """
     # Validacion rapida
     if not file.filename.lower().endswith(".pdf"):  # type: ignore
         raise HTTPException(status_code=400, detail="Solo se aceptan archivos PDF")
 
+    logger.info(f" Recibiendo PDF: {file.filename}")
     try:
-        logger.info(f" Recibiendo PDF: {file.filename}")
-        return await knowledge_service.proccess_pdf(session, file)
+        source = await knowledge_service.stage_upload(file)
     except Exception as e:
-        logger.error(f" Error procesando PDF {file.filename}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Error interno procesando el PDF")  # noqa: B904
+        logger.error(f" Error guardando PDF {file.filename}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno guardando el PDF")  # noqa: B904
+
+    try:
+        job = ingestion_job_manager.submit(source, file.filename or "unknown")
+    except IngestionQueueFullError as e:
+        discard_pdf_source(source)
+        raise HTTPException(status_code=503, detail=str(e))  # noqa: B904
+
+    return IngestionJobAccepted(
+        job_id=job.job_id, filename=job.filename, status=job.status
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobRead)
+async def read_ingestion_job(job_id: str) -> IngestionJobRead:
+    """
+    Progreso de un trabajo de ingesta: paginas leidas, chunks vectorizados
+    y chunks guardados.
+    """
+    job = ingestion_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job.to_read()
 
 
 # 4. Post para obtener los vectores mas parecidos a lo enviado
@@ -1,10 +1,14 @@
+import time
+
 from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.config import settings
 from app.core.limiter import limiter
 from app.core.session import get_db
 from app.services.naive_service import naiveRAGService
+from app.services.semantic_cache import naive_answer_cache
 
 router = APIRouter()
 
@@ -26,5 +30,16 @@ async def chat_naive(
     """
     Endpoint para chatear con el modo Naive RAG(baseline)
     """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return await naiveRAGService.answer_question(session, body.query)
+
+    cache_lookup = await naive_answer_cache.lookup(body.query)
+    if cache_lookup.hit:
+        return cache_lookup.value
+
+    started_at = time.perf_counter()
     response = await naiveRAGService.answer_question(session, body.query)
+    naive_answer_cache.store(
+        cache_lookup, response, latency_seconds=time.perf_counter() - started_at
+    )
     return response
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tablas creadas por AsyncPostgresSaver.setup(). Los checkpoint_id son uuid6
+# (ordenados por tiempo) y 'ts' va dentro del JSONB del checkpoint.
+
+# 1. Hilos inactivos mas alla del TTL: se borran completos
+PRUNE_EXPIRED_THREADS_SQL = """
+WITH expired AS (
+    SELECT thread_id
+    FROM checkpoints
+    GROUP BY thread_id
+    HAVING max((checkpoint->>'ts')::timestamptz) < now() - make_interval(hours => %(ttl_hours)s)
+),
+del_writes AS (
+    DELETE FROM checkpoint_writes WHERE thread_id IN (SELECT thread_id FROM expired)
+),
+del_blobs AS (
+    DELETE FROM checkpoint_blobs WHERE thread_id IN (SELECT thread_id FROM expired)
+)
+DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM expired)
+"""  # noqa: E501
+
+# 2. Hilos activos: solo se conservan los ultimos N checkpoints (uno por paso)
+PRUNE_OLD_CHECKPOINTS_SQL = """
+WITH ranked AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (
+               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+           ) AS position
+    FROM checkpoints
+),
+stale AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id
+    FROM ranked
+    WHERE position > %(keep_last)s
+),
+del_writes AS (
+    DELETE FROM checkpoint_writes w
+    USING stale s
+    WHERE w.thread_id = s.thread_id
+      AND w.checkpoint_ns = s.checkpoint_ns
+      AND w.checkpoint_id = s.checkpoint_id
+)
+DELETE FROM checkpoints c
+USING stale s
+WHERE c.thread_id = s.thread_id
+  AND c.checkpoint_ns = s.checkpoint_ns
+  AND c.checkpoint_id = s.checkpoint_id
+"""
+
+# 3. Versiones de canales que ya no referencia ningun checkpoint restante
+PRUNE_ORPHAN_BLOBS_SQL = """
+DELETE FROM checkpoint_blobs b
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM checkpoints c
+    WHERE c.thread_id = b.thread_id
+      AND c.checkpoint_ns = b.checkpoint_ns
+      AND c.checkpoint->'channel_versions'->>b.channel = b.version
+)
+"""
+
+
+def checkpoint_conninfo() -> str:
+    # psycopg no entiende el dialecto de SQLAlchemy ('postgresql+asyncpg')
+    return str(settings.SQLALCHEMY_DATABASE_URI).replace(
+        "postgresql+asyncpg://", "postgresql://", 1
+    )
+
+
+class ConversationCheckpointer:
+    """
+    Checkpointer de LangGraph en Postgres para hilos de conversacion.
+    - Un unico pool psycopg por proceso, abierto en el lifespan de la app.
+    - Si Postgres (o el paquete) no esta disponible, saver queda en None y el
+      agente responde sin memoria en lugar de fallar.
+    - Una tarea periodica poda hilos expirados y checkpoints antiguos.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        min_pool_size: int,
+        max_pool_size: int,
+        keep_last: int,
+        ttl_hours: int,
+        prune_interval_seconds: float,
+    ) -> None:
+        self.enabled = enabled
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.keep_last = keep_last
+        self.ttl_hours = ttl_hours
+        self.prune_interval_seconds = prune_interval_seconds
+        self.saver: Any | None = None
+        self._pool: Any | None = None
+        self._prune_task: asyncio.Task[None] | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.saver is not None
+
+    async def open(self) -> None:
+        if not self.enabled or self.saver is not None:
+            return
+
+        # Importacion diferida: psycopg solo hace falta con hilos persistentes
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver  # type: ignore
+        from psycopg.rows import dict_row  # type: ignore
+        from psycopg_pool import AsyncConnectionPool  # type: ignore
+
+        pool = AsyncConnectionPool(
+            conninfo=checkpoint_conninfo(),
+            min_size=self.min_pool_size,
+            max_size=self.max_pool_size,
+            open=False,
+            # Requisitos de AsyncPostgresSaver (autocommit y filas como dict)
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
+            },
+        )
+        await pool.open()
+        try:
+            saver = AsyncPostgresSaver(pool)  # type: ignore
+            await saver.setup()
+        except Exception:
+            await pool.close()
+            raise
+
+        self._pool = pool
+        self.saver = saver
+        self._prune_task = asyncio.create_task(
+            self._prune_loop(), name="checkpoint-pruner"
+        )
+        logger.info("Checkpointer de conversaciones listo (Postgres)")
+
+    async def close(self) -> None:
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            await asyncio.gather(self._prune_task, return_exceptions=True)
+            self._prune_task = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self.saver = None
+
+    async def prune(self) -> dict[str, int]:
+        """Borra hilos expirados, checkpoints antiguos y blobs sin referencia."""
+        if self._pool is None:
+            return {}
+
+        steps: list[tuple[str, str, dict[str, int] | None]] = [
+            (
+                "expired_threads",
+                PRUNE_EXPIRED_THREADS_SQL,
+                {"ttl_hours": self.ttl_hours},
+            ),
+            (
+                "old_checkpoints",
+                PRUNE_OLD_CHECKPOINTS_SQL,
+                {"keep_last": self.keep_last},
+            ),
+            ("orphan_blobs", PRUNE_ORPHAN_BLOBS_SQL, None),
+        ]
+        deleted: dict[str, int] = {}
+        async with self._pool.connection() as conn:
+            for name, statement, params in steps:
+                cursor = await conn.execute(statement, params)
+                deleted[name] = cursor.rowcount
+        logger.info(f"Poda de checkpoints: {deleted}")
+        return deleted
+
+    async def _prune_loop(self) -> None:
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.warning(f"Fallo la poda de checkpoints: {e}")
+            await asyncio.sleep(self.prune_interval_seconds)
+
+
+conversation_checkpointer = ConversationCheckpointer(
+    enabled=settings.GRAPH_CHECKPOINTER_ENABLED,
+    min_pool_size=settings.GRAPH_CHECKPOINT_POOL_MIN_SIZE,
+    max_pool_size=settings.GRAPH_CHECKPOINT_POOL_MAX_SIZE,
+    keep_last=settings.GRAPH_CHECKPOINT_KEEP_LAST,
+    ttl_hours=settings.GRAPH_CHECKPOINT_TTL_HOURS,
+    prune_interval_seconds=settings.GRAPH_CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+)
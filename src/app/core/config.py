@@ -23,12 +23,119 @@ class Settings(BaseSettings):
     LLM_HOST: str
     VLLM_API_KEY: str
     LLM_MODEL_NAME: str
+    EMBEDDING_MODEL_ID: str = "intfloat/multilingual-e5-large"
+
+    # Cache de embeddings (LRU en memoria + SQLite persistente)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ITEMS: int = 20_000
+    # Vacio = solo cache en memoria. Para persistir entre reinicios, apuntar a un
+    # volumen propio (ej. /var/lib/nexus/embeddings.sqlite3), no a /tmp
+    EMBEDDING_CACHE_PATH: str = ""
+
+    # Motor de embeddings: lotes dinamicos con los textos de todas las peticiones
+    # El lote se cierra al llegar al tamaño maximo o al vencer la espera maxima
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    # Procesos dedicados al modelo local, cada uno con su copia del modelo en
+    # memoria (0 = hilos del proceso de la API)
+    EMBEDDING_WORKERS: int = 1
+    # Backend del modelo local: 'torch' (sentence-transformers) u 'onnx'
+    # Antes de activar 'onnx' correr: python -m app.services.onnx_embeddings parity
+    EMBEDDING_BACKEND: Literal["torch", "onnx"] = "torch"
+    # Cuantizacion dinamica int8 del modelo ONNX
+    EMBEDDING_ONNX_QUANTIZE: bool = True
+    EMBEDDING_ONNX_DIR: str = "/tmp/nexus_cache/onnx"
+    # Hilos intra-op por worker (0 = nucleos / EMBEDDING_WORKERS)
+    EMBEDDING_ONNX_INTRA_OP_THREADS: int = 0
+
+    # Cache semantico de respuestas (/agent/chat y /naive)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    # Similitud coseno minima entre preguntas para reutilizar la respuesta
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MAX_ITEMS: int = 1000
 
     # RAG Settings
     RAG_CHUNK_SIZE: int = 1200
     RAG_CHUNK_OVERLAP: int = 300
     RAG_RERANKER_MODEL: str = "ms-marco-MiniLM-L-12-v2"
+    # Ruta absoluta: antes era 'opt' relativo al directorio de arranque
+    RAG_RERANKER_CACHE_DIR: str = "/tmp/nexus_cache/flashrank"
+    # Expansion de la pregunta en variantes (multi-query) con el LLM
+    # budget: las queries cortas de palabras clave (sin contexto) no se expanden
+    RAG_QUERY_EXPANSION_MODE: Literal["always", "budget", "off"] = "always"
+    RAG_QUERY_EXPANSION_MAX_KEYWORDS: int = 3
+    RAG_QUERY_EXPANSION_CACHE_TTL_SECONDS: int = 900
+    RAG_QUERY_EXPANSION_CACHE_MAX_ITEMS: int = 2000
+    # Micro-batching del reranker: peticiones que llegan dentro de la ventana
+    # se puntuan en un mismo paso por el pool de hilos
+    RAG_RERANK_BATCH_WINDOW_MS: float = 5.0
+    RAG_RERANK_MAX_BATCH_REQUESTS: int = 16
+    # Pares (query, pasaje) por lote (acota memoria y latencia del lote)
+    RAG_RERANK_MAX_BATCH_PAIRS: int = 256
+    # Lotes en paralelo (hilos del pool)
+    RAG_RERANK_WORKERS: int = 1
+
+    # Recuperacion: solo vectores o hibrida (full-text + ANN fusionados con RRF)
+    RAG_RETRIEVAL_MODE: Literal["vector", "hybrid"] = "hybrid"
+    # Configuracion de texto de Postgres para la columna tsvector
+    RAG_TEXT_SEARCH_CONFIG: str = "spanish"
+    # Constante k de Reciprocal Rank Fusion (60 es el valor clasico)
+    RAG_RRF_K: int = 60
+    # En modo hibrido se rerankean solo los k * factor mejores fusionados
+    RAG_HYBRID_RERANK_FACTOR: int = 3
+
+    # Indice ANN sobre KnowledgeBase.embedding
+    RAG_VECTOR_INDEX: Literal["none", "hnsw", "ivfflat"] = "hnsw"
+    RAG_HNSW_M: int = 16
+    RAG_HNSW_EF_CONSTRUCTION: int = 64
+    RAG_HNSW_EF_SEARCH: int = 80
+    RAG_IVFFLAT_LISTS: int = 100
+    RAG_IVFFLAT_PROBES: int = 10
+    # IVFFlat entrena sus centroides con las filas existentes: con menos filas
+    # no se construye (escaneo secuencial) hasta un arranque posterior
+    RAG_IVFFLAT_MIN_ROWS: int = 10_000
+    # Ej: "512MB". Vacio = valor por defecto del servidor
+    RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM: str = ""
+    # Nivel comprimido: indice HNSW sobre halfvec (2 bytes/dim) o bits (1 bit/dim)
+    # como primera etapa, re-puntuando con el vector completo (float32).
+    # Con compresion activa se puede usar RAG_VECTOR_INDEX="none" para ahorrar
+    # el indice de precision completa.
+    RAG_VECTOR_COMPRESSION: Literal["none", "halfvec", "binary"] = "none"
+    # Candidatos de la primera etapa = limite * factor
+    RAG_VECTOR_RESCORE_FACTOR: int = 10
+
+    # Motor de busqueda vectorial: pgvector (Postgres) o numpy (en proceso,
+    # matriz memory-mapped que se refresca cuando cambia el corpus)
+    RAG_VECTOR_STORE: Literal["pgvector", "numpy"] = "pgvector"
+    RAG_NUMPY_STORE_DTYPE: Literal["float32", "float16"] = "float32"
+    # Directorio de la matriz memory-mapped. Vacio (por defecto) = solo en RAM
+    RAG_NUMPY_STORE_DIR: str = ""
+    # Cada cuanto se compara con Postgres lo cargado (escrituras de otros workers,
+    # borrados y updates)
+    RAG_NUMPY_STORE_SYNC_SECONDS: float = 5.0
     RAG_TEMP_DIR: str = "/tmp/nexus_uploads"
+    # PDFs hasta este tamaño se procesan en memoria; los mayores via mmap en disco.
+    # Igual al spool de Starlette (1 MB): por encima el upload ya esta en disco
+    RAG_PDF_IN_MEMORY_MAX_BYTES: int = 1024 * 1024
+    # Cuantos textos se mandan por llamada al modelo de embeddings
+    RAG_EMBED_BATCH_SIZE: int = 32
+    # Lotes en vuelo entre etapas del pipeline de ingesta (memoria acotada)
+    RAG_PIPELINE_QUEUE_SIZE: int = 4
+    # Pool de procesos para parsear/trocear PDFs fuera del event loop
+    RAG_PARSER_WORKERS: int = 2
+    RAG_PARSER_PAGES_PER_TASK: int = 20
+
+    # Trabajos de ingesta en segundo plano
+    INGESTION_MAX_CONCURRENT_JOBS: int = 2
+    INGESTION_MAX_QUEUED_JOBS: int = 20
+    INGESTION_JOB_HISTORY: int = 200
+
+    # Listado de conocimiento (GET /knowledge): paginas por keyset sobre el id
+    KNOWLEDGE_PAGE_SIZE_DEFAULT: int = 100
+    KNOWLEDGE_PAGE_SIZE_MAX: int = 500
+    # Filas por lectura del cursor del lado del servidor (modo NDJSON)
+    KNOWLEDGE_STREAM_BATCH_SIZE: int = 500
 
     # computed_field calcula la URL automaticamente basandonos en los campos anteriores
     @computed_field
@@ -57,6 +164,46 @@ class Settings(BaseSettings):
     SAFETY_GATE_MAX_REASON_CODES: int = 5
     SAFETY_GATE_EXPOSE_METADATA: bool = False
 
+    # Grafo: el supervisor puede despachar DOCS_AGENT y DATA_AGENT en paralelo
+    # (fan-out con Send) en lugar de uno por turno
+    GRAPH_PARALLEL_DISPATCH: bool = False
+    # Pre-router: reglas + clasificador por embeddings antes del supervisor LLM;
+    # solo si no alcanza la confianza minima se llama al LLM
+    GRAPH_PRE_ROUTER_ENABLED: bool = True
+    GRAPH_PRE_ROUTER_MIN_CONFIDENCE: float = 0.85
+    # El clasificador aprende de las decisiones del LLM (ejemplos por etiqueta)
+    GRAPH_ROUTE_CLASSIFIER_MIN_EXAMPLES: int = 20
+    # Archivo donde persistir lo aprendido. Vacio (por defecto) = solo en memoria
+    GRAPH_ROUTE_CLASSIFIER_PATH: str = ""
+    # Presupuesto por peticion al agente: al agotarse, el especialista responde
+    # con lo ya reunido en lugar de seguir el ciclo supervisor <-> workers
+    # Deadline del ciclo supervisor <-> workers (llamadas del supervisor incluidas)
+    AGENT_REQUEST_TIMEOUT_SECONDS: float = 45.0
+    # Tiempo extra, aparte, para la respuesta final del especialista (exenta del
+    # presupuesto): la peticion dura como maximo la suma de ambos
+    AGENT_SPECIALIST_TIMEOUT_SECONDS: float = 20.0
+    AGENT_MAX_LLM_CALLS: int = 8
+    AGENT_MAX_TOKENS: int = 24000
+    # Contexto por nodo (tokens aprox.): el supervisor ve resumenes, los
+    # workers la pregunta + reportes relevantes, el especialista todo truncado
+    GRAPH_CONTEXT_SUPERVISOR_TOKENS: int = 1500
+    GRAPH_CONTEXT_WORKER_TOKENS: int = 2000
+    GRAPH_CONTEXT_SPECIALIST_TOKENS: int = 6000
+    # Tamaño de cada reporte resumido (supervisor) y de turnos anteriores
+    GRAPH_CONTEXT_SUMMARY_TOKENS: int = 60
+    GRAPH_CONTEXT_HISTORY_MESSAGE_TOKENS: int = 400
+    # Hilos de conversacion (thread_id) persistidos con el checkpointer de Postgres
+    GRAPH_CHECKPOINTER_ENABLED: bool = True
+    GRAPH_CHECKPOINT_POOL_MIN_SIZE: int = 1
+    GRAPH_CHECKPOINT_POOL_MAX_SIZE: int = 10
+    # Poda: checkpoints por hilo que se conservan y vida de hilos inactivos
+    GRAPH_CHECKPOINT_KEEP_LAST: int = 20
+    GRAPH_CHECKPOINT_TTL_HOURS: int = 72
+    GRAPH_CHECKPOINT_PRUNE_INTERVAL_SECONDS: float = 3600.0
+    # Clave HMAC de los thread_id emitidos por el servidor. Vacio = aleatoria por
+    # proceso (con varios workers o tras reiniciar, los hilos dejan de valer)
+    GRAPH_THREAD_SECRET: str = ""
+
     @model_validator(mode="after")
     def set_test_safety_defaults(self) -> "Settings":
         if (
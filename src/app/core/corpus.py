@@ -0,0 +1,20 @@
+from threading import Lock
+
+# Generacion del corpus: cambia cada vez que se agregan o modifican documentos.
+# Los caches que dependen del contenido (ej. respuestas) la guardan junto a cada
+# entrada y descartan lo que sea de una generacion anterior.
+# Es por proceso: la ingesta corre en el mismo proceso que la API.
+_generation = 0
+_lock = Lock()
+
+
+def get_corpus_generation() -> int:
+    with _lock:
+        return _generation
+
+
+def bump_corpus_generation() -> int:
+    global _generation
+    with _lock:
+        _generation += 1
+        return _generation
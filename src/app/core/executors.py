@@ -0,0 +1,40 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_process_pool: ProcessPoolExecutor | None = None
+_POOL_LOCK = Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Pool de procesos compartido para trabajo CPU bound (parseo de PDFs).
+    Se crea la primera vez que se usa. 'spawn' evita heredar el event loop
+    y los modelos cargados en el proceso de la API.
+    """
+    global _process_pool
+
+    with _POOL_LOCK:
+        if _process_pool is None:
+            logger.info(
+                f"Iniciando pool de procesos con {settings.RAG_PARSER_WORKERS} workers"
+            )
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.RAG_PARSER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+
+    with _POOL_LOCK:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
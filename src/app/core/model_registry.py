@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ModelState(StrEnum):
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+@dataclass
+class _ModelSlot:
+    name: str
+    loader: Callable[[], Any]
+    warmup: Callable[[Any], None] | None
+    state: ModelState = ModelState.PENDING
+    instance: Any = None
+    load_seconds: float | None = None
+    warmup_seconds: float | None = None
+    error: str | None = None
+    task: asyncio.Task[Any] | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    Carga diferida de modelos pesados (embeddings, reranker).
+    - Importar la app ya no carga modelos: cada servicio registra su loader.
+    - El lifespan lanza la carga en segundo plano (hilos) y /ready informa
+      el estado y la latencia de carga + warm-up de cada modelo.
+    - Si alguien pide un modelo antes, get() dispara (o espera) su carga.
+    """
+
+    def __init__(self) -> None:
+        self._slots: dict[str, _ModelSlot] = {}
+        self._startup_phases: dict[str, float] = {}
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Callable[[Any], None] | None = None,
+    ) -> None:
+        self._slots[name] = _ModelSlot(name=name, loader=loader, warmup=warmup)
+
+    def start_background_loading(self) -> None:
+        for slot in self._slots.values():
+            self._ensure_task(slot)
+
+    async def get(self, name: str) -> Any:
+        slot = self._slots[name]
+        if slot.state == ModelState.READY:
+            return slot.instance
+        return await asyncio.shield(self._ensure_task(slot))
+
+    def is_ready(self) -> bool:
+        return all(slot.state == ModelState.READY for slot in self._slots.values())
+
+    def record_startup_phase(self, phase: str, seconds: float) -> None:
+        self._startup_phases[phase] = round(seconds, 3)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "models": {name: slot.to_dict() for name, slot in self._slots.items()},
+            "startup": dict(self._startup_phases),
+        }
+
+    async def wait_until_ready(self) -> None:
+        tasks = [self._ensure_task(slot) for slot in self._slots.values()]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _ensure_task(self, slot: _ModelSlot) -> asyncio.Task[Any]:
+        # Un fallo anterior se reintenta en la siguiente peticion
+        loop = asyncio.get_running_loop()
+        if (
+            slot.task is None
+            or slot.state == ModelState.FAILED
+            or (slot.state != ModelState.READY and slot.task.get_loop() is not loop)
+        ):
+            slot.task = loop.create_task(
+                self._load(slot), name=f"load-model-{slot.name}"
+            )
+            # El error ya queda en el slot: evitamos el aviso de excepcion no leida
+            slot.task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        return slot.task
+
+    async def _load(self, slot: _ModelSlot) -> Any:
+        slot.state = ModelState.LOADING
+        slot.error = None
+        logger.info(f"Cargando modelo '{slot.name}' en segundo plano...")
+        try:
+            started = time.perf_counter()
+            instance = await asyncio.to_thread(slot.loader)
+            slot.load_seconds = round(time.perf_counter() - started, 3)
+
+            if slot.warmup is not None:
+                # Primera inferencia: inicializa kernels/caches antes del trafico
+                started = time.perf_counter()
+                await asyncio.to_thread(slot.warmup, instance)
+                slot.warmup_seconds = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            slot.state = ModelState.FAILED
+            slot.error = str(e)
+            logger.error(f"Fallo la carga del modelo '{slot.name}': {e}")
+            raise
+
+        slot.instance = instance
+        slot.state = ModelState.READY
+        logger.info(
+            f"Modelo '{slot.name}' listo: carga {slot.load_seconds}s, "
+            f"warm-up {slot.warmup_seconds}s"
+        )
+        if self.is_ready():
+            self._log_startup_report()
+        return instance
+
+    def _log_startup_report(self) -> None:
+        lines = [
+            f"  {phase}: {seconds}s" for phase, seconds in self._startup_phases.items()
+        ]
+        lines += [
+            f"  modelo {slot.name}: carga {slot.load_seconds}s, "
+            f"warm-up {slot.warmup_seconds}s"
+            for slot in self._slots.values()
+        ]
+        logger.info("Reporte de arranque:\n" + "\n".join(lines))
+
+
+model_registry = ModelRegistry()
@@ -1,15 +1,49 @@
 import logging
-from collections import Counter
+from collections import Counter, deque
 from threading import Lock
 from typing import Any
 
 SAFETY_GATE_TRIGGERED_TOTAL = "safety_gate_triggered_total"
 SAFETY_GATE_BYPASSED_TOTAL = "safety_gate_bypassed_total"
 SAFETY_GATE_ESCALATION_TOTAL = "safety_gate_escalation_total"
+EMBEDDING_CACHE_MEMORY_HITS_TOTAL = "embedding_cache_memory_hits_total"
+EMBEDDING_CACHE_PERSISTENT_HITS_TOTAL = "embedding_cache_persistent_hits_total"
+EMBEDDING_CACHE_MISSES_TOTAL = "embedding_cache_misses_total"
+SEMANTIC_CACHE_HITS_TOTAL = "semantic_cache_hits_total"
+SEMANTIC_CACHE_MISSES_TOTAL = "semantic_cache_misses_total"
+SEMANTIC_CACHE_BYPASSED_TOTAL = "semantic_cache_bypassed_total"
+SEMANTIC_CACHE_HIT_RATE = "semantic_cache_hit_rate"
+SEMANTIC_CACHE_LATENCY_SAVED_SECONDS = "semantic_cache_latency_saved_seconds"
+QUERY_EXPANSION_CACHE_HITS_TOTAL = "query_expansion_cache_hits_total"
+QUERY_EXPANSION_CACHE_MISSES_TOTAL = "query_expansion_cache_misses_total"
+QUERY_EXPANSION_INFLIGHT_SHARED_TOTAL = "query_expansion_inflight_shared_total"
+QUERY_EXPANSION_SKIPPED_TOTAL = "query_expansion_skipped_total"
+RERANK_QUEUE_DEPTH = "rerank_queue_depth"
+RERANK_BATCH_REQUESTS = "rerank_batch_requests"
+RERANK_BATCH_PAIRS = "rerank_batch_pairs"
+EMBEDDING_QUEUE_DEPTH = "embedding_queue_depth"
+EMBEDDING_BATCH_SIZE = "embedding_batch_size"
+EMBEDDING_QUEUE_WAIT_SECONDS = "embedding_queue_wait_seconds"
+AGENT_STREAM_FIRST_TOKEN_SECONDS = "agent_stream_first_token_seconds"
+AGENT_STREAM_RETRACTIONS_TOTAL = "agent_stream_retractions_total"
+PRE_ROUTER_RULE_TOTAL = "pre_router_rule_total"
+PRE_ROUTER_CLASSIFIER_TOTAL = "pre_router_classifier_total"
+PRE_ROUTER_FALLBACK_TOTAL = "pre_router_fallback_total"
+PRE_ROUTER_FALLBACK_RATE = "pre_router_fallback_rate"
+# Histograma por nodo: graph_prompt_tokens_<nodo>
+GRAPH_PROMPT_TOKENS = "graph_prompt_tokens"
+GRAPH_CONTEXT_TRUNCATED_TOTAL = "graph_context_truncated_total"
+# Total y desglose por motivo: agent_budget_exhausted_total_<motivo>
+AGENT_BUDGET_EXHAUSTED_TOTAL = "agent_budget_exhausted_total"
 
 logger = logging.getLogger(__name__)
 _COUNTERS = Counter[str]()
 _COUNTER_LOCK = Lock()
+_GAUGES: dict[str, float] = {}
+# Ultimas muestras por histograma (para percentiles aproximados)
+_HISTOGRAM_WINDOW = 1024
+_HISTOGRAMS: dict[str, deque[float]] = {}
+_HISTOGRAM_TOTALS: dict[str, tuple[int, float]] = {}
 
 
 def increment_counter(name: str, value: int = 1) -> int:
@@ -35,6 +69,64 @@ def get_counters_snapshot() -> dict[str, int]:
 def reset_counters() -> None:
     with _COUNTER_LOCK:
         _COUNTERS.clear()
+        _GAUGES.clear()
+        _HISTOGRAMS.clear()
+        _HISTOGRAM_TOTALS.clear()
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _COUNTER_LOCK:
+        _GAUGES[name] = value
+
+
+def get_gauge_value(name: str) -> float:
+    with _COUNTER_LOCK:
+        return _GAUGES.get(name, 0.0)
+
+
+def observe_histogram(name: str, value: float) -> None:
+    with _COUNTER_LOCK:
+        samples = _HISTOGRAMS.get(name)
+        if samples is None:
+            samples = _HISTOGRAMS[name] = deque(maxlen=_HISTOGRAM_WINDOW)
+        samples.append(value)
+        count, total = _HISTOGRAM_TOTALS.get(name, (0, 0.0))
+        _HISTOGRAM_TOTALS[name] = (count + 1, total + value)
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+def get_histogram_summary(name: str) -> dict[str, float]:
+    with _COUNTER_LOCK:
+        samples = sorted(_HISTOGRAMS.get(name, ()))
+        count, total = _HISTOGRAM_TOTALS.get(name, (0, 0.0))
+
+    if not samples:
+        return {"count": 0, "sum": 0.0}
+
+    return {
+        "count": count,
+        "sum": total,
+        "p50": _percentile(samples, 0.5),
+        "p95": _percentile(samples, 0.95),
+        "max": samples[-1],
+    }
+
+
+def get_metrics_snapshot() -> dict[str, Any]:
+    with _COUNTER_LOCK:
+        counters = dict(_COUNTERS)
+        gauges = dict(_GAUGES)
+        histogram_names = list(_HISTOGRAMS)
+
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "histograms": {name: get_histogram_summary(name) for name in histogram_names},
+    }
 
 
 def increment_safety_gate_triggered() -> int:
@@ -0,0 +1,70 @@
+import re
+
+# Deteccion de paciente concreto compartida por el pre-router, las vistas de
+# contexto del grafo y el cache semantico.
+
+# Señales de paciente concreto: ID explicito, o nombre propio tras 'paciente'
+# (una o dos palabras con mayuscula inicial) o tras 'historial de', 'ficha
+# de'... (nombre y apellido: dos palabras, para no tomar 'Datos de Prevalencia')
+_PATIENT_ID_PATTERN = re.compile(
+    r"\b(?:paciente|id|expediente)\s*(?:#|n[°ºo]\.?|:)?\s*(?P<ref>\d+)\b",
+    re.IGNORECASE,
+)
+_NAME = r"[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+"
+_PATIENT_NAMED_PATTERN = re.compile(rf"\b[Pp]aciente\s+(?P<ref>{_NAME}(?:\s+{_NAME})?)")
+_PATIENT_RECORD_PATTERN = re.compile(
+    rf"\b(?:[Hh]istorial|[Ff]icha|[Ee]xpediente|[Dd]atos)"
+    rf"(?:\s+cl[ií]nico)?(?:\s+(?:de|del))?(?:\s+(?:la|el))?"
+    rf"\s+(?P<ref>{_NAME}\s+{_NAME})"
+)
+# Terminos clinicos que, con mayuscula (titulos, inicio de frase), parecen
+# nombres propios: 'Historial de Hipertensión Arterial' no es un paciente
+_CLINICAL_TERMS = frozenset(
+    {
+        "anemia",
+        "arterial",
+        "asma",
+        "cáncer",
+        "cancer",
+        "cardiopatía",
+        "cardiopatia",
+        "control",
+        "diabetes",
+        "diabético",
+        "diabetico",
+        "epoc",
+        "glucosa",
+        "hipertensión",
+        "hipertension",
+        "hipertenso",
+        "incidencia",
+        "insulina",
+        "laboratorio",
+        "mellitus",
+        "mortalidad",
+        "obesidad",
+        "prevalencia",
+        "tipo",
+        "tratamiento",
+        "vacunación",
+        "vacunacion",
+    }
+)
+
+
+def patient_references(text: str) -> set[str]:
+    """IDs y nombres de paciente mencionados (normalizados para comparar)."""
+    references = {
+        match.group("ref").lower()
+        for pattern in (
+            _PATIENT_ID_PATTERN,
+            _PATIENT_NAMED_PATTERN,
+            _PATIENT_RECORD_PATTERN,
+        )
+        for match in pattern.finditer(text)
+    }
+    return {ref for ref in references if not _CLINICAL_TERMS.intersection(ref.split())}
+
+
+def has_patient_reference(text: str) -> bool:
+    return bool(patient_references(text))
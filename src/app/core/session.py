@@ -53,6 +53,12 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 async def create_db_and_tables() -> None:
     """Crea las tablas en la BD"""
     from app.db.init_data import init_db
+    from app.db.search_indexes import (
+        ensure_compressed_vector_index,
+        ensure_listing_indexes,
+        ensure_text_search_index,
+        ensure_vector_index,
+    )
     from app.models import knowledge as knowledge_models
     from app.models import patient as patient_models
 
@@ -62,6 +68,14 @@ async def create_db_and_tables() -> None:
     async with engine.begin() as conn:
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.run_sync(SQLModel.metadata.create_all)
+        # Indice ANN (HNSW / IVFFlat) para no escanear todos los vectores
+        await ensure_vector_index(conn)
+        # Nivel comprimido opcional (halfvec / binario) con re-puntuacion
+        await ensure_compressed_vector_index(conn)
+        # tsvector + GIN para la recuperacion hibrida (full-text)
+        await ensure_text_search_index(conn)
+        # Listado paginado por keyset con filtros de fuente / fecha
+        await ensure_listing_indexes(conn)
 
     async with async_session_factory() as session:
         await init_db(session)
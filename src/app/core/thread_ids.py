@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import uuid
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Los thread_id los emite el servidor (POST /agent/threads): id aleatorio +
+# firma HMAC. Un id inventado o alterado no abre el historial de otro hilo.
+_SIGNATURE_CHARS = 32
+
+
+def _load_secret() -> bytes:
+    if settings.GRAPH_THREAD_SECRET:
+        return settings.GRAPH_THREAD_SECRET.encode()
+    logger.warning(
+        "GRAPH_THREAD_SECRET vacio: secreto aleatorio por proceso (los hilos no "
+        "sobreviven a un reinicio ni se comparten entre workers)."
+    )
+    return secrets.token_bytes(32)
+
+
+_secret = _load_secret()
+
+
+def _sign(thread_key: str) -> str:
+    digest = hmac.new(_secret, thread_key.encode(), hashlib.sha256).hexdigest()
+    return digest[:_SIGNATURE_CHARS]
+
+
+def issue_thread_id() -> str:
+    thread_key = uuid.uuid4().hex
+    return f"{thread_key}.{_sign(thread_key)}"
+
+
+def verify_thread_id(thread_id: str) -> str | None:
+    """
+    Devuelve la clave del hilo (la que se guarda en el checkpointer) si el id
+    fue emitido por este servidor; None si no tiene una firma valida.
+    """
+    thread_key, _, signature = thread_id.partition(".")
+    if not thread_key or not signature:
+        return None
+    if not hmac.compare_digest(signature, _sign(thread_key)):
+        return None
+    return thread_key
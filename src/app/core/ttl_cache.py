@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class AsyncTTLCache[K: Hashable, V]:
+    """
+    Cache acotado (LRU) con expiracion por entrada y single-flight:
+    si varias corrutinas piden la misma clave a la vez, solo una calcula
+    el valor y las demas esperan ese mismo resultado (si esa se cancela, otra
+    de las que esperaban lo calcula). Los errores no se cachean.
+    Pensado para usarse dentro de un event loop.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float) -> None:
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+
+    def get(self, key: K) -> V | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if time.monotonic() >= expires_at:
+            del self._items[key]
+            return None
+
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def is_inflight(self, key: K) -> bool:
+        return key in self._inflight
+
+    async def get_or_compute(self, key: K, compute: Callable[[], Awaitable[V]]) -> V:
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._compute(key, compute)
+
+            try:
+                # shield: si este llamador se cancela, no cancela a los demas
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Si el cancelado fue el lider (y no este llamador), el primero
+                # que despierta toma su lugar y los demas lo esperan a el
+                task = asyncio.current_task()
+                if not inflight.cancelled() or (task and task.cancelling()):
+                    raise
+
+    async def _compute(self, key: K, compute: Callable[[], Awaitable[V]]) -> V:
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Marcamos la excepcion como leida si nadie mas esperaba
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.set(key, value)
+        future.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,93 @@
+import struct
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from pgvector import Vector  # type: ignore
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.search_indexes import KNOWLEDGE_TABLE
+from app.models.knowledge import KnowledgeBase
+
+# Columnas que se escriben con COPY (id lo genera Postgres)
+KNOWLEDGE_COPY_COLUMNS = ("title", "content", "source", "created_at", "embedding")
+
+# Formato binario de COPY: firma + flags + largo de la extension de cabecera
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+_PG_EPOCH = datetime(2000, 1, 1)
+_NULL_FIELD = struct.pack("!i", -1)
+
+# Filas por cada bloque de bytes enviado al socket
+_ROWS_PER_BLOCK = 256
+
+
+def _field(payload: bytes) -> bytes:
+    return struct.pack("!i", len(payload)) + payload
+
+
+def _text_field(value: str | None) -> bytes:
+    if value is None:
+        return _NULL_FIELD
+    return _field(value.encode("utf-8"))
+
+
+def _timestamp_field(value: datetime) -> bytes:
+    # timestamp sin zona: microsegundos desde 2000-01-01
+    micros = (value.replace(tzinfo=None) - _PG_EPOCH) // timedelta(microseconds=1)
+    return _field(struct.pack("!q", micros))
+
+
+def _vector_field(value: list[float] | None) -> bytes:
+    if value is None:
+        return _NULL_FIELD
+    # Codificacion binaria nativa de pgvector (dim, unused, float32 big-endian)
+    return _field(Vector(value).to_binary())  # type: ignore
+
+
+def encode_knowledge_row(row: KnowledgeBase) -> bytes:
+    return (
+        struct.pack("!h", len(KNOWLEDGE_COPY_COLUMNS))
+        + _text_field(row.title)
+        + _text_field(row.content)
+        + _text_field(row.source)
+        + _timestamp_field(row.created_at)
+        + _vector_field(row.embedding)
+    )
+
+
+async def _copy_stream(rows: Sequence[KnowledgeBase]) -> AsyncIterator[bytes]:
+    yield _COPY_HEADER
+    for start in range(0, len(rows), _ROWS_PER_BLOCK):
+        block = rows[start : start + _ROWS_PER_BLOCK]
+        yield b"".join(encode_knowledge_row(row) for row in block)
+    yield _COPY_TRAILER
+
+
+async def copy_knowledge_chunks(
+    session: AsyncSession, rows: Sequence[KnowledgeBase]
+) -> int:
+    """
+    Inserta chunks en 'knowledgebase' con COPY binario de asyncpg.
+    Mucho mas rapido que INSERTs del ORM para miles de vectores y retiene
+    la conexion menos tiempo. No devuelve ids: pensado para cargas masivas.
+    El commit queda a cargo de quien llama (session.commit()).
+    """
+    if not rows:
+        return 0
+
+    # Conexion asyncpg subyacente de la sesion de SQLAlchemy
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver: Any = raw_connection.driver_connection
+
+    # Si la sesion ya tiene transaccion abierta esto es un savepoint
+    async with driver.transaction():
+        await driver.copy_to_table(
+            KNOWLEDGE_TABLE,
+            source=_copy_stream(rows),
+            columns=list(KNOWLEDGE_COPY_COLUMNS),
+            format="binary",
+        )
+
+    return len(rows)
@@ -0,0 +1,58 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import Select, select
+from sqlmodel import col
+
+from app.models.knowledge import KnowledgeBase
+
+# Fila del listado: id, title, content, source, created_at
+ListingRow = tuple[int | None, str, str, str | None, datetime]
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # created_at se guarda en UTC sin zona (get_utc_now): asyncpg rechaza
+    # comparar un TIMESTAMP WITHOUT TIME ZONE con una fecha con zona
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def build_listing_statement(
+    after_id: int | None = None,
+    source: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: int | None = None,
+) -> Select[ListingRow]:
+    """
+    Listado por keyset sobre el id: 'WHERE id > cursor ORDER BY id LIMIT n'
+    cuesta lo mismo en la primera pagina que en la ultima (sin OFFSET).
+    Filtros opcionales por fuente y rango de fechas [created_from, created_to);
+    las fechas con zona horaria se comparan convertidas a UTC.
+    """
+    # Columnas del listado: nunca 'embedding' (1024 floats por fila).
+    # select de SQLAlchemy: el de SQLModel solo tipa hasta 4 columnas
+    statement = select(
+        col(KnowledgeBase.id),
+        col(KnowledgeBase.title),
+        col(KnowledgeBase.content),
+        col(KnowledgeBase.source),
+        col(KnowledgeBase.created_at),
+    )
+    if after_id is not None:
+        statement = statement.where(col(KnowledgeBase.id) > after_id)
+    if source is not None:
+        statement = statement.where(col(KnowledgeBase.source) == source)
+    if created_from is not None:
+        statement = statement.where(
+            col(KnowledgeBase.created_at) >= _naive_utc(created_from)
+        )
+    if created_to is not None:
+        statement = statement.where(
+            col(KnowledgeBase.created_at) < _naive_utc(created_to)
+        )
+
+    statement = statement.order_by(col(KnowledgeBase.id))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
@@ -0,0 +1,300 @@
+import logging
+import re
+from typing import Any, Literal, cast
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import func, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models.knowledge import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+VectorIndexMethod = Literal["hnsw", "ivfflat"]
+
+VECTOR_INDEX_NAMES: dict[VectorIndexMethod, str] = {
+    "hnsw": "ix_knowledgebase_embedding_hnsw",
+    "ivfflat": "ix_knowledgebase_embedding_ivfflat",
+}
+
+CompressionTier = Literal["halfvec", "binary"]
+
+EMBEDDING_DIMENSIONS = 1024
+
+# Maximo que acepta pgvector para hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+# Nombre de la tabla para el SQL crudo (SQLModel tipa __tablename__ como
+# str | Callable, con tipos parcialmente desconocidos)
+KNOWLEDGE_TABLE: str = cast(Any, KnowledgeBase).__tablename__
+
+# Indices por expresion: no hace falta columna extra ni migrar datos,
+# Postgres calcula la version comprimida al indexar cada fila.
+COMPRESSED_INDEX_NAMES: dict[CompressionTier, str] = {
+    "halfvec": "ix_knowledgebase_embedding_halfvec_hnsw",
+    "binary": "ix_knowledgebase_embedding_bit_hnsw",
+}
+COMPRESSED_INDEX_EXPRESSIONS: dict[CompressionTier, tuple[str, str]] = {
+    "halfvec": (f"(embedding::halfvec({EMBEDDING_DIMENSIONS}))", "halfvec_cosine_ops"),
+    "binary": (
+        f"(binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS}))",
+        "bit_hamming_ops",
+    ),
+}
+
+# Columna tsvector generada por Postgres (no mapeada en el modelo)
+TEXT_SEARCH_COLUMN = "search_vector"
+TEXT_SEARCH_INDEX_NAME = "ix_knowledgebase_search_vector_gin"
+
+# Indices del listado por keyset con filtros (GET /knowledge).
+# (source, id): igualdad + cursor, el indice entrega las filas ya en orden de id.
+# (created_at, id): un rango no puede servir el ORDER BY id; el plan es
+# filtrar el rango con el indice y ordenar por id lo que quede (top-N con
+# LIMIT). Su costo crece con las filas del rango, no con la pagina.
+LISTING_INDEXES = {
+    "ix_knowledgebase_source_id": "(source, id)",
+    "ix_knowledgebase_created_at_id": "(created_at, id)",
+}
+
+
+def vector_index_options(method: VectorIndexMethod) -> dict[str, int]:
+    # Parametros de construccion del indice (van en WITH (...))
+    if method == "hnsw":
+        return {
+            "m": settings.RAG_HNSW_M,
+            "ef_construction": settings.RAG_HNSW_EF_CONSTRUCTION,
+        }
+    return {"lists": settings.RAG_IVFFLAT_LISTS}
+
+
+def build_vector_index_ddl(method: VectorIndexMethod) -> str:
+    options = ", ".join(
+        f"{key} = {int(value)}" for key, value in vector_index_options(method).items()
+    )
+    return (
+        f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAMES[method]} "
+        f"ON {KNOWLEDGE_TABLE} "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({options})"
+    )
+
+
+def index_matches(indexdef: str, method: VectorIndexMethod) -> bool:
+    # pg_indexes guarda las opciones como: WITH (m='16', ef_construction='64')
+    return all(
+        f"{key}='{int(value)}'" in indexdef
+        for key, value in vector_index_options(method).items()
+    )
+
+
+async def get_indexdef(conn: AsyncConnection, index_name: str) -> str | None:
+    result = await conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+        {"name": index_name},
+    )
+    return result.scalar_one_or_none()
+
+
+async def _count_rows(conn: AsyncConnection) -> int:
+    result = await conn.execute(select(func.count()).select_from(KnowledgeBase))
+    return result.scalar_one()
+
+
+async def ensure_vector_index(conn: AsyncConnection) -> None:
+    """
+    Crea (idempotente) el indice ANN configurado en RAG_VECTOR_INDEX.
+    - Si cambian los parametros de construccion, el indice se reconstruye.
+    - Si se cambia de metodo, el indice del metodo anterior se elimina.
+    - IVFFlat solo se construye con al menos RAG_IVFFLAT_MIN_ROWS filas: sobre
+      una tabla vacia sus listas quedarian sin entrenar.
+    """
+    method = settings.RAG_VECTOR_INDEX
+
+    for other_method, index_name in VECTOR_INDEX_NAMES.items():
+        if other_method != method:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    if method == "none":
+        logger.info("Sin indice vectorial: busqueda por escaneo secuencial.")
+        return
+
+    index_name = VECTOR_INDEX_NAMES[method]
+    indexdef = await get_indexdef(conn, index_name)
+
+    if indexdef is not None and index_matches(indexdef, method):
+        return
+
+    if method == "ivfflat":
+        rows = await _count_rows(conn)
+        if rows < settings.RAG_IVFFLAT_MIN_ROWS:
+            logger.info(
+                f"{rows} filas (< RAG_IVFFLAT_MIN_ROWS): {index_name} se construira "
+                "en un arranque posterior."
+            )
+            return
+
+    if indexdef is not None:
+        logger.info(f"Parametros del indice {index_name} cambiaron. Reconstruyendo.")
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    if settings.RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM:
+        # Mas memoria acelera mucho la construccion de HNSW
+        await conn.execute(
+            text("SELECT set_config('maintenance_work_mem', :value, true)"),
+            {"value": settings.RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM},
+        )
+
+    logger.info(f"Construyendo indice vectorial {index_name}...")
+    await conn.execute(text(build_vector_index_ddl(method)))
+
+
+def build_compressed_index_ddl(
+    tier: CompressionTier, concurrently: bool = False
+) -> str:
+    expression, opclass = COMPRESSED_INDEX_EXPRESSIONS[tier]
+    options = ", ".join(
+        f"{key} = {int(value)}" for key, value in vector_index_options("hnsw").items()
+    )
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"IF NOT EXISTS {COMPRESSED_INDEX_NAMES[tier]} "
+        f"ON {KNOWLEDGE_TABLE} "
+        f"USING hnsw ({expression} {opclass}) WITH ({options})"
+    )
+
+
+async def ensure_compressed_vector_index(conn: AsyncConnection) -> None:
+    """
+    Crea el indice del nivel comprimido configurado (RAG_VECTOR_COMPRESSION)
+    y elimina el del otro nivel. Para tablas grandes conviene construirlo antes
+    con 'python -m app.db.vector_compression migrate' (CONCURRENTLY).
+    - Si cambian RAG_HNSW_M / RAG_HNSW_EF_CONSTRUCTION, el indice se reconstruye.
+    """
+    tier = settings.RAG_VECTOR_COMPRESSION
+
+    for other_tier, index_name in COMPRESSED_INDEX_NAMES.items():
+        if other_tier != tier:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    if tier == "none":
+        return
+
+    index_name = COMPRESSED_INDEX_NAMES[tier]
+    indexdef = await get_indexdef(conn, index_name)
+
+    if indexdef is not None and index_matches(indexdef, "hnsw"):
+        return
+
+    if indexdef is not None:
+        logger.info(f"Parametros del indice {index_name} cambiaron. Reconstruyendo.")
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    logger.info(f"Construyendo indice comprimido {index_name}...")
+    await conn.execute(text(build_compressed_index_ddl(tier)))
+
+
+def _text_search_config() -> str:
+    # Va literal en el DDL (las columnas generadas no aceptan parametros)
+    config = settings.RAG_TEXT_SEARCH_CONFIG
+    if not re.fullmatch(r"[a-z_]+", config):
+        msg = f"RAG_TEXT_SEARCH_CONFIG invalida: {config!r}"
+        raise ValueError(msg)
+    return config
+
+
+def build_text_search_ddl() -> list[str]:
+    table = KNOWLEDGE_TABLE
+    config = _text_search_config()
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {TEXT_SEARCH_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{config}', "
+        "coalesce(title, '') || ' ' || coalesce(content, ''))) STORED",
+        f"CREATE INDEX IF NOT EXISTS {TEXT_SEARCH_INDEX_NAME} "
+        f"ON {table} USING gin ({TEXT_SEARCH_COLUMN})",
+    ]
+
+
+def _text_search_matches(expression: str) -> bool:
+    # pg_get_expr devuelve: to_tsvector('spanish'::regconfig, ...)
+    return f"'{_text_search_config()}'::regconfig" in expression
+
+
+async def ensure_text_search_index(conn: AsyncConnection) -> None:
+    """
+    Columna tsvector generada + indice GIN para la busqueda lexica (hibrida).
+    Postgres la mantiene sola en cada INSERT/COPY.
+    - Si cambia RAG_TEXT_SEARCH_CONFIG, la columna (y su indice) se reconstruye.
+    Nota: en tablas existentes el ALTER reescribe la tabla (al crearla o
+    reconstruirla).
+    """
+    result = await conn.execute(
+        text(
+            "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d "
+            "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+            "WHERE d.adrelid = CAST(:table AS regclass) AND a.attname = :column"
+        ),
+        {"table": KNOWLEDGE_TABLE, "column": TEXT_SEARCH_COLUMN},
+    )
+    expression = result.scalar_one_or_none()
+
+    if expression is not None and not _text_search_matches(expression):
+        logger.info(
+            "RAG_TEXT_SEARCH_CONFIG cambio. Reconstruyendo la columna "
+            f"{TEXT_SEARCH_COLUMN}."
+        )
+        # El indice GIN depende de la columna: se elimina con ella
+        await conn.execute(
+            text(
+                f"ALTER TABLE {KNOWLEDGE_TABLE} "
+                f"DROP COLUMN IF EXISTS {TEXT_SEARCH_COLUMN}"
+            )
+        )
+
+    for statement in build_text_search_ddl():
+        await conn.execute(text(statement))
+
+
+def build_listing_index_ddl() -> list[str]:
+    table = KNOWLEDGE_TABLE
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}"
+        for name, columns in LISTING_INDEXES.items()
+    ]
+
+
+async def ensure_listing_indexes(conn: AsyncConnection) -> None:
+    # (source, id): filtrar por fuente y seguir el cursor sin ordenar en memoria
+    for statement in build_listing_index_ddl():
+        await conn.execute(text(statement))
+
+
+def hnsw_ef_search(candidates: int = 0) -> int:
+    # HNSW nunca devuelve mas de ef_search filas; pgvector lo limita a 1000
+    return min(max(settings.RAG_HNSW_EF_SEARCH, candidates), HNSW_MAX_EF_SEARCH)
+
+
+async def apply_vector_search_settings(
+    session: AsyncSession, candidates: int = 0
+) -> None:
+    """
+    Ajusta la precision del indice ANN para la transaccion actual.
+    hnsw.ef_search / ivfflat.probes: mas alto = mejor recall, mas latencia.
+    'candidates': filas que debe devolver el indice (HNSW nunca devuelve mas
+    de ef_search), relevante para la primera etapa del nivel comprimido.
+    """
+    method = settings.RAG_VECTOR_INDEX
+    if method == "hnsw" or settings.RAG_VECTOR_COMPRESSION != "none":
+        # Los indices comprimidos tambien son HNSW
+        name = "hnsw.ef_search"
+        value = hnsw_ef_search(candidates)
+    elif method == "ivfflat":
+        name, value = "ivfflat.probes", settings.RAG_IVFFLAT_PROBES
+    else:
+        return
+
+    # set_config(..., true) equivale a SET LOCAL: solo dura esta transaccion
+    conn = await session.connection()
+    await conn.execute(
+        text("SELECT set_config(:name, :value, true)"),
+        {"name": name, "value": str(value)},
+    )
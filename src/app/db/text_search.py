@@ -0,0 +1,65 @@
+from collections.abc import Sequence
+
+from sqlalchemy import TextClause
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.search_indexes import KNOWLEDGE_TABLE, TEXT_SEARCH_COLUMN
+from app.db.vector_search import document_from_row
+from app.models.knowledge import KnowledgeBase
+
+
+def build_lexical_statement(query_count: int) -> TextClause:
+    """
+    Busqueda full-text para N variantes de la pregunta en una sola consulta.
+    websearch_to_tsquery tolera texto libre (comillas, guiones, etc.) y el
+    indice GIN resuelve el '@@'. Dedup por id quedandonos con el mejor rank.
+    """
+    if query_count < 1:
+        msg = "Se necesita al menos una query de texto"
+        raise ValueError(msg)
+
+    table = KNOWLEDGE_TABLE
+    values = ", ".join(f"(CAST(:t{i} AS text))" for i in range(query_count))
+    return text(
+        f"""
+        SELECT kb.id, kb.title, kb.content, kb.source, kb.created_at, best.rank
+        FROM (
+            SELECT c.id, MAX(c.rank) AS rank
+            FROM (VALUES {values}) AS q(query_text)
+            CROSS JOIN LATERAL (
+                SELECT t.id, ts_rank_cd(t.{TEXT_SEARCH_COLUMN}, tsq.query) AS rank
+                FROM {table} AS t,
+                    websearch_to_tsquery(
+                        CAST(:config AS regconfig), q.query_text
+                    ) AS tsq(query)
+                WHERE t.{TEXT_SEARCH_COLUMN} @@ tsq.query
+                ORDER BY rank DESC
+                LIMIT :limit
+            ) AS c
+            GROUP BY c.id
+        ) AS best
+        JOIN {table} AS kb ON kb.id = best.id
+        ORDER BY best.rank DESC
+        """
+    )
+
+
+async def lexical_search(
+    session: AsyncSession, queries: Sequence[str], limit: int
+) -> list[KnowledgeBase]:
+    """
+    Candidatos por coincidencia exacta de terminos (farmacos, 'HbA1c', cifras),
+    ordenados por relevancia lexica.
+    """
+    if not queries:
+        return []
+
+    params: dict[str, object] = {f"t{i}": q for i, q in enumerate(queries)}
+    params["config"] = settings.RAG_TEXT_SEARCH_CONFIG
+    params["limit"] = limit
+
+    conn = await session.connection()
+    result = await conn.execute(build_lexical_statement(len(queries)), params)
+    return [document_from_row(row) for row in result.all()]
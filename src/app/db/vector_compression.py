@@ -0,0 +1,220 @@
+"""
+Herramientas del nivel comprimido de vectores (halfvec / binario).
+
+    python -m app.db.vector_compression migrate --tier binary
+    python -m app.db.vector_compression report --sample 200 --k 10
+
+- migrate: construye el indice comprimido con CREATE INDEX CONCURRENTLY sobre
+  las filas existentes, sin bloquear escrituras (hacerlo antes de activar
+  RAG_VECTOR_COMPRESSION en tablas grandes).
+- report: tamaño de cada indice vectorial y recall@k contra la busqueda exacta.
+"""
+
+import argparse
+import asyncio
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, get_args
+
+from sqlmodel import col, func, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.search_indexes import (
+    COMPRESSED_INDEX_NAMES,
+    KNOWLEDGE_TABLE,
+    VECTOR_INDEX_NAMES,
+    CompressionTier,
+    build_compressed_index_ddl,
+    get_indexdef,
+    hnsw_ef_search,
+    index_matches,
+)
+from app.db.vector_search import build_multi_query_statement
+from app.models.knowledge import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TierReport:
+    tier: str
+    index_name: str
+    index_bytes: int
+    rows: int
+    recall: float | None
+
+    @property
+    def bytes_per_row(self) -> float:
+        return self.index_bytes / self.rows if self.rows else 0.0
+
+
+def recall_at_k(approx_ids: Sequence[Any], exact_ids: Sequence[Any]) -> float:
+    # Fraccion del top-k exacto que tambien devolvio la busqueda aproximada
+    if not exact_ids:
+        return 1.0
+    return len(set(approx_ids) & set(exact_ids)) / len(exact_ids)
+
+
+def format_report(reports: Sequence[TierReport], k: int) -> str:
+    lines = [
+        f"{'nivel':<10} {'indice':<42} {'MB':>9} {'bytes/fila':>11} {'recall@' + str(k):>10}",  # noqa: E501
+    ]
+    for report in reports:
+        recall = "-" if report.recall is None else f"{report.recall:.3f}"
+        lines.append(
+            f"{report.tier:<10} {report.index_name:<42} "
+            f"{report.index_bytes / 1024 / 1024:>9.2f} "
+            f"{report.bytes_per_row:>11.1f} {recall:>10}"
+        )
+    return "\n".join(lines)
+
+
+async def migrate(tier: CompressionTier) -> None:
+    from app.core.session import engine
+
+    async with engine.connect() as conn:
+        # CONCURRENTLY no puede correr dentro de una transaccion
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if settings.RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM:
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                {"value": settings.RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM},
+            )
+        index_name = COMPRESSED_INDEX_NAMES[tier]
+        indexdef = await get_indexdef(conn, index_name)
+        if indexdef is not None and not index_matches(indexdef, "hnsw"):
+            # Parametros HNSW distintos: IF NOT EXISTS no lo reconstruiria
+            logger.info(f"Parametros de {index_name} cambiaron. Eliminando.")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+        logger.info(f"Construyendo {index_name} (CONCURRENTLY)...")
+        await conn.execute(text(build_compressed_index_ddl(tier, concurrently=True)))
+    logger.info("Indice comprimido listo. Activar RAG_VECTOR_COMPRESSION.")
+
+
+async def _existing_indexes(session: AsyncSession) -> dict[str, int]:
+    conn = await session.connection()
+    result = await conn.execute(
+        text(
+            "SELECT indexname, pg_relation_size(indexname::regclass) "
+            "FROM pg_indexes WHERE tablename = :table"
+        ),
+        {"table": KNOWLEDGE_TABLE},
+    )
+    return {str(row[0]): int(row[1]) for row in result.tuples()}
+
+
+async def _top_k_ids(
+    session: AsyncSession, vector: list[float], k: int, compression: str
+) -> list[Any]:
+    params: dict[str, object] = {"q0": vector, "limit": k}
+    if compression != "none":
+        params["candidates"] = k * settings.RAG_VECTOR_RESCORE_FACTOR
+    conn = await session.connection()
+    result = await conn.execute(build_multi_query_statement(1, compression), params)
+    return list(result.scalars())
+
+
+async def _search_ids(
+    vector: list[float], k: int, compression: str, exact: bool = False
+) -> list[Any]:
+    from app.core.session import async_session_factory
+
+    # Una transaccion por busqueda: los SET LOCAL no se filtran entre niveles
+    async with async_session_factory() as session:
+        conn = await session.connection()
+        if exact:
+            await conn.execute(
+                text("SELECT set_config('enable_indexscan', 'off', true)")
+            )
+        else:
+            await conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :value, true)"),
+                {"value": str(hnsw_ef_search(k * 10))},
+            )
+        return await _top_k_ids(session, vector, k, compression)
+
+
+async def build_report(sample_size: int, k: int) -> list[TierReport]:
+    """
+    Usa embeddings ya guardados como queries de prueba (recall optimista:
+    la query siempre esta en el corpus, sirve para comparar niveles entre si).
+    """
+    from app.core.session import async_session_factory
+
+    async with async_session_factory() as session:
+        indexes = await _existing_indexes(session)
+        rows = (
+            await session.exec(select(func.count()).select_from(KnowledgeBase))
+        ).one()
+        sample = await session.exec(
+            select(col(KnowledgeBase.embedding))
+            .where(col(KnowledgeBase.embedding).is_not(None))
+            .order_by(func.random())
+            .limit(sample_size)
+        )
+        queries = [
+            [float(value) for value in vector]
+            for vector in sample.all()
+            if vector is not None
+        ]
+
+    tiers: list[tuple[str, str, str]] = [
+        (method, name, "none") for method, name in VECTOR_INDEX_NAMES.items()
+    ]
+    tiers += [(tier, name, tier) for tier, name in COMPRESSED_INDEX_NAMES.items()]
+
+    exact = [await _search_ids(q, k, "none", exact=True) for q in queries]
+
+    reports: list[TierReport] = []
+    for tier, index_name, compression in tiers:
+        if index_name not in indexes:
+            continue
+        recalls = [
+            recall_at_k(await _search_ids(q, k, compression), truth)
+            for q, truth in zip(queries, exact, strict=True)
+        ]
+        reports.append(
+            TierReport(
+                tier=tier,
+                index_name=index_name,
+                index_bytes=indexes[index_name],
+                rows=rows,
+                recall=sum(recalls) / len(recalls) if recalls else None,
+            )
+        )
+    return reports
+
+
+async def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1] if __doc__ else None
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate")
+    migrate_parser.add_argument(
+        "--tier", choices=get_args(CompressionTier), required=True
+    )
+
+    report_parser = commands.add_parser("report")
+    report_parser.add_argument("--sample", type=int, default=100)
+    report_parser.add_argument("--k", type=int, default=10)
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        await migrate(args.tier)
+        return
+
+    reports = await build_report(args.sample, args.k)
+    print(format_report(reports, args.k))
+
+
+def run() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,134 @@
+from collections.abc import Sequence
+from typing import Any, cast
+
+from pgvector.sqlalchemy import Vector  # type: ignore
+from sqlalchemy import TextClause, bindparam
+from sqlalchemy.types import TypeEngine
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.search_indexes import EMBEDDING_DIMENSIONS, KNOWLEDGE_TABLE
+from app.models.knowledge import KnowledgeBase
+
+# Distancia de la primera etapa por nivel comprimido. Debe coincidir con la
+# expresion del indice (COMPRESSED_INDEX_EXPRESSIONS) para que Postgres lo use.
+_FIRST_STAGE_DISTANCE = {
+    "halfvec": (
+        f"t.embedding::halfvec({EMBEDDING_DIMENSIONS}) "
+        f"<=> q.vec::halfvec({EMBEDDING_DIMENSIONS})"
+    ),
+    "binary": (
+        f"binary_quantize(t.embedding)::bit({EMBEDDING_DIMENSIONS}) "
+        "<~> binary_quantize(q.vec)"
+    ),
+}
+
+# pgvector no trae stubs: el tipo de columna queda como TypeEngine generico
+_VECTOR_TYPE = cast("TypeEngine[Any]", Vector(EMBEDDING_DIMENSIONS))
+
+
+def document_from_row(row: Any) -> KnowledgeBase:
+    # Documento liviano (sin embedding) a partir de una fila proyectada
+    return KnowledgeBase(
+        id=row.id,
+        title=row.title,
+        content=row.content,
+        source=row.source,
+        created_at=row.created_at,
+    )
+
+
+def _top_k_subquery(table: str, compression: str) -> str:
+    if compression == "none":
+        return f"""
+                SELECT t.id, t.embedding <=> q.vec AS distance
+                FROM {table} AS t
+                ORDER BY t.embedding <=> q.vec
+                LIMIT :limit"""
+
+    # Dos etapas: ANN sobre la version comprimida (indice chico) y
+    # re-puntuacion exacta de esos candidatos con el vector float32
+    return f"""
+                SELECT s.id, s.embedding <=> q.vec AS distance
+                FROM (
+                    SELECT t.id, t.embedding
+                    FROM {table} AS t
+                    ORDER BY {_FIRST_STAGE_DISTANCE[compression]}
+                    LIMIT :candidates
+                ) AS s
+                ORDER BY distance
+                LIMIT :limit"""
+
+
+def build_multi_query_statement(
+    query_count: int, compression: str = "none"
+) -> TextClause:
+    """
+    Una sola consulta para N vectores de busqueda:
+    - VALUES con un vector por query.
+    - LATERAL: top-k por vector (cada uno puede usar el indice ANN).
+    - GROUP BY id: deduplicacion en Postgres, nos quedamos con la menor distancia.
+    La columna embedding no se devuelve: no hace falta para el reranking.
+    Con compresion, el top-k sale de re-puntuar ':candidates' filas del indice
+    comprimido contra la precision completa.
+    """
+    if query_count < 1:
+        msg = "Se necesita al menos un vector de busqueda"
+        raise ValueError(msg)
+    if compression != "none" and compression not in _FIRST_STAGE_DISTANCE:
+        msg = f"Nivel de compresion desconocido: {compression}"
+        raise ValueError(msg)
+
+    table = KNOWLEDGE_TABLE
+    values = ", ".join(
+        f"(CAST(:q{i} AS vector({EMBEDDING_DIMENSIONS})))" for i in range(query_count)
+    )
+    statement = text(
+        f"""
+        SELECT kb.id, kb.title, kb.content, kb.source, kb.created_at, best.distance
+        FROM (
+            SELECT c.id, MIN(c.distance) AS distance
+            FROM (VALUES {values}) AS q(vec)
+            CROSS JOIN LATERAL ({_top_k_subquery(table, compression)}
+            ) AS c
+            GROUP BY c.id
+        ) AS best
+        JOIN {table} AS kb ON kb.id = best.id
+        ORDER BY best.distance
+        """
+    )
+    return statement.bindparams(
+        *(bindparam(f"q{i}", type_=_VECTOR_TYPE) for i in range(query_count))
+    )
+
+
+def first_stage_candidates(limit: int) -> int:
+    # Filas que debe devolver el indice comprimido antes de re-puntuar
+    if settings.RAG_VECTOR_COMPRESSION == "none":
+        return limit
+    return limit * settings.RAG_VECTOR_RESCORE_FACTOR
+
+
+async def multi_query_search(
+    session: AsyncSession, vectors: Sequence[list[float]], limit: int
+) -> list[KnowledgeBase]:
+    """
+    Candidatos para todas las variantes de la pregunta en un solo round trip.
+    Devuelve documentos unicos ordenados por su mejor distancia coseno.
+    """
+    if not vectors:
+        return []
+
+    compression = settings.RAG_VECTOR_COMPRESSION
+    params: dict[str, object] = {f"q{i}": list(v) for i, v in enumerate(vectors)}
+    params["limit"] = limit
+    if compression != "none":
+        params["candidates"] = first_stage_candidates(limit)
+
+    conn = await session.connection()
+    result = await conn.execute(
+        build_multi_query_statement(len(vectors), compression), params
+    )
+
+    return [document_from_row(row) for row in result.all()]
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable
+from dataclasses import dataclass, field
+from typing import Any, cast
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+from app.core.config import settings
+from app.core.observability import AGENT_BUDGET_EXHAUSTED_TOTAL, increment_counter
+
+logger = logging.getLogger(__name__)
+
+# Tag de las llamadas que siempre deben correr (la respuesta final al usuario)
+BUDGET_EXEMPT_TAG = "budget_exempt"
+# Marca de los reportes de workers cortados por el presupuesto
+BUDGET_INTERRUPTED_KEY = "budget_interrupted"
+
+
+class BudgetExhaustedError(Exception):
+    pass
+
+
+@dataclass
+class RequestBudget:
+    """
+    Presupuesto de una peticion al agente: tiempo, llamadas al LLM y tokens.
+    Viaja en config["configurable"]["budget"]; los nodos lo consultan para
+    degradar (ir directo al especialista con lo ya reunido) al agotarse.
+    """
+
+    timeout_seconds: float
+    max_llm_calls: int
+    max_tokens: int
+    llm_calls: int = 0
+    tokens: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    exhausted_reason: str | None = None
+
+    @classmethod
+    def from_settings(cls) -> "RequestBudget":
+        return cls(
+            timeout_seconds=settings.AGENT_REQUEST_TIMEOUT_SECONDS,
+            max_llm_calls=settings.AGENT_MAX_LLM_CALLS,
+            max_tokens=settings.AGENT_MAX_TOKENS,
+        )
+
+    def remaining_seconds(self) -> float:
+        return max(self.timeout_seconds - (time.monotonic() - self.started_at), 0.0)
+
+    def exhausted(self) -> str | None:
+        """Motivo del agotamiento (deadline / llm_calls / tokens) o None."""
+        if self.exhausted_reason is not None:
+            return self.exhausted_reason
+
+        reason = None
+        if self.remaining_seconds() <= 0:
+            reason = "deadline"
+        elif self.llm_calls >= self.max_llm_calls:
+            reason = "llm_calls"
+        elif self.tokens >= self.max_tokens:
+            reason = "tokens"
+
+        if reason is not None:
+            # Una sola vez por peticion: el total y el desglose por motivo
+            self.exhausted_reason = reason
+            increment_counter(AGENT_BUDGET_EXHAUSTED_TOTAL)
+            increment_counter(f"{AGENT_BUDGET_EXHAUSTED_TOTAL}_{reason}")
+            logger.warning(
+                f"Presupuesto agotado ({reason}): {self.llm_calls} llamadas, "
+                f"{self.tokens} tokens, {self.remaining_seconds():.1f}s restantes"
+            )
+        return reason
+
+
+class BudgetCallbackHandler(AsyncCallbackHandler):
+    """
+    Cuenta llamadas y tokens de todos los LLM del grafo (incluidos los
+    sub-agentes ReAct) y corta las que exceden el presupuesto.
+    """
+
+    # Sin esto LangChain solo registraria la excepcion y seguiria la llamada
+    raise_error = True
+
+    def __init__(self, budget: RequestBudget) -> None:
+        self.budget = budget
+
+    async def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        reason = self.budget.exhausted()
+        if reason is not None and BUDGET_EXEMPT_TAG not in (tags or []):
+            raise BudgetExhaustedError(reason)
+        self.budget.llm_calls += 1
+
+    async def on_llm_end(
+        self,
+        response: LLMResult,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.budget.tokens += _total_tokens(response)
+
+
+def _total_tokens(response: LLMResult) -> int:
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                total += int(usage.get("total_tokens", 0))
+    if total:
+        return total
+    # Proveedores que solo informan el uso en llm_output (OpenAI compatible)
+    # llm_output / additional_kwargs son 'dict' sin parametros en LangChain
+    llm_output: dict[str, Any] = cast(Any, response).llm_output or {}
+    token_usage = cast(dict[str, Any], llm_output.get("token_usage") or {})
+    return int(token_usage.get("total_tokens", 0))
+
+
+def interrupted_report(worker: str) -> AIMessage:
+    """
+    Aviso de un worker cortado por el presupuesto. Lleva el nombre del worker
+    para el especialista, pero no cuenta como reporte real (ver worker_of):
+    en el hilo el paciente se vuelve a consultar en el siguiente turno.
+    """
+    return AIMessage(
+        content=(
+            f"Respuesta del {worker}: consulta interrumpida por limite de tiempo "
+            "o de presupuesto; no hay informacion adicional de este agente."
+        ),
+        name=worker,
+        additional_kwargs={BUDGET_INTERRUPTED_KEY: True},
+    )
+
+
+def is_interrupted_report(message: BaseMessage) -> bool:
+    additional_kwargs: dict[str, Any] = cast(Any, message).additional_kwargs
+    return bool(additional_kwargs.get(BUDGET_INTERRUPTED_KEY))
+
+
+def budget_config(
+    budget: RequestBudget, config: RunnableConfig | None = None
+) -> RunnableConfig:
+    """Agrega el presupuesto (y su callback) a la config de la ejecucion del grafo."""
+    config = RunnableConfig(**(config or {}))
+    callbacks = config.get("callbacks") or []
+    if not isinstance(callbacks, list):
+        msg = "budget_config espera los callbacks como lista"
+        raise TypeError(msg)
+    config["configurable"] = {**config.get("configurable", {}), "budget": budget}
+    config["callbacks"] = [*callbacks, BudgetCallbackHandler(budget)]
+    return config
+
+
+def get_budget(config: RunnableConfig | None) -> RequestBudget | None:
+    configurable = (config or {}).get("configurable") or {}
+    budget = configurable.get("budget")
+    return budget if isinstance(budget, RequestBudget) else None
+
+
+def budget_exhausted(config: RunnableConfig | None) -> str | None:
+    budget = get_budget(config)
+    return budget.exhausted() if budget is not None else None
+
+
+async def within_deadline[T](
+    awaitable: Awaitable[T], config: RunnableConfig | None
+) -> T:
+    """Espera como maximo el tiempo restante de la peticion (TimeoutError si no)."""
+    budget = get_budget(config)
+    if budget is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout=budget.remaining_seconds())
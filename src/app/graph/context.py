@@ -0,0 +1,195 @@
+import logging
+from collections.abc import Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from app.core.config import settings
+from app.core.observability import (
+    GRAPH_CONTEXT_TRUNCATED_TOTAL,
+    GRAPH_PROMPT_TOKENS,
+    increment_counter,
+    observe_histogram,
+)
+from app.core.patient_refs import patient_references
+from app.graph.nodes.pre_router import worker_of
+
+logger = logging.getLogger(__name__)
+
+# Misma aproximacion que count_tokens_approximately (sin tokenizer del modelo)
+_CHARS_PER_TOKEN = 4
+_TRUNCATED_MARK = " …[recortado]"
+# Parte minima por mensaje al repartir: al menos el encabezado del reporte
+_MIN_SHARE_TOKENS = 20
+
+
+def count_tokens(messages: Sequence[BaseMessage | str]) -> int:
+    return count_tokens_approximately(
+        [m if isinstance(m, BaseMessage) else HumanMessage(content=m) for m in messages]
+    )
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    max_chars = max(max_tokens, 0) * _CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    increment_counter(GRAPH_CONTEXT_TRUNCATED_TOTAL)
+    # La marca de recorte tambien cuenta dentro del limite
+    keep = max(max_chars - len(_TRUNCATED_MARK), 0)
+    return text[:keep].rstrip() + _TRUNCATED_MARK
+
+
+def _shorten(message: BaseMessage, max_tokens: int) -> BaseMessage:
+    text = message.text
+    # Los reportes conservan su encabezado: el supervisor decide por el
+    worker = worker_of(message)
+    if worker is not None and not text.startswith(f"Respuesta del {worker}"):
+        text = f"Respuesta del {worker}: {text}"
+    # El rol / nombre del mensaje tambien consume tokens del limite
+    overhead = count_tokens([message.model_copy(update={"content": ""})])
+    shortened = truncate_text(text, max_tokens - overhead)
+    if shortened == message.text:
+        return message
+    return message.model_copy(update={"content": shortened})
+
+
+def _current_turn_start(messages: Sequence[BaseMessage]) -> int:
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return index
+    return 0
+
+
+def _fit_newest_first(
+    messages: Sequence[BaseMessage], budget: int
+) -> list[BaseMessage]:
+    # Conserva los mensajes mas recientes que entran en el presupuesto
+    kept: list[BaseMessage] = []
+    remaining = budget
+    for message in reversed(messages):
+        cost = count_tokens([message])
+        if cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+    return list(reversed(kept))
+
+
+def _share_budget(messages: Sequence[BaseMessage], budget: int) -> list[BaseMessage]:
+    # Entran todos: si no caben, cada uno se recorta a su parte del presupuesto
+    if not messages or count_tokens(messages) <= budget:
+        return list(messages)
+    share = max(budget // len(messages), _MIN_SHARE_TOKENS)
+    return [_shorten(m, share) for m in messages]
+
+
+def supervisor_view(messages: Sequence[BaseMessage]) -> list[BaseMessage]:
+    """
+    El supervisor solo planifica: ve la pregunta actual completa y el resto
+    resumido (cada reporte reducido a su encabezado + inicio). Los turnos
+    anteriores entran mientras alcance el presupuesto.
+    """
+    if not messages:
+        return []
+    start = _current_turn_start(messages)
+    summary_tokens = settings.GRAPH_CONTEXT_SUMMARY_TOKENS
+    current = [messages[start]] + [
+        _shorten(m, summary_tokens) for m in messages[start + 1 :]
+    ]
+    previous = [_shorten(m, summary_tokens) for m in messages[:start]]
+    budget = settings.GRAPH_CONTEXT_SUPERVISOR_TOKENS - count_tokens(current)
+    return _fit_newest_first(previous, budget) + current
+
+
+def _reports_about(
+    messages: Sequence[BaseMessage], references: set[str]
+) -> list[BaseMessage]:
+    # Un reporte pertenece al paciente de la pregunta de su turno
+    reports: list[BaseMessage] = []
+    turn_refs: set[str] = set()
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            turn_refs = patient_references(message.text)
+        elif worker_of(message) is not None and turn_refs & references:
+            reports.append(message)
+    return reports
+
+
+def _thread_references(messages: Sequence[BaseMessage], start: int) -> set[str]:
+    """Pacientes de la pregunta actual o, en un seguimiento, del ultimo citado."""
+    for message in reversed(messages[: start + 1]):
+        if isinstance(message, HumanMessage):
+            references = patient_references(message.text)
+            if references:
+                return references
+    return set()
+
+
+def worker_view(messages: Sequence[BaseMessage], worker: str) -> list[BaseMessage]:
+    """
+    Un worker ve la pregunta del usuario y solo los reportes relevantes:
+    los de otros workers en este turno y, de turnos anteriores, los del
+    mismo paciente. Sin respuestas finales ni los dumps de otros temas.
+    """
+    if not messages:
+        return []
+    start = _current_turn_start(messages)
+    question = messages[start]
+
+    current = [m for m in messages[start + 1 :] if worker_of(m) not in (None, worker)]
+    history_tokens = settings.GRAPH_CONTEXT_HISTORY_MESSAGE_TOKENS
+    previous = [
+        _shorten(m, history_tokens)
+        for m in _reports_about(messages[:start], _thread_references(messages, start))
+    ]
+
+    budget = settings.GRAPH_CONTEXT_WORKER_TOKENS - count_tokens([question])
+    # Reportes primero (mas antiguo) y la pregunta al final, como en el chat
+    return _fit_newest_first(previous + current, budget) + [question]
+
+
+def specialist_view(messages: Sequence[BaseMessage]) -> list[BaseMessage]:
+    """
+    El especialista ve todo: la pregunta, los reportes del turno actual y los
+    reportes previos del paciente en curso (los datos que no se volvieron a
+    consultar), repartiendo el presupuesto entre ellos si no entran; despues,
+    los turnos anteriores truncados mientras quede presupuesto.
+    """
+    if not messages:
+        return []
+    start = _current_turn_start(messages)
+    question = messages[start]
+    previous = messages[:start]
+    patient_ids = {
+        id(m) for m in _reports_about(previous, _thread_references(messages, start))
+    }
+    pinned = [i for i, m in enumerate(previous) if id(m) in patient_ids]
+    others = [i for i, m in enumerate(previous) if id(m) not in patient_ids]
+
+    # Reportes del turno y del paciente no se descartan: si no caben se recortan
+    budget = settings.GRAPH_CONTEXT_SPECIALIST_TOKENS - count_tokens([question])
+    shared = _share_budget(
+        [previous[i] for i in pinned] + list(messages[start + 1 :]), budget
+    )
+    kept = dict(zip(pinned, shared[: len(pinned)], strict=True))
+    reports = shared[len(pinned) :]
+
+    history_tokens = settings.GRAPH_CONTEXT_HISTORY_MESSAGE_TOKENS
+    fitted = _fit_newest_first(
+        [_shorten(previous[i], history_tokens) for i in others],
+        budget - count_tokens(shared),
+    )
+    kept.update(zip(others[len(others) - len(fitted) :], fitted, strict=True))
+
+    history = [kept[i] for i in sorted(kept)]
+    return history + [question] + reports
+
+
+def record_prompt_tokens(
+    node: str, system_prompt: str, messages: Sequence[BaseMessage]
+) -> int:
+    """Tokens (aprox.) del prompt que recibe cada nodo: /metrics por nodo."""
+    tokens = count_tokens([system_prompt, *messages])
+    observe_histogram(f"{GRAPH_PROMPT_TOKENS}_{node.lower()}", tokens)
+    logger.debug(f"Prompt de {node}: ~{tokens} tokens en {len(messages)} mensajes")
+    return tokens
@@ -0,0 +1,218 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.core.config import settings
+from app.core.observability import (
+    PRE_ROUTER_CLASSIFIER_TOTAL,
+    PRE_ROUTER_FALLBACK_RATE,
+    PRE_ROUTER_FALLBACK_TOTAL,
+    PRE_ROUTER_RULE_TOTAL,
+    get_counter_value,
+    increment_counter,
+    set_gauge,
+)
+from app.core.patient_refs import patient_references
+from app.graph.budget import budget_exhausted, is_interrupted_report
+from app.graph.routing import WORKER_NODES
+from app.graph.state import AgentState
+from app.services.route_classifier import route_classifier
+
+logger = logging.getLogger(__name__)
+
+# Pedido explicito de teoria medica (guias, tratamiento, diagnostico...)
+_THEORY_PATTERN = re.compile(
+    r"\b(gu[ií]as?|protocolos?|tratamientos?|tratar|dosis|diagn[oó]stic\w*|"
+    r"s[ií]ntomas?|causas?|qu[eé] es|recomienda\w*|recomendaci[oó]n\w*|"
+    r"literatura|evidencia|es normal|criterios?)\b",
+    re.IGNORECASE,
+)
+_SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hola|buen[oa]s?\s+(d[ií]as|tardes|noches)|gracias|muchas gracias|"
+    r"adi[oó]s|hasta luego|ok|vale)\W*\s*$",
+    re.IGNORECASE,
+)
+
+_FINISH = "FINISH"
+
+
+@dataclass
+class RouteDecision:
+    # Workers a ejecutar (vacio = FINISH)
+    workers: list[str]
+    confidence: float
+    source: str
+    reason: str
+
+    @property
+    def label(self) -> str:
+        return "+".join(sorted(self.workers)) or _FINISH
+
+
+def latest_user_text(messages: list[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.text
+    return ""
+
+
+def worker_of(message: BaseMessage) -> str | None:
+    """Worker autor del reporte; None si no es un reporte real de un worker."""
+    # Los avisos de presupuesto agotado no traen datos: no cuentan como reporte
+    if not isinstance(message, AIMessage) or is_interrupted_report(message):
+        return None
+    content = message.text
+    for worker in WORKER_NODES:
+        if message.name == worker or content.startswith(f"Respuesta del {worker}"):
+            return worker
+    return None
+
+
+def workers_replied(messages: list[BaseMessage]) -> set[str]:
+    """Workers que ya respondieron en el turno actual (tras el ultimo humano)."""
+    replied: set[str] = set()
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        worker = worker_of(message)
+        if worker is not None:
+            replied.add(worker)
+    return replied
+
+
+def patients_in_thread(messages: list[BaseMessage]) -> set[str]:
+    """
+    Pacientes cuyos datos ya trajo el DATA_AGENT en turnos anteriores del hilo
+    (checkpointer): su reporte sigue en el historial y no se vuelve a consultar.
+    """
+    covered: set[str] = set()
+    turn_refs: set[str] = set()
+    last_human = max(
+        (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0
+    )
+    for message in messages[:last_human]:
+        if isinstance(message, HumanMessage):
+            turn_refs = patient_references(message.text)
+        elif worker_of(message) == "DATA_AGENT":
+            covered |= turn_refs
+    return covered
+
+
+def rule_based_route(
+    messages: list[BaseMessage], parallel: bool
+) -> RouteDecision | None:
+    """
+    Reglas deterministas que replican las del prompt del supervisor para los
+    casos obvios. None = sin regla aplicable.
+    """
+    text = latest_user_text(messages)
+    replied = workers_replied(messages)
+    references = patient_references(text)
+    # Pacientes ya consultados en el hilo: se reutiliza el reporte previo
+    reused = references & patients_in_thread(messages)
+    wants_patient = bool(references - reused)
+    wants_theory = bool(_THEORY_PATTERN.search(text))
+
+    if set(WORKER_NODES) <= replied:
+        return RouteDecision([], 1.0, "rules", "ambos workers respondieron")
+
+    if not replied and _SMALL_TALK_PATTERN.match(text):
+        return RouteDecision([], 0.95, "rules", "saludo / charla")
+
+    pending: list[str] = []
+    if wants_patient and "DATA_AGENT" not in replied:
+        pending.append("DATA_AGENT")
+    if wants_theory and "DOCS_AGENT" not in replied:
+        pending.append("DOCS_AGENT")
+
+    if pending:
+        # Secuencial: primero los datos del paciente (igual que el supervisor)
+        workers = pending if parallel else pending[:1]
+        confidence = 0.95 if wants_patient and "DATA_AGENT" in pending else 0.9
+        return RouteDecision(workers, confidence, "rules", "pedido explicito")
+
+    if replied:
+        # Ya respondio el worker pedido y no se pidio nada mas (anti-alucinacion)
+        return RouteDecision([], 0.9, "rules", "worker ya respondio")
+
+    if reused:
+        return RouteDecision([], 0.9, "rules", "datos del paciente ya en el hilo")
+
+    return None
+
+
+def _decision_update(decision: RouteDecision) -> dict[str, Any]:
+    workers = decision.workers
+    return {
+        "next": workers[0] if workers else _FINISH,
+        "workers": workers,
+        "pre_routed": True,
+    }
+
+
+def _record(source_counter: str | None) -> None:
+    if source_counter is None:
+        increment_counter(PRE_ROUTER_FALLBACK_TOTAL)
+    else:
+        increment_counter(source_counter)
+
+    fallback = get_counter_value(PRE_ROUTER_FALLBACK_TOTAL)
+    total = (
+        fallback
+        + get_counter_value(PRE_ROUTER_RULE_TOTAL)
+        + get_counter_value(PRE_ROUTER_CLASSIFIER_TOTAL)
+    )
+    set_gauge(PRE_ROUTER_FALLBACK_RATE, fallback / max(total, 1))
+
+
+async def pre_router_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> dict[str, Any]:
+    """
+    Decide el siguiente paso sin LLM cuando es obvio:
+    0. Presupuesto de la peticion agotado -> directo al especialista.
+    1. Reglas (ID o nombre de paciente, pedido de guias, ambos workers listos).
+    2. Clasificador por embeddings entrenado con las decisiones del supervisor
+       (solo en el primer paso del turno).
+    3. Si nada supera GRAPH_PRE_ROUTER_MIN_CONFIDENCE -> supervisor LLM.
+    """
+    reason = budget_exhausted(config)
+    if reason is not None:
+        logger.info(f"Pre-router: presupuesto agotado ({reason}), FINISH")
+        return _decision_update(RouteDecision([], 1.0, "budget", reason))
+
+    messages = state.get("messages", [])
+    threshold = settings.GRAPH_PRE_ROUTER_MIN_CONFIDENCE
+    parallel = settings.GRAPH_PARALLEL_DISPATCH
+
+    decision = rule_based_route(messages, parallel)
+    if decision is not None and decision.confidence >= threshold:
+        _record(PRE_ROUTER_RULE_TOTAL)
+        logger.info(
+            f"Pre-router (reglas): {decision.label} "
+            f"conf={decision.confidence:.2f} ({decision.reason})"
+        )
+        return _decision_update(decision)
+
+    if not workers_replied(messages):
+        prediction = await route_classifier.predict(latest_user_text(messages))
+        if prediction is not None and prediction.confidence >= threshold:
+            workers = [w for w in prediction.label.split("+") if w in WORKER_NODES]
+            if not parallel:
+                workers = workers[:1]
+            _record(PRE_ROUTER_CLASSIFIER_TOTAL)
+            logger.info(
+                f"Pre-router (clasificador): {prediction.label} "
+                f"conf={prediction.confidence:.2f}"
+            )
+            return _decision_update(
+                RouteDecision(workers, prediction.confidence, "classifier", "")
+            )
+
+    _record(None)
+    logger.info("Pre-router: sin decision confiable, se consulta al supervisor LLM")
+    return {"pre_routed": False}
@@ -1,15 +1,29 @@
+import asyncio
+import logging
+
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from app.core.config import settings
+from app.graph.budget import BUDGET_EXEMPT_TAG
+from app.graph.context import record_prompt_tokens, specialist_view
 from app.graph.prompt import SPECIALIST_PROMPT
 from app.graph.state import AgentState
 from app.services.llm_service import llm_service
 
+logger = logging.getLogger(__name__)
+
+_TIMEOUT_RESPONSE = (
+    "No pude completar la respuesta a tiempo. Por favor, intenta de nuevo "
+    "con una consulta mas concreta."
+)
+
 
 async def specialist_node(state: AgentState):
     """
     Nodo final que genera la respuesta al usuario.
     """
-    # 1. Construimos el prompt con todo el historial
+    # 1. Construimos el prompt con el historial
     prompt = ChatPromptTemplate.from_messages(  # type: ignore
         [
             ("system", SPECIALIST_PROMPT),
@@ -21,8 +35,24 @@ async def specialist_node(state: AgentState):
     # Cadena
     chain = prompt | llm_service.llm  # type: ignore
 
+    # Todo el historial, truncado a GRAPH_CONTEXT_SPECIALIST_TOKENS
+    messages = specialist_view(state["messages"])
+    record_prompt_tokens("specialist", SPECIALIST_PROMPT, messages)
+
     # Invocacion al llm
-    response = await chain.ainvoke(state)  # type: ignore
+    # Exenta del presupuesto (siempre hay respuesta final con lo reunido), pero
+    # con su propio limite: la peticion dura como maximo
+    # AGENT_REQUEST_TIMEOUT_SECONDS + AGENT_SPECIALIST_TIMEOUT_SECONDS
+    try:
+        response = await asyncio.wait_for(
+            chain.ainvoke(  # type: ignore
+                {"messages": messages}, config={"tags": [BUDGET_EXEMPT_TAG]}
+            ),
+            timeout=settings.AGENT_SPECIALIST_TIMEOUT_SECONDS,
+        )
+    except TimeoutError:
+        logger.warning("El especialista excedio AGENT_SPECIALIST_TIMEOUT_SECONDS")
+        response = AIMessage(content=_TIMEOUT_RESPONSE)
 
     # Retorno del mensaje final
     return {"messages": [response]}
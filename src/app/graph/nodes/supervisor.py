@@ -1,11 +1,24 @@
-from typing import Literal
+import asyncio
+import logging
+from typing import Any, Literal, cast
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
 
-from app.graph.prompt import SUPERVISOR_PROMPT
+from app.core.config import settings
+from app.graph.budget import budget_exhausted, within_deadline
+from app.graph.context import record_prompt_tokens, supervisor_view
+from app.graph.nodes.pre_router import latest_user_text, workers_replied
+from app.graph.prompt import SUPERVISOR_PARALLEL_PROMPT, SUPERVISOR_PROMPT
 from app.graph.state import AgentState
 from app.services.llm_service import llm_service
+from app.services.route_classifier import route_classifier
+
+logger = logging.getLogger(__name__)
+
+# Entrenamientos del clasificador en curso (referencia fuerte hasta terminar)
+_learning_tasks: set[asyncio.Task[None]] = set()
 
 # Definimos las opciones de ruteo (El "menu" del supervisor)
 # FINISH: Cuando ya tiene la respuesta final para el usuario
@@ -20,6 +33,17 @@ class RouteResponse(BaseModel):
     )
 
 
+WorkerName = Literal["DOCS_AGENT", "DATA_AGENT"]
+
+
+# Modo paralelo: lista de workers a ejecutar a la vez (vacia = FINISH)
+class ParallelRouteResponse(BaseModel):
+    workers: list[WorkerName] = Field(
+        default_factory=list[WorkerName],
+        description="Workers a ejecutar en paralelo; lista vacia para terminar",
+    )
+
+
 # Prompt del supervisor
 SYSTEM_PROMPT = SUPERVISOR_PROMPT
 
@@ -35,23 +59,127 @@ prompt = ChatPromptTemplate.from_messages(  # type: ignore
     ]
 ).partial(options=str(options))
 
+parallel_prompt = ChatPromptTemplate.from_messages(  # type: ignore
+    [
+        ("system", SUPERVISOR_PARALLEL_PROMPT),
+        MessagesPlaceholder(variable_name="messages"),
+        (
+            "system",
+            "Dada la conversacion anterior, ¿que workers deberian actuar ahora? "
+            "Selecciona cero, uno o varios de: {options}",
+        ),
+    ]
+).partial(options=str(options[:-1]))
+
+
+async def _parallel_supervisor(
+    state: AgentState, config: RunnableConfig | None
+) -> tuple[dict[str, Any], bool]:
+    """Decision del supervisor y si vino del LLM (False = FINISH por error)."""
+    supervisor_chain = parallel_prompt | llm_service.llm.with_structured_output(  # type: ignore
+        ParallelRouteResponse, method="json_mode"
+    )
+
+    # Vista resumida del historial dentro de GRAPH_CONTEXT_SUPERVISOR_TOKENS
+    messages = supervisor_view(state["messages"])
+    record_prompt_tokens("supervisor", SUPERVISOR_PARALLEL_PROMPT, messages)
+
+    try:
+        # Acotada por el deadline de la peticion (TimeoutError -> FINISH)
+        result = cast(
+            ParallelRouteResponse | None,
+            await within_deadline(
+                supervisor_chain.ainvoke({"messages": messages}),  # type: ignore
+                config,
+            ),
+        )
+        if not result:
+            return {"next": "FINISH", "workers": []}, False
+        workers = list(result.workers)
+    except Exception as e:
+        # Si el llm alucina, terminamos para evitar bucles
+        logger.warning(f"Error en supervisor: {e}")
+        return {"next": "FINISH", "workers": []}, False
+
+    return {"next": workers[0] if workers else "FINISH", "workers": workers}, True
+
+
+async def _learn(text: str, label: str) -> None:
+    try:
+        await route_classifier.learn(text, label)
+    except Exception as e:
+        logger.warning(f"Error entrenando el clasificador de rutas: {e}")
+
+
+def _learn_route(state: AgentState, update: dict[str, Any]) -> None:
+    """
+    Las decisiones del LLM en el primer paso del turno entrenan al clasificador
+    del pre-router (los pasos posteriores dependen de las respuestas previas).
+    Corre en segundo plano: el embedding no retrasa al siguiente nodo.
+    """
+    messages = state.get("messages", [])
+    if not settings.GRAPH_PRE_ROUTER_ENABLED or workers_replied(messages):
+        return
+    workers = update.get("workers")
+    if workers is None:
+        workers = [] if update["next"] == "FINISH" else [update["next"]]
+    label = "+".join(sorted(workers)) or "FINISH"
+    task = asyncio.create_task(_learn(latest_user_text(messages), label))
+    _learning_tasks.add(task)
+    task.add_done_callback(_learning_tasks.discard)
+
+
+async def wait_for_learning() -> None:
+    # Espera los entrenamientos en curso (al apagar, antes de guardar)
+    await asyncio.gather(*_learning_tasks)
+
 
 # El nodo supervisor
-async def supervisor_node(state: AgentState):  # type: ignore
+async def supervisor_node(
+    state: AgentState, config: RunnableConfig | None = None
+) -> dict[str, Any]:
+    # Presupuesto agotado: sin otra llamada al LLM, el especialista responde
+    # con lo ya reunido
+    if budget_exhausted(config):
+        return {"next": "FINISH", "workers": []}
+
+    if settings.GRAPH_PARALLEL_DISPATCH:
+        update, decided = await _parallel_supervisor(state, config)
+    else:
+        update, decided = await _sequential_supervisor(state, config)
+    # Los FINISH por error del LLM no son decisiones: no se aprenden
+    if decided:
+        _learn_route(state, update)
+    return update
+
+
+async def _sequential_supervisor(
+    state: AgentState, config: RunnableConfig | None
+) -> tuple[dict[str, Any], bool]:
     supervisor_chain = prompt | llm_service.llm.with_structured_output(  # type: ignore
         RouteResponse, method="json_mode"
     )
 
+    messages = supervisor_view(state["messages"])
+    record_prompt_tokens("supervisor", SYSTEM_PROMPT, messages)
+
     try:
-        result = await supervisor_chain.ainvoke(state)  # type: ignore
+        # Acotada por el deadline de la peticion (TimeoutError -> FINISH)
+        result = cast(
+            RouteResponse | None,
+            await within_deadline(
+                supervisor_chain.ainvoke({"messages": messages}),  # type: ignore
+                config,
+            ),
+        )
 
         # Si el parsing falla, terminamos
-        if not result or not result.next:  # type: ignore
-            return {"next": "FINISH"}
+        if not result or not result.next:
+            return {"next": "FINISH"}, False
 
-        return {"next": result.next}  # type: ignore
+        return {"next": result.next}, True
 
     except Exception as e:
         # Si el llm alucina, terminamos para evitar bucles
-        print(f"Error en supervisor: {e}")
-        return {"next": "FINISH"}
+        logger.warning(f"Error en supervisor: {e}")
+        return {"next": "FINISH"}, False
@@ -0,0 +1,85 @@
+from collections.abc import Hashable
+from typing import Any, Literal
+
+from langgraph.graph import StateGraph  # type: ignore
+from langgraph.types import Send  # type: ignore
+
+from app.graph.state import AgentState
+
+WORKER_NODES = ("DOCS_AGENT", "DATA_AGENT")
+
+# path_map de add_conditional_edges: dict[Hashable, str]
+_SUPERVISOR_PATHS: dict[Hashable, str] = {
+    "DOCS_AGENT": "DOCS_AGENT",
+    "DATA_AGENT": "DATA_AGENT",
+    "FINISH": "specialist",
+}
+
+_PRE_ROUTER_PATHS: dict[Hashable, str] = {
+    **_SUPERVISOR_PATHS,
+    "SUPERVISOR": "supervisor",
+}
+
+
+def route_supervisor(
+    state: AgentState,
+) -> Literal["DOCS_AGENT", "DATA_AGENT", "FINISH"]:
+    """
+    Función de enrutamiento segura.
+    Reemplaza la lambda para evitar errores de tipo si 'next' es None.
+    """
+    next_node = state.get("next")
+
+    # Mapeo de seguridad: Si el supervisor falló o mandó FINISH -> END
+    if next_node == "FINISH" or not next_node:
+        return "FINISH"
+
+    # Si devuelve DOCS_AGENT o DATA_AGENT
+    return next_node  # type: ignore
+
+
+def dispatch_workers(state: AgentState) -> list[Send] | Literal["FINISH"]:
+    """
+    Fan-out: un Send por worker pedido. Todos corren en el mismo paso del
+    grafo y sus mensajes se combinan con el reducer add_messages antes de
+    volver (una sola vez) al supervisor.
+    """
+    workers = [
+        w for w in dict.fromkeys(state.get("workers") or []) if w in WORKER_NODES
+    ]
+    if not workers:
+        return "FINISH"
+    return [Send(worker, state) for worker in workers]
+
+
+def route_pre_router(parallel: bool) -> Any:
+    """
+    Enrutamiento tras el pre-router: si decidio con confianza se sigue su
+    decision (igual que la del supervisor); si no, se consulta al supervisor LLM.
+    """
+    router = dispatch_workers if parallel else route_supervisor
+
+    def _route(state: AgentState) -> Any:
+        if not state.get("pre_routed"):
+            return "SUPERVISOR"
+        return router(state)
+
+    return _route
+
+
+def add_supervisor_edges(
+    workflow: StateGraph[Any], parallel: bool, pre_router: bool = False
+) -> None:
+    # Del supervisor a los workers (uno por turno o varios en paralelo)
+    router = dispatch_workers if parallel else route_supervisor
+    workflow.add_conditional_edges("supervisor", router, _SUPERVISOR_PATHS)  # type: ignore
+
+    # El ciclo de retorno: Los workers SIEMPRE reportan de vuelta al supervisor
+    # (o al pre-router, que solo delega en el supervisor si no esta seguro)
+    entry = "pre_router" if pre_router else "supervisor"
+    if pre_router:
+        workflow.add_conditional_edges(  # type: ignore
+            "pre_router", route_pre_router(parallel), _PRE_ROUTER_PATHS
+        )
+    for worker in WORKER_NODES:
+        workflow.add_edge(worker, entry)
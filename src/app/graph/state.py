@@ -10,5 +10,14 @@ class AgentState(TypedDict):
     # Nuevo campo next para el supervisor y su siguiente paso
     next: str | None
 
+    # Modo paralelo: workers que el supervisor pidio en este paso
+    workers: NotRequired[list[str]]
+
+    # True si el pre-router ya decidio el paso (sin llamar al supervisor LLM)
+    pre_routed: NotRequired[bool]
+
     # Resultado opcional de safety gate para trazabilidad
     safety_meta: NotRequired[dict[str, Any]]
+
+    # True si el DATA_AGENT consulto datos de pacientes (no se cachea la respuesta)
+    used_patient_data: NotRequired[bool]
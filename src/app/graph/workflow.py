@@ -1,18 +1,33 @@
-from typing import Any, Literal
+import logging
+from typing import Any
 
 from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph  # type: ignore
 from langgraph.prebuilt import create_react_agent  # type: ignore
 
+from app.core.checkpointer import conversation_checkpointer
+from app.core.config import settings
+from app.graph.budget import (
+    BudgetExhaustedError,
+    budget_exhausted,
+    interrupted_report,
+    within_deadline,
+)
+from app.graph.context import record_prompt_tokens, worker_view
+from app.graph.nodes.pre_router import pre_router_node
 from app.graph.nodes.safety_gate import safety_gate_node
 from app.graph.nodes.specialist import specialist_node
 from app.graph.nodes.supervisor import supervisor_node
 from app.graph.prompt import MEDICAL_AGENT_PROMPT, PATIENT_WORKER_PROMPT
+from app.graph.routing import add_supervisor_edges
 from app.graph.state import AgentState
 from app.graph.tools.patients import lookup_patient_history
 from app.graph.tools.rag import search_knowledge_base
 from app.services.llm_service import llm_service
 
+logger = logging.getLogger(__name__)
+
 # --- DEFINICION DE WORKERS (SUB-GRAFOS) ---
 # En lugar de nodos simples, creamos agents ReAct completos par cada especialista
 # Esto asegura que ellos mismos ejecuten sus herramientas y devuelvan el resultado
@@ -31,39 +46,62 @@ data_agent = create_react_agent(  # type: ignore
 
 
 # Funcion helper para invocar a los sub-agentes y formatear la salida
-async def call_docs_agent(state: AgentState) -> dict[str, Any]:
-    sys_msg = SystemMessage(content=MEDICAL_AGENT_PROMPT)
-    inputs = {"messages": [sys_msg] + state["messages"]}
-    # Invocamos al sub-grafo
-    result = await docs_agent.ainvoke(inputs)  # type: ignore
+async def _invoke_worker(
+    agent: Any, worker: str, inputs: dict[str, Any], config: RunnableConfig | None
+) -> BaseMessage | None:
+    """
+    Corre el sub-agente ReAct dentro del presupuesto de la peticion: el
+    deadline corta la espera y el callback del presupuesto corta sus llamadas
+    al LLM. None si se agoto (el turno sigue con lo ya reunido).
+    """
+    try:
+        result = await within_deadline(agent.ainvoke(inputs), config)  # type: ignore
+    except (BudgetExhaustedError, TimeoutError):
+        reason = budget_exhausted(config) or "deadline"
+        logger.warning(f"{worker} interrumpido por presupuesto ({reason})")
+        return None
     # Devolvemos el ultimo mensaje (Resp del agente)
     last_message: BaseMessage = result["messages"][-1]
-    return {"messages": [last_message]}
+    # Nombre del worker: en modo paralelo llegan varias respuestas seguidas
+    last_message.name = worker
+    return last_message
 
 
-async def call_data_agent(state: AgentState) -> dict[str, Any]:
-    sys_msg = SystemMessage(content=PATIENT_WORKER_PROMPT)
-    inputs = {"messages": [sys_msg] + state["messages"]}
-    result = await data_agent.ainvoke(inputs)  # type: ignore
-    last_message: BaseMessage = result["messages"][-1]
-    return {"messages": [last_message]}
+def _budget_note(worker: str) -> dict[str, Any]:
+    # El router pasa al especialista (el presupuesto ya esta agotado)
+    return {"messages": [interrupted_report(worker)]}
 
 
-def route_supervisor(
-    state: AgentState,
-) -> Literal["DOCS_AGENT", "DATA_AGENT", "FINISH"]:
-    """
-    Función de enrutamiento segura.
-    Reemplaza la lambda para evitar errores de tipo si 'next' es None.
-    """
-    next_node = state.get("next")
+async def call_docs_agent(
+    state: AgentState, config: RunnableConfig | None = None
+) -> dict[str, Any]:
+    if budget_exhausted(config):
+        return _budget_note("DOCS_AGENT")
+    sys_msg = SystemMessage(content=MEDICAL_AGENT_PROMPT)
+    # Solo la pregunta y los reportes relevantes (GRAPH_CONTEXT_WORKER_TOKENS)
+    messages = worker_view(state["messages"], "DOCS_AGENT")
+    record_prompt_tokens("DOCS_AGENT", MEDICAL_AGENT_PROMPT, messages)
+    inputs = {"messages": [sys_msg] + messages}
+    # Invocamos al sub-grafo
+    last_message = await _invoke_worker(docs_agent, "DOCS_AGENT", inputs, config)
+    if last_message is None:
+        return _budget_note("DOCS_AGENT")
+    return {"messages": [last_message]}
 
-    # Mapeo de seguridad: Si el supervisor falló o mandó FINISH -> END
-    if next_node == "FINISH" or not next_node:
-        return "FINISH"
 
-    # Si devuelve DOCS_AGENT o DATA_AGENT
-    return next_node  # type: ignore
+async def call_data_agent(
+    state: AgentState, config: RunnableConfig | None = None
+) -> dict[str, Any]:
+    if budget_exhausted(config):
+        return _budget_note("DATA_AGENT")
+    sys_msg = SystemMessage(content=PATIENT_WORKER_PROMPT)
+    messages = worker_view(state["messages"], "DATA_AGENT")
+    record_prompt_tokens("DATA_AGENT", PATIENT_WORKER_PROMPT, messages)
+    inputs = {"messages": [sys_msg] + messages}
+    last_message = await _invoke_worker(data_agent, "DATA_AGENT", inputs, config)
+    if last_message is None:
+        return _budget_note("DATA_AGENT")
+    return {"messages": [last_message], "used_patient_data": True}
 
 
 # --- CONSTRUCCION DEL GRAFO PRINCIPAL ---
@@ -72,6 +110,7 @@ def route_supervisor(
 workflow = StateGraph(AgentState)
 
 # Agregamos los nodos
+workflow.add_node("pre_router", pre_router_node)  # type: ignore
 workflow.add_node("supervisor", supervisor_node)  # type: ignore
 workflow.add_node("DOCS_AGENT", call_docs_agent)  # type: ignore
 workflow.add_node("DATA_AGENT", call_data_agent)  # type: ignore
@@ -80,22 +119,38 @@ workflow.add_node("safety_gate", safety_gate_node)  # type: ignore
 
 # Definimos el flujo (Edges)
 
-# El inicio simpre va al Supervisor
-workflow.add_edge(START, "supervisor")
-
-# Router Condicional: Del supervisor a los Workers
-workflow.add_conditional_edges(
-    "supervisor",
-    route_supervisor,
-    {"DOCS_AGENT": "DOCS_AGENT", "DATA_AGENT": "DATA_AGENT", "FINISH": "specialist"},
+# El inicio va al pre-router (reglas + clasificador) o directo al Supervisor
+workflow.add_edge(
+    START, "pre_router" if settings.GRAPH_PRE_ROUTER_ENABLED else "supervisor"
 )
 
-# El ciclo de retorno: Los workers SIEMPRE reportan de vuelta al supervisor
-workflow.add_edge("DOCS_AGENT", "supervisor")
-workflow.add_edge("DATA_AGENT", "supervisor")
+# Router Condicional: Del supervisor a los Workers y de vuelta al supervisor
+# Con GRAPH_PARALLEL_DISPATCH varios workers corren en el mismo paso
+add_supervisor_edges(
+    workflow,
+    parallel=settings.GRAPH_PARALLEL_DISPATCH,
+    pre_router=settings.GRAPH_PRE_ROUTER_ENABLED,
+)
 
 workflow.add_edge("specialist", "safety_gate")
 workflow.add_edge("safety_gate", END)
 
 # Compilacion
 graph = workflow.compile()  # type: ignore
+
+# Variante con memoria por thread_id: se compila cuando el checkpointer de
+# Postgres esta abierto (lifespan) y se reutiliza mientras siga siendo el mismo
+_threaded_graph: Any | None = None
+_threaded_saver: Any | None = None
+
+
+def get_threaded_graph() -> Any | None:
+    global _threaded_graph, _threaded_saver
+
+    saver = conversation_checkpointer.saver
+    if saver is None:
+        return None
+    if _threaded_saver is not saver:
+        _threaded_graph = workflow.compile(checkpointer=saver)  # type: ignore
+        _threaded_saver = saver
+    return _threaded_graph
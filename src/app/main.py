@@ -1,18 +1,31 @@
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
+from typing import Any
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from scalar_fastapi import get_scalar_api_reference  # type: ignore
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.api.v1.api import api_router
+from app.core.checkpointer import conversation_checkpointer
 from app.core.config import settings
+from app.core.executors import shutdown_process_pool
 from app.core.limiter import limiter
-from app.core.session import create_db_and_tables
+from app.core.model_registry import model_registry
+from app.core.observability import get_metrics_snapshot
+from app.core.session import async_session_factory, create_db_and_tables
+from app.graph.nodes.supervisor import wait_for_learning
+from app.services.embedding_engine import embedding_engine
+from app.services.ingestion_jobs import ingestion_job_manager
+from app.services.reranker_service import reranker_service
+from app.services.route_classifier import route_classifier
+from app.services.vector_store import vector_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("nexus_ai")
@@ -34,15 +47,51 @@ async def lifespan(app: FastAPI):
         if tracing == "true":
             logger.info(" Tracing activado")
 
+    # Modelos (embeddings, reranker) en segundo plano: /ready indica cuando terminan
+    model_registry.start_background_loading()
+
     # Bases de datos
     try:
         # Importacion de modelos aqui o en __init__ para que SQLModel los vea
+        started = time.perf_counter()
         await create_db_and_tables()
+        model_registry.record_startup_phase("db_init", time.perf_counter() - started)
         logger.info("Tablas de conocimiento verificadas/creadas.")
+
+        # Carga inicial del motor vectorial en proceso (no-op con pgvector)
+        started = time.perf_counter()
+        async with async_session_factory() as session:
+            await vector_store.refresh(session)
+        model_registry.record_startup_phase(
+            "vector_store", time.perf_counter() - started
+        )
     except Exception as e:
         logger.error(f" Error conectando a BD: {e}")
 
+    # Hilos de conversacion (thread_id): sin checkpointer el agente no tiene memoria
+    try:
+        started = time.perf_counter()
+        await conversation_checkpointer.open()
+        model_registry.record_startup_phase(
+            "checkpointer", time.perf_counter() - started
+        )
+    except Exception as e:
+        logger.error(f" Checkpointer no disponible, chat sin memoria: {e}")
+
+    # Workers de ingesta en segundo plano
+    ingestion_job_manager.start()
+
     yield
+    await ingestion_job_manager.stop()
+    await wait_for_learning()
+    route_classifier.save()
+    await conversation_checkpointer.close()
+    await reranker_service.stop()
+    reranker_service.shutdown()
+    await embedding_engine.stop()
+    embedding_engine.shutdown()
+    vector_store.close()
+    shutdown_process_pool()
     print("Nexus AI: Apagando.")
 
 
@@ -85,6 +134,19 @@ async def root() -> dict[str, str]:
     }
 
 
+# --- Readiness: 503 hasta que los modelos terminan de cargar ---
+@app.get("/ready", tags=["Health"])
+async def ready() -> JSONResponse:
+    report = model_registry.report()
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+
+# --- Metricas internas (contadores, gauges e histogramas) ---
+@app.get("/metrics", tags=["Health"])
+async def metrics() -> dict[str, Any]:
+    return get_metrics_snapshot()
+
+
 if not IS_PRODUCTION:
 
     @app.get("/docsScalar", include_in_schema=False)
@@ -26,3 +26,7 @@ class KnowledgeBase(SQLModel, table=True):
     created_at: datetime = Field(default_factory=get_utc_now)
 
     embedding: list[float] | None = Field(default=None, sa_column=Column(Vector(1024)))
+
+    # Ademas existe la columna generada 'search_vector' (tsvector + GIN) para
+    # la busqueda full-text. No se mapea aqui: la crea y mantiene Postgres
+    # (ver app.db.search_indexes.ensure_text_search_index).
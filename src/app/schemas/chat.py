@@ -9,6 +9,13 @@ def _default_reason_codes() -> list[SafetyReasonCode]:
 
 class ChatRequest(BaseModel):
     message: str
+    # Hilo de conversacion: los turnos con el mismo id comparten historial.
+    # El id lo emite el servidor (POST /agent/threads) y va firmado
+    thread_id: str | None = Field(default=None, min_length=1, max_length=128)
+
+
+class ThreadResponse(BaseModel):
+    thread_id: str
 
 
 class ChatSafetyMeta(BaseModel):
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import StrEnum
 
 from pydantic import BaseModel
 from sqlmodel import SQLModel
@@ -19,10 +20,39 @@ class KnowledgeRead(SQLModel):
     created_at: datetime
 
 
-class PDFResponse(BaseModel):
+# Pagina del listado (GET /knowledge): next_cursor va en 'after_id'
+class KnowledgePage(BaseModel):
+    items: list[KnowledgeRead]
+    next_cursor: int | None = None
+
+
+class IngestionJobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    # El servicio se detuvo antes de que el trabajo terminara
+    CANCELLED = "cancelled"
+
+
+class IngestionJobAccepted(BaseModel):
+    job_id: str
     filename: str
-    message: str
-    chunks_created: int
+    status: IngestionJobStatus
+
+
+# Progreso de un trabajo de ingesta (GET /knowledge/jobs/{id})
+class IngestionJobRead(BaseModel):
+    job_id: str
+    filename: str
+    status: IngestionJobStatus
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_stored: int = 0
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
 
 # Resultado para el endpoint de busqueda /search/
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from threading import Lock
+
+from app.core.observability import (
+    EMBEDDING_CACHE_MEMORY_HITS_TOTAL,
+    EMBEDDING_CACHE_MISSES_TOTAL,
+    EMBEDDING_CACHE_PERSISTENT_HITS_TOTAL,
+    increment_counter,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize(vector: Sequence[float]) -> bytes:
+    # float32 igual que pgvector: 4 bytes por dimension
+    return array("f", vector).tobytes()
+
+
+def _deserialize(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings direccionado por contenido (sha256 de modelo + texto).
+    - Nivel 1: LRU en memoria del proceso.
+    - Nivel 2: SQLite local que sobrevive reinicios (opcional).
+    Si cambia el id del modelo, el nivel persistente se vacia solo.
+    """
+
+    def __init__(
+        self, model_id: str, max_items: int, db_path: str | None = None
+    ) -> None:
+        self.model_id = model_id
+        self.max_items = max_items
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._memory_lock = Lock()
+        self._db_lock = Lock()
+        self._db: sqlite3.Connection | None = None
+
+        if db_path:
+            self._db = self._open_db(db_path)
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_id}\x00{text}".encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get_many(self, texts: Sequence[str]) -> list[list[float] | None]:
+        keys = [self.key(text) for text in texts]
+        results: list[list[float] | None] = [None] * len(keys)
+
+        memory_hits = 0
+        with self._memory_lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    memory_hits += 1
+
+        pending = [i for i, vector in enumerate(results) if vector is None]
+        persistent_hits = 0
+        if pending and self._db is not None:
+            found = await asyncio.to_thread(self._db_get, [keys[i] for i in pending])
+            for i in pending:
+                vector = found.get(keys[i])
+                if vector is not None:
+                    results[i] = vector
+                    persistent_hits += 1
+            # Promovemos al nivel en memoria lo encontrado en disco
+            self._remember({keys[i]: results[i] for i in pending if results[i]})
+
+        increment_counter(EMBEDDING_CACHE_MEMORY_HITS_TOTAL, memory_hits)
+        increment_counter(EMBEDDING_CACHE_PERSISTENT_HITS_TOTAL, persistent_hits)
+        increment_counter(
+            EMBEDDING_CACHE_MISSES_TOTAL, len(keys) - memory_hits - persistent_hits
+        )
+        return results
+
+    async def put_many(
+        self, texts: Sequence[str], vectors: Sequence[list[float]]
+    ) -> None:
+        entries = {
+            self.key(text): vector for text, vector in zip(texts, vectors, strict=True)
+        }
+        self._remember(entries)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, entries)
+
+    def _remember(self, entries: Mapping[str, list[float] | None]) -> None:
+        with self._memory_lock:
+            for key, vector in entries.items():
+                if vector is None:
+                    continue
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _open_db(self, db_path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = db.execute("SELECT value FROM meta WHERE key = 'model_id'").fetchone()
+        if row is None or row[0] != self.model_id:
+            # Invalidacion: los vectores de otro modelo no sirven
+            if row is not None:
+                logger.info(
+                    f"Modelo de embeddings cambio ({row[0]} -> {self.model_id}). "
+                    "Vaciando cache persistente."
+                )
+            db.execute("DELETE FROM embeddings")
+            db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('model_id', ?)",
+                (self.model_id,),
+            )
+        db.commit()
+        return db
+
+    def _db_get(self, keys: list[str]) -> dict[str, list[float]]:
+        assert self._db is not None
+        found: dict[str, list[float]] = {}
+        with self._db_lock:
+            # SQLite limita la cantidad de parametros por consulta
+            for start in range(0, len(keys), 500):
+                part = keys[start : start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = _deserialize(blob)
+        return found
+
+    def _db_put(self, entries: dict[str, list[float]]) -> None:
+        assert self._db is not None
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, _serialize(vector)) for key, vector in entries.items()],
+            )
+            self._db.commit()
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.observability import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_QUEUE_DEPTH,
+    EMBEDDING_QUEUE_WAIT_SECONDS,
+    observe_histogram,
+    set_gauge,
+)
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_MODEL_NAME = "embeddings"
+# Texto de warm-up: primera inferencia antes del trafico real
+_WARMUP_TEXTS = ["query: warm-up"]
+_STOPPED_MESSAGE = "Motor de embeddings detenido"
+
+
+class EmbeddingBackend(Protocol):
+    """
+    Donde corre el modelo. Recibe textos ya preparados (con prefijo e5)
+    y devuelve un vector normalizado por texto.
+    """
+
+    async def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+    def warmup(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class InProcessBackend:
+    """Modelo en el proceso de la API (API de HuggingFace o CPU local en hilos)."""
+
+    def __init__(self, embeddings: Embeddings) -> None:
+        self.embeddings = embeddings
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def warmup(self) -> None:
+        self.embeddings.embed_documents(_WARMUP_TEXTS)
+
+    def close(self) -> None:
+        return None
+
+
+# --- Workers del pool de procesos (estado por proceso) ---
+_worker_embeddings: Embeddings | None = None
+
+
+def _init_worker(model_id: str, threads: int) -> None:
+    global _worker_embeddings
+
+    # Sin esto cada worker usa todos los nucleos y se pisan entre si
+    if settings.EMBEDDING_BACKEND == "torch":
+        import torch  # type: ignore
+
+        torch.set_num_threads(threads)
+    _worker_embeddings = load_local_embeddings(model_id, threads)
+
+
+def _worker_embed(texts: list[str]) -> list[list[float]]:
+    if _worker_embeddings is None:
+        msg = "Worker de embeddings sin modelo cargado"
+        raise RuntimeError(msg)
+    return _worker_embeddings.embed_documents(texts)
+
+
+class ProcessPoolBackend:
+    """
+    Modelo local replicado en N procesos: cada lote corre en un worker libre,
+    asi el throughput escala con los nucleos en lugar de competir por el GIL.
+    """
+
+    def __init__(self, model_id: str, workers: int) -> None:
+        self.workers = workers
+        self.model_id = model_id
+        self.threads = max(1, (os.cpu_count() or 1) // workers)
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            # 'spawn': los workers no heredan el event loop ni otros modelos
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_id, self.threads),
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, _worker_embed, texts)
+        except BrokenProcessPool:
+            # Un worker murio (OOM, segfault) y el pool no se recupera solo:
+            # falla este lote y se recrea una vez aunque fallen varios en vuelo
+            if self._pool is pool:
+                logger.warning("Pool de embeddings roto: recreando los workers")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+            raise
+
+    def warmup(self) -> None:
+        # Un lote por worker: arranca todos los procesos y carga cada modelo
+        futures = [
+            self._pool.submit(_worker_embed, _WARMUP_TEXTS) for _ in range(self.workers)
+        ]
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def load_local_embeddings(model_id: str, threads: int | None = None) -> Embeddings:
+    if settings.EMBEDDING_BACKEND == "onnx":
+        from app.services.onnx_embeddings import load_onnx_embeddings
+
+        return load_onnx_embeddings(model_id, threads)
+
+    # Importacion diferida: con workers, el proceso de la API no carga torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=model_id,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": True},  # Ayuda a la similitud de coseno
+    )
+
+
+@dataclass
+class _EmbedJob:
+    text: str
+    enqueued_at: float
+    future: asyncio.Future[list[float]]
+
+
+def _fail_jobs(jobs: list[_EmbedJob], error: Exception) -> None:
+    for job in jobs:
+        if not job.future.done():
+            job.future.set_exception(error)
+
+
+class EmbeddingEngine:
+    """
+    Cola unica de textos para todos los llamadores (busqueda, ingesta, naive).
+    - Un recolector arma lotes dinamicos: se cierran al llegar a max_batch_size
+      textos o al vencer max_wait_ms desde el primero.
+    - Hasta 'concurrency' lotes en vuelo (uno por worker); mientras todos estan
+      ocupados la cola crece y el siguiente lote sale mas lleno.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend | None,
+        max_batch_size: int,
+        max_wait_ms: float,
+        concurrency: int = 1,
+    ) -> None:
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = concurrency
+        self._queue: asyncio.Queue[_EmbedJob] | None = None
+        self._collector: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        if self.backend is None:
+            # Carga en segundo plano: la primera peticion espera al modelo
+            self.backend = await model_registry.get(EMBEDDINGS_MODEL_NAME)
+
+        queue = self._ensure_collector()
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[list[float]]] = []
+        for text in texts:
+            future: asyncio.Future[list[float]] = loop.create_future()
+            queue.put_nowait(
+                _EmbedJob(text=text, enqueued_at=loop.time(), future=future)
+            )
+            futures.append(future)
+        set_gauge(EMBEDDING_QUEUE_DEPTH, queue.qsize())
+        return list(await asyncio.gather(*futures))
+
+    async def stop(self) -> None:
+        tasks = [*self._batches]
+        if self._collector is not None:
+            tasks.append(self._collector)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Lo que quedo en cola ya no tiene quien lo procese: falla, no cuelga
+        if self._queue is not None:
+            pending: list[_EmbedJob] = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            _fail_jobs(pending, RuntimeError(_STOPPED_MESSAGE))
+        self._collector = None
+        self._queue = None
+        self._loop = None
+
+    def shutdown(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+    def _ensure_collector(self) -> asyncio.Queue[_EmbedJob]:
+        loop = asyncio.get_running_loop()
+        if (
+            self._queue is None
+            or self._collector is None
+            or self._collector.done()
+            or self._loop is not loop
+        ):
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(
+                self._collect(self._queue), name="embedding-collector"
+            )
+        return self._queue
+
+    async def _collect(self, queue: asyncio.Queue[_EmbedJob]) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        batch: list[_EmbedJob] = []
+        try:
+            while True:
+                # Primero esperamos un worker libre: lo que llegue mientras tanto
+                # se acumula y entra en el mismo lote
+                await slots.acquire()
+                batch = [await queue.get()]
+
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except TimeoutError:
+                        break
+
+                set_gauge(EMBEDDING_QUEUE_DEPTH, queue.qsize())
+                task = loop.create_task(self._run_batch(batch, slots))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Lote a medio armar al detener el motor
+            _fail_jobs(batch, RuntimeError(_STOPPED_MESSAGE))
+            raise
+
+    async def _run_batch(
+        self, batch: list[_EmbedJob], slots: asyncio.Semaphore
+    ) -> None:
+        now = asyncio.get_running_loop().time()
+        observe_histogram(EMBEDDING_BATCH_SIZE, len(batch))
+        for job in batch:
+            observe_histogram(EMBEDDING_QUEUE_WAIT_SECONDS, now - job.enqueued_at)
+
+        try:
+            if self.backend is None:
+                msg = "Motor de embeddings sin backend"
+                raise RuntimeError(msg)
+            started = time.perf_counter()
+            vectors = await self.backend.embed([job.text for job in batch])
+            logger.debug(
+                f"Lote de {len(batch)} embeddings en "
+                f"{time.perf_counter() - started:.3f}s"
+            )
+        except Exception as e:
+            logger.error(f"Fallo un lote de embeddings: {e}")
+            _fail_jobs(batch, e)
+            return
+        except asyncio.CancelledError:
+            _fail_jobs(batch, RuntimeError(_STOPPED_MESSAGE))
+            raise
+        finally:
+            slots.release()
+
+        for job, vector in zip(batch, vectors, strict=True):
+            if not job.future.done():
+                job.future.set_result(vector)
+
+
+def embedding_model_tag() -> str:
+    """
+    Identificador de los vectores para el cache de embeddings: ONNX (sobre
+    todo int8) da vectores algo distintos y no deben mezclarse con los de torch.
+    """
+    model_id = settings.EMBEDDING_MODEL_ID
+    if settings.ENVIRONMENT == "production" or settings.EMBEDDING_BACKEND != "onnx":
+        return model_id
+    return f"{model_id}@onnx-{'int8' if settings.EMBEDDING_ONNX_QUANTIZE else 'fp32'}"
+
+
+def _load_backend() -> EmbeddingBackend:
+    model_id = settings.EMBEDDING_MODEL_ID
+    if settings.ENVIRONMENT == "production":
+        from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+        logger.info(" MODO PRODUCCION: Uso de HuggingFace API")
+        return InProcessBackend(
+            HuggingFaceEndpointEmbeddings(
+                model=model_id,
+                task="feature-extraction",
+                huggingfacehub_api_token=settings.HF_TOKEN,
+            )
+        )
+
+    if settings.EMBEDDING_BACKEND == "onnx":
+        from app.services.onnx_embeddings import ensure_onnx_model
+
+        # Exportar una sola vez aqui: los workers solo cargan el archivo
+        ensure_onnx_model(
+            model_id, settings.EMBEDDING_ONNX_DIR, settings.EMBEDDING_ONNX_QUANTIZE
+        )
+
+    if settings.EMBEDDING_WORKERS > 0:
+        logger.info(
+            f"Modo desarrollo: modelo de embeddings en "
+            f"{settings.EMBEDDING_WORKERS} procesos"
+        )
+        return ProcessPoolBackend(model_id, settings.EMBEDDING_WORKERS)
+
+    logger.info("Modo desarrollo: Cargando el modelo de embeddings")
+    return InProcessBackend(load_local_embeddings(model_id))
+
+
+def _warmup_backend(backend: Any) -> None:
+    backend.warmup()
+
+
+model_registry.register(EMBEDDINGS_MODEL_NAME, _load_backend, warmup=_warmup_backend)
+
+embedding_engine = EmbeddingEngine(
+    backend=None,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    concurrency=max(settings.EMBEDDING_WORKERS, 1),
+)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from app.core.config import settings
+from app.models.knowledge import get_utc_now
+from app.schemas.knowledge import IngestionJobRead, IngestionJobStatus
+from app.services.ingestion_pipeline import IngestionStats
+from app.services.pdf_parser import PDFSource, discard_pdf_source
+
+logger = logging.getLogger(__name__)
+
+# Ejecuta la ingesta de un PDF y va actualizando 'stats'
+JobRunner = Callable[[PDFSource, str, IngestionStats], Awaitable[object]]
+
+
+class IngestionQueueFullError(Exception):
+    pass
+
+
+@dataclass
+class IngestionJob:
+    job_id: str
+    filename: str
+    source: PDFSource
+    status: IngestionJobStatus = IngestionJobStatus.QUEUED
+    stats: IngestionStats = field(default_factory=IngestionStats)
+    error: str | None = None
+    created_at: datetime = field(default_factory=get_utc_now)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    def to_read(self) -> IngestionJobRead:
+        return IngestionJobRead(
+            job_id=self.job_id,
+            filename=self.filename,
+            status=self.status,
+            pages_parsed=self.stats.pages_parsed,
+            chunks_embedded=self.stats.chunks_embedded,
+            chunks_stored=self.stats.chunks_stored,
+            error=self.error,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+
+async def _run_pdf_ingestion(
+    source: PDFSource, filename: str, stats: IngestionStats
+) -> IngestionStats:
+    # Importacion diferida: evita cargar modelos al importar este modulo
+    from app.core.session import async_session_factory
+    from app.services.knowledge_service import knowledge_service
+
+    # Cada trabajo usa su propia sesion, no la de la peticion HTTP
+    async with async_session_factory() as session:
+        return await knowledge_service.proccess_pdf(
+            session, source, filename, stats=stats
+        )
+
+
+class IngestionJobManager:
+    """
+    Trabajos de ingesta en segundo plano.
+    La subida responde al instante (202) y un pool acotado de workers procesa
+    los PDFs, asi la concurrencia de ingesta no depende de las peticiones HTTP.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queued: int,
+        history_size: int,
+        runner: JobRunner = _run_pdf_ingestion,
+    ) -> None:
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self._runner = runner
+        self._queue: asyncio.Queue[IngestionJob] = asyncio.Queue(maxsize=max_queued)
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self._workers: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        logger.info(f"Iniciando {self.max_workers} workers de ingesta")
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.max_workers)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Cancela los workers (los trabajos en curso quedan como cancelados) y
+        descarta los pendientes de la cola, borrando sus archivos temporales.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._finish_cancelled(job)
+            self._queue.task_done()
+
+    def submit(self, source: PDFSource, filename: str) -> IngestionJob:
+        self.start()
+
+        job = IngestionJob(job_id=uuid.uuid4().hex, filename=filename, source=source)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise IngestionQueueFullError(  # noqa: B904
+                "La cola de ingesta esta llena, intenta mas tarde"
+            )
+
+        self._jobs[job.job_id] = job
+        self._prune_history()
+        logger.info(f"Trabajo de ingesta {job.job_id} encolado: {filename}")
+        return job
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = IngestionJobStatus.RUNNING
+            job.started_at = get_utc_now()
+            try:
+                await self._runner(job.source, job.filename, job.stats)
+                job.status = IngestionJobStatus.COMPLETED
+            except asyncio.CancelledError:
+                self._finish_cancelled(job)
+                raise
+            except Exception as e:
+                logger.error(f"Trabajo de ingesta {job.job_id} fallo: {e}")
+                job.status = IngestionJobStatus.FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = get_utc_now()
+                # Si el runner no llego a consumir el archivo, lo borramos aqui
+                discard_pdf_source(job.source)
+                self._queue.task_done()
+
+    def _finish_cancelled(self, job: IngestionJob) -> None:
+        logger.warning(f"Trabajo de ingesta {job.job_id} cancelado")
+        job.status = IngestionJobStatus.CANCELLED
+        job.error = "Ingesta cancelada al detener el servicio"
+        job.finished_at = get_utc_now()
+        discard_pdf_source(job.source)
+
+    def _prune_history(self) -> None:
+        # Solo se olvidan trabajos terminados, nunca los pendientes
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status
+            in (
+                IngestionJobStatus.COMPLETED,
+                IngestionJobStatus.FAILED,
+                IngestionJobStatus.CANCELLED,
+            )
+        ]
+        excess = len(self._jobs) - self.history_size
+        for job_id in finished[: max(excess, 0)]:
+            del self._jobs[job_id]
+
+
+ingestion_job_manager = IngestionJobManager(
+    max_workers=settings.INGESTION_MAX_CONCURRENT_JOBS,
+    max_queued=settings.INGESTION_MAX_QUEUED_JOBS,
+    history_size=settings.INGESTION_JOB_HISTORY,
+)
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, cast
+
+from langchain_core.documents import Document
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.corpus import bump_corpus_generation
+from app.core.executors import get_process_pool
+from app.db.bulk import copy_knowledge_chunks
+from app.models.knowledge import KnowledgeBase
+from app.services.llm_service import llm_service
+from app.services.pdf_parser import (
+    ParsedRange,
+    PDFSource,
+    count_pages,
+    parse_page_range,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lote de chunks con sus vectores ya calculados
+EmbeddedBatch = tuple[list[Document], list[list[float]]]
+
+
+@dataclass
+class IngestionStats:
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_stored: int = 0
+
+
+class PDFIngestionPipeline:
+    """
+    Pipeline de ingesta en streaming:
+    parseo + chunker (pool de procesos) -> embeddings (por lote) -> insercion.
+
+    Entre etapas hay colas acotadas, asi la memoria no crece con el tamaño
+    del PDF. Cada lote se confirma (commit) apenas se inserta, por lo que los
+    primeros fragmentos ya se pueden buscar mientras el resto se procesa.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        filename: str,
+        *,
+        batch_size: int | None = None,
+        queue_size: int | None = None,
+        stats: IngestionStats | None = None,
+    ) -> None:
+        self.session = session
+        self.filename = filename
+        self.batch_size = batch_size or settings.RAG_EMBED_BATCH_SIZE
+        self.queue_size = queue_size or settings.RAG_PIPELINE_QUEUE_SIZE
+        # Se puede pasar un stats compartido para seguir el progreso en vivo
+        self.stats = stats or IngestionStats()
+
+    async def run(self, source: PDFSource) -> IngestionStats:
+        chunk_queue: asyncio.Queue[list[Document] | None] = asyncio.Queue(
+            maxsize=self.queue_size
+        )
+        vector_queue: asyncio.Queue[EmbeddedBatch | None] = asyncio.Queue(
+            maxsize=self.queue_size
+        )
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._parse_pdf(source, chunk_queue))
+                tg.create_task(self._embed_batches(chunk_queue, vector_queue))
+                tg.create_task(self._store_batches(vector_queue))
+        except ExceptionGroup as eg:
+            # Propagamos el error original de la etapa que fallo
+            raise eg.exceptions[0] from eg
+
+        return self.stats
+
+    async def _parse_pdf(
+        self,
+        source: PDFSource,
+        out_queue: asyncio.Queue[list[Document] | None],
+    ) -> None:
+        """
+        Parsea y trocea el PDF en el pool de procesos (fuera del event loop).
+        Los PDFs grandes (archivo en disco) se reparten por rangos de paginas
+        entre los workers; los chicos (en memoria) van en una sola tarea para
+        no copiar sus bytes a cada worker.
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+
+        if source.in_memory:
+            ranges: list[tuple[int, int | None]] = [(0, None)]
+        else:
+            total_pages = await loop.run_in_executor(pool, count_pages, source)
+            step = settings.RAG_PARSER_PAGES_PER_TASK
+            ranges = [
+                (start, min(start + step, total_pages))
+                for start in range(0, total_pages, step)
+            ]
+
+        # Acotamos los rangos en vuelo y los consumimos en orden
+        in_flight: deque[asyncio.Future[ParsedRange]] = deque()
+        batch: list[Document] = []
+
+        try:
+            for start, stop in ranges:
+                in_flight.append(
+                    loop.run_in_executor(
+                        pool,
+                        parse_page_range,
+                        source,
+                        start,
+                        stop,
+                        settings.RAG_CHUNK_SIZE,
+                        settings.RAG_CHUNK_OVERLAP,
+                    )
+                )
+                if len(in_flight) >= settings.RAG_PARSER_WORKERS:
+                    batch = await self._collect_range(in_flight, batch, out_queue)
+
+            while in_flight:
+                batch = await self._collect_range(in_flight, batch, out_queue)
+        finally:
+            for pending in in_flight:
+                pending.cancel()
+
+        if batch:
+            await out_queue.put(batch)
+        await out_queue.put(None)
+
+    async def _collect_range(
+        self,
+        in_flight: deque[asyncio.Future[ParsedRange]],
+        batch: list[Document],
+        out_queue: asyncio.Queue[list[Document] | None],
+    ) -> list[Document]:
+        page_count, parsed = await in_flight[0]
+        in_flight.popleft()
+
+        self.stats.pages_parsed += page_count
+        batch.extend(
+            Document(page_content=text, metadata={"page": page})
+            for page, text in parsed
+        )
+
+        while len(batch) >= self.batch_size:
+            await out_queue.put(batch[: self.batch_size])
+            batch = batch[self.batch_size :]
+
+        return batch
+
+    async def _embed_batches(
+        self,
+        in_queue: asyncio.Queue[list[Document] | None],
+        out_queue: asyncio.Queue[EmbeddedBatch | None],
+    ) -> None:
+        while (chunks := await in_queue.get()) is not None:
+            vectors = await llm_service.embed_passages(
+                [chunk.page_content for chunk in chunks],
+                batch_size=self.batch_size,
+            )
+            self.stats.chunks_embedded += len(chunks)
+            await out_queue.put((chunks, vectors))
+
+        await out_queue.put(None)
+
+    async def _store_batches(
+        self, in_queue: asyncio.Queue[EmbeddedBatch | None]
+    ) -> None:
+        while (item := await in_queue.get()) is not None:
+            chunks, vectors = item
+            rows: list[KnowledgeBase] = []
+            for chunk, vector in zip(chunks, vectors, strict=True):
+                # Document.metadata es un 'dict' sin parametros
+                meta: dict[str, Any] = cast(Any, chunk).metadata
+                rows.append(
+                    KnowledgeBase(
+                        title=f"{self.filename} - Pag {meta.get('page', 0) + 1}",
+                        content=chunk.page_content,
+                        source=self.filename,
+                        embedding=vector,
+                    )
+                )
+
+            # COPY binario: mucho mas rapido que INSERTs fila por fila
+            await copy_knowledge_chunks(self.session, rows)
+            await self.session.commit()
+            # El corpus cambio: invalida caches que dependen del contenido
+            bump_corpus_generation()
+            self.stats.chunks_stored += len(rows)
+            logger.info(
+                f"{self.filename}: {self.stats.chunks_stored} chunks guardados "
+                f"({self.stats.pages_parsed} paginas leidas)"
+            )
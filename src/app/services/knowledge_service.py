@@ -3,32 +3,32 @@ import logging
 import os
 import shutil
 import tempfile
-from typing import Any, cast
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
 
 from fastapi import UploadFile
-from flashrank import Ranker, RerankRequest  # type: ignore
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
+from app.core.corpus import bump_corpus_generation
+from app.core.session import async_session_factory
+from app.db.listing import build_listing_statement
+from app.db.text_search import lexical_search
 from app.models.knowledge import KnowledgeBase
-from app.schemas.knowledge import PDFResponse
+from app.schemas.knowledge import KnowledgePage, KnowledgeRead
+from app.services.ingestion_pipeline import IngestionStats, PDFIngestionPipeline
 from app.services.llm_service import llm_service
+from app.services.pdf_parser import PDFSource, discard_pdf_source
+from app.services.rank_fusion import reciprocal_rank_fusion
+from app.services.reranker_service import reranker_service
+from app.services.vector_store import vector_store
 
 # Configuracion del Logger
 logger = logging.getLogger(__name__)
 
 
 class KnowledgeService:
-    def __init__(self):
-        # OPTIMIZACION: Cargamos el modelo UNA sola vez al iniciar la app
-        # Esto ahorra milisegundos valiosos en cada busqueda.
-        logger.info(f"Cargando modelo Raranker: {settings.RAG_RERANKER_MODEL}...")
-        self.ranker = Ranker(model_name=settings.RAG_RERANKER_MODEL, cache_dir="opt")
-        logger.info("Modelo Reranker listo en memoria.")
-
     # Recibe una sesion de BD y datos
     async def create_new_document(
         self, session: AsyncSession, document_data: KnowledgeBase
@@ -38,102 +38,188 @@ class KnowledgeService:
         """
         # 1. Aqui iria logica extra si existiera
 
-        # Unimos titulo y contenido para que el vector tenga mas contexto
-        full_text = f"{document_data.title}. {document_data.content}"
+        created = await self.create_new_documents(session, [document_data])
+        return created[0]
 
-        # Agregamos prefijo
-        text_to_embed = f"passage: {full_text}"
+    async def create_new_documents(
+        self,
+        session: AsyncSession,
+        documents: list[KnowledgeBase],
+        batch_size: int | None = None,
+    ) -> list[KnowledgeBase]:
+        """
+        Version por lotes de create_new_document.
+        Vectoriza todos los documentos en N/batch_size llamadas y los guarda juntos.
+        """
+        if not documents:
+            return []
 
-        # Generamos el vector y devolviendo la lista de floats
-        vector = await llm_service.get_embedding(text_to_embed)
+        # Unimos titulo y contenido para que el vector tenga mas contexto
+        texts = [f"{doc.title}. {doc.content}" for doc in documents]
 
-        # Asignar el vector al objeto
-        document_data.embedding = vector
+        # El prefijo 'passage:' lo agrega el servicio de embeddings
+        vectors = await llm_service.embed_passages(texts, batch_size=batch_size)
 
-        # Guardamos en la BD
-        session.add(document_data)
-        await session.commit()
-        await session.refresh(document_data)
+        # Asignar el vector a cada objeto
+        for doc, vector in zip(documents, vectors, strict=True):
+            doc.embedding = vector
 
-        return document_data
+        # Guardamos en la BD (expire_on_commit=False: los ids quedan cargados)
+        session.add_all(documents)
+        await session.commit()
+        bump_corpus_generation()
 
-    async def get_all_documents(self, session: AsyncSession) -> list[KnowledgeBase]:
-        statement = select(KnowledgeBase)
-        results = await session.exec(statement)
-        return list(results.all())
+        return documents
 
-    async def proccess_pdf(
-        self, session: AsyncSession, file: UploadFile
-    ) -> PDFResponse:  # noqa: E501
+    async def list_documents(
+        self,
+        session: AsyncSession,
+        limit: int,
+        after_id: int | None = None,
+        source: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> KnowledgePage:
         """
-        Recibe un PDF, lo guarda temporalmente, lo trocea y vectoriza cada parte
+        Una pagina del listado (sin embeddings). Pedimos una fila de mas para
+        saber si hay pagina siguiente sin un COUNT aparte.
         """
-        suffix = os.path.splitext(file.filename or "")[1]
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            temp_path = tmp_file.name
-
-        try:
-            # Carga del pdf
-            logger.info(f"Procesando PDF: {file.filename}")
-
-            # Carga y Chunking (CPU Bound - Rapido)
-            loader = PyMuPDFLoader(temp_path)
-            docs = loader.load()  # Extrae el texto pagina por pagina
-
-            # Chunking
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=settings.RAG_CHUNK_SIZE,
-                chunk_overlap=settings.RAG_CHUNK_OVERLAP,
-            )
-            splits = text_splitter.split_documents(docs)
-
-            logger.info(f"Generados {len(splits)} chunks para {file.filename}")
+        statement = build_listing_statement(
+            after_id=after_id,
+            source=source,
+            created_from=created_from,
+            created_to=created_to,
+            limit=limit + 1,
+        )
+        conn = await session.connection()
+        rows = (await conn.execute(statement)).mappings().all()
+        items = [KnowledgeRead.model_validate(row) for row in rows[:limit]]
+        next_cursor = items[-1].id if len(rows) > limit else None
+        return KnowledgePage(items=items, next_cursor=next_cursor)
 
-            # Vectorizacion concurrente
-            semaphore = asyncio.Semaphore(5)
+    async def stream_documents(
+        self,
+        after_id: int | None = None,
+        source: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Listado completo en NDJSON (un documento JSON por linea) leyendo de un
+        cursor del lado del servidor: en memoria solo hay un lote de filas.
+        Usa su propia sesion porque el cuerpo se envia despues de que el
+        endpoint retorna.
+        """
+        statement = build_listing_statement(
+            after_id=after_id,
+            source=source,
+            created_from=created_from,
+            created_to=created_to,
+        ).execution_options(yield_per=settings.KNOWLEDGE_STREAM_BATCH_SIZE)
+
+        async with async_session_factory() as session:
+            result = await session.stream(statement)
+            async for rows in result.mappings().partitions():
+                yield b"".join(
+                    KnowledgeRead.model_validate(row).model_dump_json().encode() + b"\n"
+                    for row in rows
+                )
 
-            async def get_embedding_controlled(text: str):
-                async with semaphore:
-                    # Añadimos el prefijo
-                    return await llm_service.get_embedding(f"passage: {text}")  # noqa: E501
+    async def stage_upload(self, file: UploadFile) -> PDFSource:
+        """
+        Prepara el PDF subido para la ingesta en segundo plano (el upload se
+        cierra al terminar la peticion, asi que siempre se conserva una copia).
+        - Hasta RAG_PDF_IN_MEMORY_MAX_BYTES (el spool en memoria de Starlette):
+          una copia en bytes, que viaja una vez al worker que lo parsea. Sin
+          escribir ni releer un temporal.
+        - Por encima: el upload ya esta en disco; se copia a RAG_TEMP_DIR y los
+          workers lo abren con mmap (solo viaja la ruta).
+        """
+        size = file.size
+        if size is not None and size <= settings.RAG_PDF_IN_MEMORY_MAX_BYTES:
+            return PDFSource(data=await file.read())
 
-            tasks = [get_embedding_controlled(split.page_content) for split in splits]
+        suffix = os.path.splitext(file.filename or "")[1]
+        os.makedirs(settings.RAG_TEMP_DIR, exist_ok=True)
 
-            # Ejecutamos todas la tareas en paralelo y esperamos los resultados
-            vectors = await asyncio.gather(*tasks)
+        def _copy() -> str:
+            with tempfile.NamedTemporaryFile(
+                delete=False, suffix=suffix, dir=settings.RAG_TEMP_DIR
+            ) as tmp_file:
+                shutil.copyfileobj(file.file, tmp_file)
+                return tmp_file.name
 
-            # Insercion Masiva en BD
-            new_chunks = []
-            for i, split in enumerate(splits):
-                meta = cast(dict[str, Any], split.metadata)  # type: ignore
+        return PDFSource(path=await asyncio.to_thread(_copy))
 
-                # Usamos el vector que ya calculamos en paralelo
-                chunk = KnowledgeBase(
-                    title=f"{file.filename} - Pag {meta.get('page', 0) + 1}",
-                    content=split.page_content,
-                    source=file.filename or "unknown",
-                    embedding=vectors[i],
-                )
-                new_chunks.append(chunk)  # type: ignore
+    async def proccess_pdf(
+        self,
+        session: AsyncSession,
+        source: PDFSource,
+        filename: str,
+        stats: IngestionStats | None = None,
+    ) -> IngestionStats:
+        """
+        Trocea y vectoriza un PDF (en memoria o en disco).
+        Cada lote se confirma al terminar: si algo falla, los lotes previos quedan.
+        'stats' se actualiza en vivo para reportar progreso.
+        """
+        try:
+            # Carga del pdf
+            logger.info(f"Procesando PDF: {filename}")
 
-            session.add_all(new_chunks)  # type: ignore
-            await session.commit()
+            # Streaming: parseo en pool de procesos -> embeddings -> insercion
+            pipeline = PDFIngestionPipeline(session, filename, stats=stats)
+            result = await pipeline.run(source)
 
-            return PDFResponse(
-                filename=file.filename or "unknown",
-                message="PDF procesado exitosamente.",
-                chunks_created=len(splits),
+            logger.info(
+                f"Generados {result.chunks_stored} chunks para {filename} "
+                f"({result.pages_parsed} paginas)"
             )
+            return result
 
         except Exception as e:
             logger.error(f"Error procesando PDF: {str(e)}")
             raise e
         finally:
-            # Limpieza del archivo temporal
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            # Limpieza del archivo temporal (si lo hubo)
+            discard_pdf_source(source)
+
+    async def _vector_candidates(
+        self, session: AsyncSession, queries: list[str], limit: int
+    ) -> list[KnowledgeBase]:
+        query_vectors = await llm_service.embed_queries(queries)
+        return await vector_store.search(session, query_vectors, limit)
+
+    async def _lexical_candidates(
+        self, queries: list[str], limit: int
+    ) -> list[KnowledgeBase]:
+        # Sesion propia: una AsyncSession no admite consultas concurrentes
+        try:
+            async with async_session_factory() as lexical_session:
+                return await lexical_search(lexical_session, queries, limit)
+        except Exception as e:
+            logger.warning(f"Busqueda full-text fallo, solo vectores. Error {e}")
+            return []
+
+    async def _hybrid_candidates(
+        self, session: AsyncSession, queries: list[str], k: int
+    ) -> list[KnowledgeBase]:
+        """
+        Full-text y ANN en paralelo (el full-text ni espera a los embeddings),
+        fusionados con RRF. Al reranker solo llegan los k * factor mejores.
+        """
+        vector_docs, lexical_docs = await asyncio.gather(
+            self._vector_candidates(session, queries, k * 2),
+            self._lexical_candidates(queries, k * 2),
+        )
+        logger.info(
+            f"Candidatos hibridos: {len(vector_docs)} vectoriales, "
+            f"{len(lexical_docs)} full-text"
+        )
+        fused = reciprocal_rank_fusion(
+            [vector_docs, lexical_docs], rrf_k=settings.RAG_RRF_K
+        )
+        return fused[: k * settings.RAG_HYBRID_RERANK_FACTOR]
 
     async def search_similarity(
         self,
@@ -155,28 +241,15 @@ class KnowledgeService:
         )
         logger.info(f"Queries generadas: {search_queries}")
 
-        # 2. Recuperacion masiva
-        all_candidates: list[KnowledgeBase] = []
-        seen_ids: set[Any] = set()
-
-        for q in search_queries:
-            q_vector = await llm_service.get_embedding(q)
-
-            statement = (
-                select(KnowledgeBase)
-                .order_by(KnowledgeBase.embedding.cosine_distance(q_vector))  # type: ignore
-                .limit(k * 2)
+        # 2. Recuperacion masiva: todos los vectores en un lote y todos los
+        # candidatos en una sola consulta; en modo hibrido tambien full-text
+        if settings.RAG_RETRIEVAL_MODE == "hybrid":
+            all_candidates = await self._hybrid_candidates(session, search_queries, k)
+        else:
+            all_candidates = await self._vector_candidates(
+                session, search_queries, k * 2
             )
 
-            result = await session.exec(statement)
-
-            results = result.all()
-
-            for doc in results:
-                if doc.id not in seen_ids:
-                    all_candidates.append(doc)
-                    seen_ids.add(doc.id)
-
         if not all_candidates:
             return []
 
@@ -201,9 +274,8 @@ class KnowledgeService:
         # 4. RERANKING
         # OJO: Aquí el Reranker compara los documentos encontrados contra
         # la pregunta ORIGINAL del usuario. Él decide cuál es la mejor respuesta.
-        reranked_results = self.ranker.rerank(
-            RerankRequest(query=rerank_query, passages=passages)
-        )  # noqa: E501
+        # Corre en el pool del reranker (micro-batching con otras busquedas)
+        reranked_results = await reranker_service.rerank(rerank_query, passages)
 
         # 5. FILTRADO y RETORNO (THRESHOLDING)
         final_docs: list[KnowledgeBase] = []
@@ -2,11 +2,20 @@ import logging
 
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_huggingface import HuggingFaceEmbeddings, HuggingFaceEndpointEmbeddings
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field, SecretStr
 
 from app.core.config import settings
+from app.core.observability import (
+    QUERY_EXPANSION_CACHE_HITS_TOTAL,
+    QUERY_EXPANSION_CACHE_MISSES_TOTAL,
+    QUERY_EXPANSION_INFLIGHT_SHARED_TOTAL,
+    QUERY_EXPANSION_SKIPPED_TOTAL,
+    increment_counter,
+)
+from app.core.ttl_cache import AsyncTTLCache
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_engine import embedding_engine, embedding_model_tag
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +27,20 @@ class SearchQueryResponse(BaseModel):
     )
 
 
+def _clean_text(text: str) -> str:
+    # Limpiamos saltos de linea que a veces ensucian al vector
+    return text.replace("\n", " ").strip()
+
+
+def _normalize_for_key(text: str | None) -> str:
+    # Misma pregunta con otras mayusculas/espacios = misma expansion
+    return " ".join((text or "").lower().split()).rstrip("?.!¿¡ ")
+
+
+def _is_short_keyword_query(query: str) -> bool:
+    return len(query.split()) <= settings.RAG_QUERY_EXPANSION_MAX_KEYWORDS
+
+
 class LLMService:
     """
     Servicio de infraestructura:
@@ -37,41 +60,109 @@ class LLMService:
             api_key=self.api_key,
             temperature=0.3,
             streaming=True,
+            # Con base_url propio langchain-openai no pide el uso en streaming:
+            # sin esto el presupuesto de tokens por peticion nunca se consume
+            stream_usage=True,
             max_tokens=2048,  # type: ignore
         )
 
-        # Embeddings
-        app_env = settings.ENVIRONMENT
-        model_id = "intfloat/multilingual-e5-large"
+        # Embeddings: cola con lotes dinamicos (ver embedding_engine)
+        # El id incluye el backend (torch / onnx-int8) para no mezclar vectores
+        model_id = embedding_model_tag()
+        self.embedding_model_id = model_id
 
-        if app_env == "production":
-            logger.info(" MODO PRODUCCION: Uso de HuggingFace API")
-            self.embeddings = HuggingFaceEndpointEmbeddings(
-                model=model_id,
-                task="feature-extraction",
-                huggingfacehub_api_token=settings.HF_TOKEN,
+        # Cache de embeddings: evita recalcular textos ya vistos
+        self.embedding_cache: EmbeddingCache | None = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                model_id=model_id,
+                max_items=settings.EMBEDDING_CACHE_MAX_ITEMS,
+                db_path=settings.EMBEDDING_CACHE_PATH or None,
             )
-        else:
-            logger.info("Modo desarrollo: Cargando el modelo de embeddings")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=model_id,
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={
-                    "normalize_embeddings": True
-                },  # Ayuda a la similitud de coseno
+
+        # Cache de expansiones de queries: (query, contexto) normalizados
+        self.query_expansion_cache: AsyncTTLCache[tuple[str, str], list[str]] = (
+            AsyncTTLCache(
+                max_items=settings.RAG_QUERY_EXPANSION_CACHE_MAX_ITEMS,
+                ttl_seconds=settings.RAG_QUERY_EXPANSION_CACHE_TTL_SECONDS,
             )
+        )
 
     async def get_embedding(self, text: str) -> list[float]:
         """
         Genera embeddings para la query de busqueda.
         """
-        # Limpiamos saltos de linea que a veces ensucian al vector
-        clean_text = text.replace("\n", " ").strip()
-
         # Prefijo obligatorio para el modelo de embedings intfloat/multilingual/e5
-        text_with_prefix = f"query: {clean_text}"
+        text_with_prefix = f"query: {_clean_text(text)}"
+
+        if self.embedding_cache is None:
+            return (await embedding_engine.embed([text_with_prefix]))[0]
 
-        return await self.embeddings.aembed_query(text_with_prefix)
+        cached = await self.embedding_cache.get_many([text_with_prefix])
+        if cached[0] is not None:
+            return cached[0]
+
+        vector = (await embedding_engine.embed([text_with_prefix]))[0]
+        await self.embedding_cache.put_many([text_with_prefix], [vector])
+        return vector
+
+    async def embed_passages(
+        self, texts: list[str], batch_size: int | None = None
+    ) -> list[list[float]]:
+        """
+        Genera embeddings para fragmentos de documentos (ingesta) en lotes.
+        Una llamada al modelo por lote en lugar de una por texto.
+        """
+        size = batch_size or settings.RAG_EMBED_BATCH_SIZE
+        if size < 1:
+            msg = "batch_size debe ser mayor a cero"
+            raise ValueError(msg)
+
+        # Prefijo obligatorio de e5 para documentos (NO usar 'query:' aqui)
+        prepared = [f"passage: {_clean_text(text)}" for text in texts]
+        return await self._embed_cached(prepared, size)
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Genera embeddings para varias queries de busqueda en una sola llamada.
+        Usado por la busqueda multi-query (variantes de la pregunta).
+        """
+        prepared = [f"query: {_clean_text(text)}" for text in texts]
+        return await self._embed_cached(prepared, max(len(prepared), 1))
+
+    async def _embed_cached(
+        self, prepared: list[str], batch_size: int
+    ) -> list[list[float]]:
+        if self.embedding_cache is None:
+            return await self._embed_documents(prepared, batch_size)
+
+        # Solo vamos al modelo con los textos que no estan en cache
+        vectors = await self.embedding_cache.get_many(prepared)
+        missing = list(
+            dict.fromkeys(prepared[i] for i, v in enumerate(vectors) if v is None)
+        )
+
+        if missing:
+            computed = await self._embed_documents(missing, batch_size)
+            await self.embedding_cache.put_many(missing, computed)
+            by_text = dict(zip(missing, computed, strict=True))
+            vectors = [
+                v if v is not None else by_text[t]
+                for t, v in zip(prepared, vectors, strict=True)
+            ]
+
+        return [v for v in vectors if v is not None]
+
+    async def _embed_documents(
+        self, texts: list[str], batch_size: int
+    ) -> list[list[float]]:
+        # Una tanda por vez: la ingesta no llena la cola del motor y las
+        # queries de busqueda se intercalan entre sus lotes
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            vectors.extend(await embedding_engine.embed(batch))
+        return vectors
 
     async def generate_search_queries(
         self, original_query: str, context_summary: str | None = None
@@ -80,7 +171,44 @@ class LLMService:
         Genera variantes de la pregunta usando terminologia medica tecnica
         para mejorar la recuperacion en documentos oficiales, tambien usa el contexto
         del paciente si existe.
+        - Las expansiones se cachean (TTL) y las concurrentes identicas
+          comparten una sola llamada al LLM (single-flight).
+        - En modo 'budget' las queries cortas de palabras clave no se expanden.
         """
+        mode = settings.RAG_QUERY_EXPANSION_MODE
+        if mode == "off" or (
+            mode == "budget"
+            and not context_summary
+            and _is_short_keyword_query(original_query)
+        ):
+            increment_counter(QUERY_EXPANSION_SKIPPED_TOTAL)
+            return [original_query]
+
+        key = (_normalize_for_key(original_query), _normalize_for_key(context_summary))
+        if self.query_expansion_cache.get(key) is not None:
+            increment_counter(QUERY_EXPANSION_CACHE_HITS_TOTAL)
+        elif self.query_expansion_cache.is_inflight(key):
+            increment_counter(QUERY_EXPANSION_INFLIGHT_SHARED_TOTAL)
+        else:
+            increment_counter(QUERY_EXPANSION_CACHE_MISSES_TOTAL)
+
+        try:
+            variants = await self.query_expansion_cache.get_or_compute(
+                key, lambda: self._expand_query(original_query, context_summary)
+            )
+        except Exception as e:
+            # Fallback seguro: Si falla la IA, usamos solo la original
+            logger.warning(
+                f"Fallo al generar variantes de busqueda. Usando query original. Error {e}"  # noqa: E501
+            )  # noqa: E501
+            return [original_query]
+
+        # Agregamos la query original y deduplicamos
+        return list(dict.fromkeys([*variants, original_query]))
+
+    async def _expand_query(
+        self, original_query: str, context_summary: str | None
+    ) -> list[str]:
         # Configuracion del parser
         parser = PydanticOutputParser(pydantic_object=SearchQueryResponse)
 
@@ -111,36 +239,20 @@ class LLMService:
             partial_variables={"format_instructions": parser.get_format_instructions()},
         )
 
-        try:
-            # Si no hay contexto, pasamos un string vacio para no romper el prompt
-            safe_context = (
-                context_summary
-                if context_summary
-                else "No hay datos previos del paciente."
-            )  # noqa: E501
-
-            chain = prompt | self.llm | parser  # type: ignore
-
-            response: SearchQueryResponse = await chain.ainvoke(  # type: ignore
-                {  # type: ignore
-                    "query": original_query,
-                    "context": safe_context,
-                }
-            )
-
-            generated_queries = response.queries
-            # Agregamos la query original
-            generated_queries.append(original_query)
+        # Si no hay contexto, pasamos un string vacio para no romper el prompt
+        safe_context = (
+            context_summary if context_summary else "No hay datos previos del paciente."
+        )
 
-            # Deduplicar
-            return list(dict.fromkeys(generated_queries))
+        chain = prompt | self.llm | parser  # type: ignore
 
-        except Exception as e:
-            # Fallback seguro: Si falla la IA, usamos solo la original
-            logger.warning(
-                f"Fallo al generar variantes de busqueda. Usando query original. Error {e}"  # noqa: E501
-            )  # noqa: E501
-            return [original_query]
+        response: SearchQueryResponse = await chain.ainvoke(  # type: ignore
+            {  # type: ignore
+                "query": original_query,
+                "context": safe_context,
+            }
+        )
+        return list(response.queries)
 
 
 llm_service = LLMService()
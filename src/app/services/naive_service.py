@@ -1,10 +1,9 @@
 from typing import Any, cast
 
-from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.knowledge import KnowledgeBase
 from app.services.llm_service import llm_service
+from app.services.vector_store import vector_store
 
 
 class NaiveRAGService:
@@ -16,20 +15,11 @@ class NaiveRAGService:
         1. Embed Query -> 2. Vector Search -> 3. Prompt Stuffing -> 4. LLM answer
         """
 
-        # 1. Vectorizacion
-        query_vector = await llm_service.get_embedding(f"query: {query}")
+        # 1. Vectorizacion (el prefijo 'query:' lo agrega el servicio)
+        query_vector = await llm_service.get_embedding(query)
 
-        # 2. Busqueda semantica
-        statement = (
-            select(KnowledgeBase)
-            .order_by(
-                KnowledgeBase.embedding.cosine_distance(query_vector)  # type: ignore
-            )
-            .limit(5)
-        )
-
-        results = await session.exec(statement)
-        retrived_chunks = results.all()
+        # 2. Busqueda semantica (pgvector o motor en proceso)
+        retrived_chunks = await vector_store.search(session, [query_vector], 5)
 
         if not retrived_chunks:
             return {
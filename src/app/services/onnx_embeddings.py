@@ -0,0 +1,368 @@
+"""
+Backend ONNX Runtime para el modelo de embeddings en modo local.
+
+    python -m app.services.onnx_embeddings export
+    python -m app.services.onnx_embeddings parity --min-cosine 0.99
+    python -m app.services.onnx_embeddings benchmark --runs 20
+
+- export: exporta EMBEDDING_MODEL_ID a ONNX y, con EMBEDDING_ONNX_QUANTIZE,
+  lo cuantiza a int8 dinamico (pesos int8, activaciones en tiempo de ejecucion).
+- parity: similitud coseno entre los vectores ONNX y los del modelo float
+  (PyTorch) sobre un corpus fijo. Sale con error si alguna queda bajo el umbral.
+- benchmark: latencia por lote (p50/p95) y textos/s de ambos backends.
+Correr parity y benchmark antes de activar EMBEDDING_BACKEND=onnx.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol, cast
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_FP32_FILE = "model.onnx"
+_INT8_FILE = "model_int8.onnx"
+_TOKENIZER_FILE = "tokenizer.json"
+
+# Corpus fijo de la prueba de paridad (con los prefijos e5 que usa la app)
+PARITY_CORPUS = [
+    "query: sintomas de hipoglucemia en adultos mayores",
+    "query: dosis inicial de metformina",
+    "query: criterios diagnosticos de hipertension arterial",
+    "query: manejo de la cetoacidosis diabetica",
+    "query: esquema de vacunacion en embarazadas",
+    "passage: La metformina es el farmaco de primera linea en diabetes tipo 2 "
+    "y se inicia con 500 mg una o dos veces al dia con los alimentos.",
+    "passage: Se considera hipertension arterial una presion sistolica mayor "
+    "o igual a 140 mmHg o diastolica mayor o igual a 90 mmHg.",
+    "passage: La hipoglucemia se manifiesta con temblor, sudoracion, "
+    "palpitaciones, confusion y, en casos graves, convulsiones.",
+    "passage: La cetoacidosis diabetica requiere hidratacion intravenosa, "
+    "insulina en infusion continua y reposicion de potasio.",
+    "passage: Durante el embarazo se recomienda la vacuna Tdap entre las "
+    "semanas 27 y 36 de gestacion.",
+    "passage: El indice de masa corporal se calcula dividiendo el peso en "
+    "kilogramos entre la talla en metros al cuadrado.",
+    "passage: La hemoglobina glucosilada refleja el control glucemico "
+    "promedio de los ultimos dos a tres meses.",
+]
+
+
+class _Encoding(Protocol):
+    ids: list[int]
+    type_ids: list[int]
+    attention_mask: list[int]
+
+
+class _Tokenizer(Protocol):
+    # Lo que usamos de tokenizers.Tokenizer
+    def encode_batch(self, input: list[str]) -> list[_Encoding]: ...
+
+
+class _InferenceSession(Protocol):
+    # Lo que usamos de onnxruntime.InferenceSession
+    def run(
+        self, output_names: None, input_feed: dict[str, np.ndarray]
+    ) -> list[np.ndarray]: ...
+
+
+def onnx_model_dir(model_id: str, base_dir: str) -> str:
+    return os.path.join(base_dir, model_id.replace("/", "--"))
+
+
+def onnx_model_path(model_dir: str, quantized: bool) -> str:
+    return os.path.join(model_dir, _INT8_FILE if quantized else _FP32_FILE)
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Pooling de e5: promedio de los tokens reales (sin padding) y norma L2,
+    igual que sentence-transformers con normalize_embeddings=True.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return pooled / norms
+
+
+def export_onnx_model(model_id: str, model_dir: str, quantize: bool) -> str:
+    """
+    Exporta el modelo (PyTorch -> ONNX) y opcionalmente lo cuantiza a int8.
+    Solo se usa torch/transformers aqui; en ejecucion basta onnxruntime.
+    """
+    import torch as torch_module
+    import transformers
+
+    # Sin tipos completos en torch/transformers: se usan como Any
+    torch = cast(Any, torch_module)
+    auto_tokenizer = cast(Any, transformers).AutoTokenizer
+    auto_model = cast(Any, transformers).AutoModel
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = auto_tokenizer.from_pretrained(model_id)
+    tokenizer.save_pretrained(model_dir)
+
+    fp32_path = onnx_model_path(model_dir, quantized=False)
+    if not os.path.exists(fp32_path):
+        model = auto_model.from_pretrained(model_id)
+        model.config.return_dict = False
+        model.eval()
+        logger.info(f"Exportando {model_id} a ONNX ({fp32_path})...")
+        sample = tokenizer(["query: warm-up"], return_tensors="pt")
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": dynamic,
+                    "attention_mask": dynamic,
+                    "last_hidden_state": dynamic,
+                },
+                opset_version=17,
+                # Exportador TorchScript: el de dynamo (por defecto en torch
+                # 2.9) exige onnxscript y no respeta dynamic_axes
+                dynamo=False,
+            )
+
+    if not quantize:
+        return fp32_path
+
+    int8_path = onnx_model_path(model_dir, quantized=True)
+    logger.info(f"Cuantizando a int8 dinamico ({int8_path})...")
+    from onnxruntime import quantization  # type: ignore
+
+    quantizer = cast(Any, quantization)
+    quantizer.quantize_dynamic(
+        fp32_path,
+        int8_path,
+        weight_type=quantizer.QuantType.QInt8,
+        # El modelo float pesa mas de 2 GB: los pesos van en archivo aparte
+        use_external_data_format=True,
+    )
+    return int8_path
+
+
+def ensure_onnx_model(model_id: str, base_dir: str, quantize: bool) -> str:
+    model_dir = onnx_model_dir(model_id, base_dir)
+    path = onnx_model_path(model_dir, quantize)
+    if os.path.exists(path) and os.path.exists(
+        os.path.join(model_dir, _TOKENIZER_FILE)
+    ):
+        return path
+    return export_onnx_model(model_id, model_dir, quantize)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embeddings e5 con ONNX Runtime en CPU: tokenizador rapido (tokenizers),
+    una inferencia por lote y mean pooling + normalizacion en numpy.
+    """
+
+    def __init__(
+        self, model_path: str, intra_op_threads: int = 0, max_length: int = 512
+    ) -> None:
+        import onnxruntime  # type: ignore
+        import tokenizers
+
+        ort = cast(Any, onnxruntime)
+        options = ort.SessionOptions()
+        # 0 = valor por defecto de ONNX Runtime (todos los nucleos)
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.session: _InferenceSession = session
+        self._input_names: set[str] = {i.name for i in session.get_inputs()}
+
+        tokenizer_path = os.path.join(os.path.dirname(model_path), _TOKENIZER_FILE)
+        tokenizer = cast(Any, tokenizers).Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_length=max_length)
+        tokenizer.enable_padding()
+        self.tokenizer: _Tokenizer = tokenizer
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        encoded = self.tokenizer.encode_batch(texts)
+        inputs: dict[str, np.ndarray] = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encoded], dtype=np.int64
+            ),
+        }
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.array(
+                [e.type_ids for e in encoded], dtype=np.int64
+            )
+
+        hidden = self.session.run(None, inputs)[0]
+        return mean_pool(hidden, inputs["attention_mask"]).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_onnx_embeddings(model_id: str, threads: int | None = None) -> OnnxEmbeddings:
+    path = ensure_onnx_model(
+        model_id, settings.EMBEDDING_ONNX_DIR, settings.EMBEDDING_ONNX_QUANTIZE
+    )
+    logger.info(f"Cargando modelo de embeddings ONNX: {path}")
+    return OnnxEmbeddings(
+        path, intra_op_threads=settings.EMBEDDING_ONNX_INTRA_OP_THREADS or threads or 0
+    )
+
+
+@dataclass
+class ParityReport:
+    min_cosine: float
+    mean_cosine: float
+    texts: int
+
+
+def cosine_agreement(
+    reference: Sequence[Sequence[float]], candidate: Sequence[Sequence[float]]
+) -> ParityReport:
+    ref = np.asarray(reference, dtype=np.float32)
+    cand = np.asarray(candidate, dtype=np.float32)
+    cosines = (ref * cand).sum(axis=1) / (
+        np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1)
+    )
+    return ParityReport(
+        min_cosine=float(cosines.min()),
+        mean_cosine=float(cosines.mean()),
+        texts=len(cosines),
+    )
+
+
+@dataclass
+class LatencyReport:
+    backend: str
+    batch_size: int
+    p50_ms: float
+    p95_ms: float
+    texts_per_second: float
+
+
+def summarize_latencies(
+    backend: str, batch_size: int, samples_seconds: Sequence[float]
+) -> LatencyReport:
+    samples = np.asarray(samples_seconds, dtype=np.float64)
+    return LatencyReport(
+        backend=backend,
+        batch_size=batch_size,
+        p50_ms=float(np.percentile(samples, 50) * 1000),
+        p95_ms=float(np.percentile(samples, 95) * 1000),
+        texts_per_second=batch_size / float(samples.mean()),
+    )
+
+
+def benchmark(
+    backend: str, embeddings: Embeddings, batch_size: int, runs: int
+) -> LatencyReport:
+    texts = (PARITY_CORPUS * (batch_size // len(PARITY_CORPUS) + 1))[:batch_size]
+    embeddings.embed_documents(texts)  # warm-up
+    samples: list[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        embeddings.embed_documents(texts)
+        samples.append(time.perf_counter() - started)
+    return summarize_latencies(backend, batch_size, samples)
+
+
+def format_latency_reports(reports: Sequence[LatencyReport]) -> str:
+    lines = [f"{'backend':<12} {'lote':>5} {'p50 ms':>9} {'p95 ms':>9} {'textos/s':>9}"]
+    for report in reports:
+        lines.append(
+            f"{report.backend:<12} {report.batch_size:>5} {report.p50_ms:>9.1f} "
+            f"{report.p95_ms:>9.1f} {report.texts_per_second:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _onnx_label() -> str:
+    return "onnx-int8" if settings.EMBEDDING_ONNX_QUANTIZE else "onnx-fp32"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    description = __doc__.splitlines()[1] if __doc__ else None
+    parser = argparse.ArgumentParser(description=description)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("export")
+
+    parity_parser = commands.add_parser("parity")
+    parity_parser.add_argument("--min-cosine", type=float, default=0.99)
+
+    benchmark_parser = commands.add_parser("benchmark")
+    benchmark_parser.add_argument("--runs", type=int, default=20)
+    benchmark_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 8, 32]
+    )
+
+    args = parser.parse_args(argv)
+    model_id = settings.EMBEDDING_MODEL_ID
+    if args.command == "export":
+        print(
+            ensure_onnx_model(
+                model_id, settings.EMBEDDING_ONNX_DIR, settings.EMBEDDING_ONNX_QUANTIZE
+            )
+        )
+        return 0
+
+    # Referencia: el mismo modelo en PyTorch (float32)
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    reference = HuggingFaceEmbeddings(
+        model_name=model_id,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": True},
+    )
+    candidate = load_onnx_embeddings(model_id)
+
+    if args.command == "parity":
+        report = cosine_agreement(
+            reference.embed_documents(PARITY_CORPUS),
+            candidate.embed_documents(PARITY_CORPUS),
+        )
+        print(
+            f"{_onnx_label()} vs torch: coseno min {report.min_cosine:.4f}, "
+            f"medio {report.mean_cosine:.4f} ({report.texts} textos)"
+        )
+        if report.min_cosine < args.min_cosine:
+            print(f"Paridad insuficiente (umbral {args.min_cosine})")
+            return 1
+        return 0
+
+    reports: list[LatencyReport] = []
+    for batch_size in args.batch_sizes:
+        reports.append(benchmark("torch", reference, batch_size, args.runs))
+        reports.append(benchmark(_onnx_label(), candidate, batch_size, args.runs))
+    print(format_latency_reports(reports))
+    return 0
+
+
+def run() -> None:
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    run()
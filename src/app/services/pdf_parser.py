@@ -0,0 +1,95 @@
+# Funciones de parseo y chunking de PDFs que corren en el pool de procesos.
+# Este modulo se importa dentro de los workers: debe quedar liviano
+# (nada de modelos, settings ni sesiones de BD). Todo llega por parametro.
+import mmap
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import pymupdf  # type: ignore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# (indice de pagina, texto del chunk)
+ParsedChunk = tuple[int, str]
+# (paginas leidas, chunks)
+ParsedRange = tuple[int, list[ParsedChunk]]
+
+
+@dataclass(frozen=True)
+class PDFSource:
+    """
+    Origen de un PDF subido.
+    - data: el PDF en memoria (uploads chicos, sin pasar por disco).
+    - path: archivo temporal (uploads grandes), se abre con mmap.
+    """
+
+    data: bytes | None = None
+    path: str | None = None
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+
+def discard_pdf_source(source: PDFSource) -> None:
+    # Borra el archivo temporal si el PDF no estaba en memoria
+    if source.path is not None and os.path.exists(source.path):
+        os.remove(source.path)
+
+
+@contextmanager
+def open_pdf(source: PDFSource) -> Iterator[Any]:
+    # API de streams de PyMuPDF: lee directo del buffer, sin copiarlo
+    if source.data is not None:
+        with pymupdf.open(stream=source.data, filetype="pdf") as doc:  # type: ignore
+            yield doc
+        return
+
+    if source.path is None:
+        msg = "PDFSource necesita 'data' o 'path'"
+        raise ValueError(msg)
+
+    with (
+        open(source.path, "rb") as pdf_file,
+        mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+    ):
+        view = memoryview(mapped)
+        try:
+            with pymupdf.open(stream=view, filetype="pdf") as doc:  # type: ignore
+                yield doc
+        finally:
+            view.release()
+
+
+def count_pages(source: PDFSource) -> int:
+    with open_pdf(source) as doc:
+        return int(doc.page_count)
+
+
+def parse_page_range(
+    source: PDFSource,
+    start: int,
+    stop: int | None,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> ParsedRange:
+    """
+    Extrae el texto de las paginas [start, stop) y lo divide en chunks.
+    stop=None lee hasta el final del documento.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    chunks: list[ParsedChunk] = []
+    with open_pdf(source) as doc:
+        end = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_index in range(start, end):
+            text: str = doc[page_index].get_text()
+            for chunk in text_splitter.split_text(text):
+                chunks.append((page_index, chunk))
+
+    return max(end - start, 0), chunks
@@ -0,0 +1,23 @@
+from typing import Any
+
+from app.models.knowledge import KnowledgeBase
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: list[list[KnowledgeBase]], rrf_k: int = 60
+) -> list[KnowledgeBase]:
+    """
+    Reciprocal Rank Fusion: score(d) = sum(1 / (rrf_k + posicion)).
+    Solo usa posiciones, asi que mezcla rankings con escalas distintas
+    (distancia coseno vs ts_rank) sin normalizar.
+    """
+    scores: dict[Any, float] = {}
+    documents: dict[Any, KnowledgeBase] = {}
+
+    for ranked in ranked_lists:
+        for position, doc in enumerate(ranked, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1 / (rrf_k + position)
+            documents.setdefault(doc.id, doc)
+
+    ordered_ids = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return [documents[doc_id] for doc_id in ordered_ids]
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
+
+from flashrank import Ranker, RerankRequest  # type: ignore
+
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.observability import (
+    RERANK_BATCH_PAIRS,
+    RERANK_BATCH_REQUESTS,
+    RERANK_QUEUE_DEPTH,
+    observe_histogram,
+    set_gauge,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pasajes con el formato de FlashRank: {"id", "text", "meta"}
+Passage = dict[str, Any]
+
+_STOPPED_MESSAGE = "Reranker detenido"
+
+
+@dataclass
+class _RerankJob:
+    query: str
+    passages: list[Passage]
+    future: asyncio.Future[list[Passage]]
+
+
+def _fail_jobs(jobs: list[_RerankJob], error: Exception) -> None:
+    for job in jobs:
+        if not job.future.done():
+            job.future.set_exception(error)
+
+
+def _set_result(future: asyncio.Future[list[Passage]], result: list[Passage]) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future[list[Passage]], error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+class RerankerService:
+    """
+    Reranking fuera del event loop con micro-batching entre peticiones.
+    - La inferencia ONNX de FlashRank (Ranker.rerank) corre en un pool de
+      hilos dedicado, con 'workers' lotes en paralelo como maximo.
+    - Las peticiones que llegan dentro de la ventana (pocos ms) se juntan en
+      un lote: un solo paso por el pool para todas (un Ranker.rerank por
+      peticion, acotado a max_batch_pairs pares por lote).
+    - Cada peticion se resuelve apenas se puntua, sin esperar al resto del lote.
+    """
+
+    def __init__(
+        self,
+        ranker: Any | None,
+        batch_window_ms: float,
+        max_batch_requests: int,
+        max_batch_pairs: int,
+        workers: int = 1,
+    ) -> None:
+        self.ranker = ranker
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_requests = max_batch_requests
+        self.max_batch_pairs = max_batch_pairs
+        self.workers = max(workers, 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="reranker"
+        )
+        self._queue: asyncio.Queue[_RerankJob] | None = None
+        self._collector: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def rerank(self, query: str, passages: list[Passage]) -> list[Passage]:
+        """
+        Devuelve los pasajes con 'score', ordenados de mayor a menor.
+        """
+        if not passages:
+            return []
+
+        if self.ranker is None:
+            # Carga en segundo plano: la primera busqueda espera al modelo
+            self.ranker = await model_registry.get(RERANKER_MODEL_NAME)
+
+        queue = self._ensure_collector()
+        future: asyncio.Future[list[Passage]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        queue.put_nowait(_RerankJob(query=query, passages=passages, future=future))
+        set_gauge(RERANK_QUEUE_DEPTH, queue.qsize())
+        return await future
+
+    async def stop(self) -> None:
+        tasks = [*self._batches]
+        if self._collector is not None:
+            tasks.append(self._collector)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Lo que quedo en cola ya no tiene quien lo procese: falla, no cuelga
+        if self._queue is not None:
+            pending: list[_RerankJob] = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            _fail_jobs(pending, RuntimeError(_STOPPED_MESSAGE))
+        self._collector = None
+        self._queue = None
+        self._loop = None
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _ensure_collector(self) -> asyncio.Queue[_RerankJob]:
+        loop = asyncio.get_running_loop()
+        if (
+            self._queue is None
+            or self._collector is None
+            or self._collector.done()
+            or self._loop is not loop
+        ):
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(
+                self._collect(self._queue), name="reranker-collector"
+            )
+        return self._queue
+
+    async def _collect(self, queue: asyncio.Queue[_RerankJob]) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+        batch: list[_RerankJob] = []
+        try:
+            while True:
+                # Primero esperamos un hilo libre: lo que llegue mientras tanto
+                # se acumula y entra en el mismo lote
+                await slots.acquire()
+                batch = [await queue.get()]
+                pairs = len(batch[0].passages)
+
+                # Ventana de espera: juntamos lo que llegue en los proximos ms
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.max_batch_requests:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        job = await asyncio.wait_for(queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                    batch.append(job)
+                    pairs += len(job.passages)
+                    if pairs >= self.max_batch_pairs:
+                        break
+
+                set_gauge(RERANK_QUEUE_DEPTH, queue.qsize())
+                observe_histogram(RERANK_BATCH_REQUESTS, len(batch))
+                observe_histogram(RERANK_BATCH_PAIRS, pairs)
+
+                task = loop.create_task(self._run_batch(batch, slots))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Lote a medio armar al detener el servicio
+            _fail_jobs(batch, RuntimeError(_STOPPED_MESSAGE))
+            raise
+
+    async def _run_batch(
+        self, batch: list[_RerankJob], slots: asyncio.Semaphore
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            if self.ranker is None:
+                msg = "Reranker sin modelo cargado"
+                raise RuntimeError(msg)
+            await loop.run_in_executor(
+                self._executor, self._rerank_batch, self.ranker, batch, loop
+            )
+        except Exception as e:
+            logger.error(f"Fallo el reranking de un lote: {e}")
+            _fail_jobs(batch, e)
+            return
+        except asyncio.CancelledError:
+            _fail_jobs(batch, RuntimeError(_STOPPED_MESSAGE))
+            raise
+        finally:
+            slots.release()
+
+    def _rerank_batch(
+        self, ranker: Any, batch: list[_RerankJob], loop: asyncio.AbstractEventLoop
+    ) -> None:
+        # Corre en el pool de hilos: aqui si se puede bloquear. Cada future se
+        # resuelve en el event loop en cuanto su peticion termina
+        for job in batch:
+            try:
+                result = ranker.rerank(
+                    RerankRequest(query=job.query, passages=job.passages)
+                )
+            except Exception as e:
+                logger.error(f"Fallo el reranking de una peticion: {e}")
+                callback = partial(_set_exception, job.future, e)
+            else:
+                callback = partial(_set_result, job.future, result)
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                # Event loop cerrado: ya nadie espera estos resultados
+                return
+
+
+RERANKER_MODEL_NAME = "reranker"
+
+
+def _load_ranker() -> Any:
+    logger.info(f"Cargando modelo Reranker: {settings.RAG_RERANKER_MODEL}...")
+    return Ranker(
+        model_name=settings.RAG_RERANKER_MODEL,
+        cache_dir=settings.RAG_RERANKER_CACHE_DIR,
+    )
+
+
+def _warmup_ranker(ranker: Any) -> None:
+    ranker.rerank(
+        RerankRequest(query="warm-up", passages=[{"id": "0", "text": "warm-up"}])
+    )
+
+
+model_registry.register(RERANKER_MODEL_NAME, _load_ranker, warmup=_warmup_ranker)
+
+reranker_service = RerankerService(
+    ranker=None,
+    batch_window_ms=settings.RAG_RERANK_BATCH_WINDOW_MS,
+    max_batch_requests=settings.RAG_RERANK_MAX_BATCH_REQUESTS,
+    max_batch_pairs=settings.RAG_RERANK_MAX_BATCH_PAIRS,
+    workers=settings.RAG_RERANK_WORKERS,
+)
@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_engine import embedding_model_tag
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Awaitable[list[float]]]
+
+# Temperatura del softmax sobre similitudes coseno: las diferencias entre
+# centroides de e5 son pequeñas (decimas), asi se vuelven probabilidades utiles
+_SOFTMAX_TEMPERATURE = 0.05
+
+
+async def _default_embedder(text: str) -> list[float]:
+    # Importacion diferida: el modelo de embeddings se carga al primer uso
+    from app.services.llm_service import llm_service
+
+    return await llm_service.get_embedding(text)
+
+
+@dataclass
+class RoutePrediction:
+    label: str
+    confidence: float
+
+
+class RouteClassifier:
+    """
+    Clasificador por centroides de embeddings, entrenado en linea con las
+    decisiones del supervisor LLM (primer paso de cada turno).
+    - Un centroide por etiqueta (DATA_AGENT, DOCS_AGENT, FINISH, ...).
+    - Solo predice cuando todas las etiquetas vistas tienen min_examples.
+    - Se persiste en JSON (sumas + conteos) junto al id del modelo de embeddings.
+    """
+
+    def __init__(
+        self,
+        min_examples: int,
+        path: str | None = None,
+        model_tag: str = "",
+        embedder: Embedder | None = None,
+        save_every: int = 20,
+    ) -> None:
+        self.min_examples = min_examples
+        self.path = path
+        self.model_tag = model_tag
+        self.save_every = save_every
+        self._embedder = embedder or _default_embedder
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = {}
+        self._unsaved = 0
+        self._load()
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self._counts) >= 2 and all(
+            count >= self.min_examples for count in self._counts.values()
+        )
+
+    async def predict(self, text: str) -> RoutePrediction | None:
+        if not self.is_ready:
+            return None
+        try:
+            vector = _normalize(await self._embedder(text))
+        except Exception as e:
+            logger.warning(f"Clasificador de rutas sin embeddings: {e}")
+            return None
+        return self.predict_vector(vector)
+
+    def predict_vector(self, vector: np.ndarray) -> RoutePrediction:
+        labels = list(self._sums)
+        centroids = np.stack([_normalize(self._sums[label]) for label in labels])
+        similarities = centroids @ vector
+        weights = np.exp((similarities - similarities.max()) / _SOFTMAX_TEMPERATURE)
+        probabilities = weights / weights.sum()
+        best = int(np.argmax(probabilities))
+        return RoutePrediction(
+            label=labels[best], confidence=float(probabilities[best])
+        )
+
+    async def learn(self, text: str, label: str) -> None:
+        try:
+            vector = _normalize(await self._embedder(text))
+        except Exception as e:
+            logger.warning(f"Clasificador de rutas sin embeddings: {e}")
+            return
+        self.learn_vector(vector, label)
+
+    def learn_vector(self, vector: np.ndarray, label: str) -> None:
+        if label in self._sums:
+            self._sums[label] = self._sums[label] + vector
+        else:
+            self._sums[label] = vector.astype(np.float64)
+        self._counts[label] = self._counts.get(label, 0) + 1
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        if not self.path or not self._unsaved:
+            return
+        payload = {
+            "model": self.model_tag,
+            "labels": {
+                label: {"count": self._counts[label], "sum": self._sums[label].tolist()}
+                for label in self._sums
+            },
+        }
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Escritura atomica: un reinicio a medias no deja un JSON roto. Temporal
+        # de nombre unico: varios workers pueden guardar el mismo archivo
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", delete=False, suffix=".tmp", dir=directory
+        ) as handle:
+            json.dump(payload, handle)
+        try:
+            os.replace(handle.name, self.path)
+        except OSError:
+            os.unlink(handle.name)
+            raise
+        self._unsaved = 0
+
+    def counts(self) -> dict[str, int]:
+        return dict(self._counts)
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el clasificador de rutas: {e}")
+            return
+
+        if payload.get("model") != self.model_tag:
+            # Otro modelo de embeddings: los centroides no son comparables
+            logger.info("Modelo de embeddings distinto: clasificador de rutas vacio")
+            return
+        for label, data in payload.get("labels", {}).items():
+            self._sums[label] = np.asarray(data["sum"], dtype=np.float64)
+            self._counts[label] = int(data["count"])
+
+
+def _normalize(vector: list[float] | np.ndarray) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float64)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+def _build_classifier() -> RouteClassifier:
+    return RouteClassifier(
+        min_examples=settings.GRAPH_ROUTE_CLASSIFIER_MIN_EXAMPLES,
+        path=settings.GRAPH_ROUTE_CLASSIFIER_PATH or None,
+        model_tag=embedding_model_tag(),
+    )
+
+
+route_classifier = _build_classifier()
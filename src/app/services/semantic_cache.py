@@ -0,0 +1,190 @@
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.corpus import get_corpus_generation
+from app.core.observability import (
+    SEMANTIC_CACHE_BYPASSED_TOTAL,
+    SEMANTIC_CACHE_HIT_RATE,
+    SEMANTIC_CACHE_HITS_TOTAL,
+    SEMANTIC_CACHE_LATENCY_SAVED_SECONDS,
+    SEMANTIC_CACHE_MISSES_TOTAL,
+    get_counter_value,
+    increment_counter,
+    observe_histogram,
+    set_gauge,
+)
+from app.core.patient_refs import has_patient_reference
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Awaitable[list[float]]]
+
+
+def has_patient_context(message: str) -> bool:
+    """
+    Misma deteccion de paciente concreto (ID o nombre) que el pre-router: lo
+    que alli va al DATA_AGENT nunca se sirve desde el cache.
+    """
+    return has_patient_reference(message)
+
+
+async def _default_embedder(text: str) -> list[float]:
+    # Importacion diferida: el modelo de embeddings se carga al primer uso
+    from app.services.llm_service import llm_service
+
+    return await llm_service.get_embedding(text)
+
+
+@dataclass
+class SemanticCacheLookup:
+    # vector: embedding de la pregunta (se reutiliza al guardar)
+    vector: np.ndarray | None = None
+    value: Any | None = None
+
+    @property
+    def hit(self) -> bool:
+        return self.value is not None
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    value: Any
+    created_at: float
+    latency_seconds: float
+
+
+class SemanticCache:
+    """
+    Cache de respuestas por similitud semantica de la pregunta.
+    - Clave: embedding de la pregunta; hit si la similitud coseno supera el umbral.
+    - TTL por entrada y tamaño maximo (se descartan las mas viejas).
+    - Se vacia cuando cambia la generacion del corpus (ingesta de documentos).
+    Los fallos del cache nunca rompen la peticion: se tratan como miss.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        threshold: float,
+        ttl_seconds: float,
+        max_items: int,
+        embedder: Embedder | None = None,
+    ) -> None:
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._embedder = embedder or _default_embedder
+        self._entries: list[_Entry] = []
+        self._matrix: np.ndarray | None = None
+        self._generation = get_corpus_generation()
+
+    async def lookup(self, query: str) -> SemanticCacheLookup:
+        if has_patient_context(query):
+            increment_counter(SEMANTIC_CACHE_BYPASSED_TOTAL)
+            return SemanticCacheLookup()
+
+        try:
+            vector = _normalize(await self._embedder(query))
+        except Exception as e:
+            logger.warning(f"Cache semantico ({self.namespace}) no disponible: {e}")
+            return SemanticCacheLookup()
+
+        self._evict_stale()
+        entry = self._best_match(vector)
+        if entry is None:
+            increment_counter(SEMANTIC_CACHE_MISSES_TOTAL)
+            self._update_hit_rate()
+            return SemanticCacheLookup(vector=vector)
+
+        increment_counter(SEMANTIC_CACHE_HITS_TOTAL)
+        observe_histogram(SEMANTIC_CACHE_LATENCY_SAVED_SECONDS, entry.latency_seconds)
+        self._update_hit_rate()
+        logger.info(f"Cache semantico ({self.namespace}): hit")
+        return SemanticCacheLookup(vector=vector, value=entry.value)
+
+    def store(
+        self, lookup: SemanticCacheLookup, value: Any, latency_seconds: float
+    ) -> None:
+        # Sin vector = la pregunta se salto el cache (o el embedding fallo)
+        if lookup.vector is None:
+            return
+
+        self._evict_stale()
+        self._entries.append(
+            _Entry(
+                vector=lookup.vector,
+                value=value,
+                created_at=time.monotonic(),
+                latency_seconds=latency_seconds,
+            )
+        )
+        if len(self._entries) > self.max_items:
+            del self._entries[: len(self._entries) - self.max_items]
+        self._matrix = None
+
+    def clear(self) -> None:
+        self._entries = []
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _best_match(self, vector: np.ndarray) -> _Entry | None:
+        if not self._entries:
+            return None
+
+        if self._matrix is None:
+            self._matrix = np.stack([entry.vector for entry in self._entries])
+
+        similarities = self._matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return self._entries[best]
+
+    def _evict_stale(self) -> None:
+        generation = get_corpus_generation()
+        if generation != self._generation:
+            # Documentos nuevos: las respuestas guardadas pueden estar desactualizadas
+            self._generation = generation
+            self.clear()
+            return
+
+        now = time.monotonic()
+        fresh = [e for e in self._entries if now - e.created_at < self.ttl_seconds]
+        if len(fresh) != len(self._entries):
+            self._entries = fresh
+            self._matrix = None
+
+    def _update_hit_rate(self) -> None:
+        hits = get_counter_value(SEMANTIC_CACHE_HITS_TOTAL)
+        misses = get_counter_value(SEMANTIC_CACHE_MISSES_TOTAL)
+        set_gauge(SEMANTIC_CACHE_HIT_RATE, hits / max(hits + misses, 1))
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+def _build_cache(namespace: str) -> SemanticCache:
+    return SemanticCache(
+        namespace=namespace,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_items=settings.SEMANTIC_CACHE_MAX_ITEMS,
+    )
+
+
+# Un cache por endpoint: las respuestas tienen formatos distintos
+agent_answer_cache = _build_cache("agent")
+naive_answer_cache = _build_cache("naive")
@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Literal, Protocol
+
+import numpy as np
+from sqlalchemy import BigInteger, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.corpus import get_corpus_generation
+from app.db.search_indexes import EMBEDDING_DIMENSIONS, apply_vector_search_settings
+from app.db.vector_search import first_stage_candidates, multi_query_search
+from app.models.knowledge import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+# Version de cada fila: xmin cambia con cada INSERT/UPDATE (nueva version de la
+# tupla), asi la suma delata filas modificadas por cualquier proceso
+_ROW_VERSION = literal_column("xmin::text::bigint", type_=BigInteger)
+
+_ROW_COLUMNS = (
+    col(KnowledgeBase.id),
+    col(KnowledgeBase.title),
+    col(KnowledgeBase.content),
+    col(KnowledgeBase.source),
+    col(KnowledgeBase.created_at),
+    col(KnowledgeBase.embedding),
+    _ROW_VERSION.label("row_version"),
+)
+
+
+class VectorStore(Protocol):
+    """
+    Motor de busqueda vectorial intercambiable.
+    search: top-'limit' por cada vector, documentos unicos (sin embedding)
+    ordenados por su mejor distancia coseno.
+    """
+
+    async def search(
+        self, session: AsyncSession, vectors: Sequence[list[float]], limit: int
+    ) -> list[KnowledgeBase]: ...
+
+    async def refresh(self, session: AsyncSession) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class PgVectorStore:
+    """Busqueda en Postgres con pgvector (indice ANN / nivel comprimido)."""
+
+    async def search(
+        self, session: AsyncSession, vectors: Sequence[list[float]], limit: int
+    ) -> list[KnowledgeBase]:
+        await apply_vector_search_settings(
+            session, candidates=first_stage_candidates(limit)
+        )
+        return await multi_query_search(session, vectors, limit)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        # Postgres siempre esta al dia
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+class NumpyVectorStore:
+    """
+    Busqueda exacta en proceso: matriz (filas x 1024) memory-mapped + ids.
+    - Producto punto vectorizado y top-k con argpartition (sin ir a la BD).
+    - Sincronizacion con Postgres (cualquier proceso pudo escribir): al cambiar
+      la generacion local del corpus o cada 'sync_seconds' se compara
+      (filas, suma de xmin) de lo ya cargado contra la BD. Si coincide solo se
+      cargan filas con id mayor al ultimo visto; si no (borrados, updates o
+      ids menores confirmados tarde) la matriz se reconstruye.
+    Pensado para corpus que entran en memoria (decenas/cientos de miles de chunks).
+    """
+
+    # Filas por bloque al multiplicar (acota la memoria temporal en float32)
+    _SEARCH_BLOCK_ROWS = 16_384
+    _REFRESH_PAGE_SIZE = 2_000
+
+    def __init__(
+        self,
+        dtype: Literal["float32", "float16"] = "float32",
+        path: str | None = None,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        sync_seconds: float = 5.0,
+    ) -> None:
+        self.dtype_name: Literal["float32", "float16"] = dtype
+        self.dtype = np.dtype(dtype)
+        self.dimensions = dimensions
+        self.path = path
+        self.sync_seconds = sync_seconds
+        self._size = 0
+        self._capacity = 0
+        self._matrix: np.ndarray = np.empty((0, dimensions), dtype=self.dtype)
+        self._ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self._documents: dict[int, KnowledgeBase] = {}
+        self._last_id = 0
+        self._version_sum = 0
+        self._synced_generation: int | None = None
+        self._synced_at: float | None = None
+        self._lock = threading.RLock()
+        self._refresh_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def search(
+        self, session: AsyncSession, vectors: Sequence[list[float]], limit: int
+    ) -> list[KnowledgeBase]:
+        if self._needs_sync():
+            await self.refresh(session)
+        if not vectors or self._size == 0:
+            return []
+
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        ranked = await asyncio.to_thread(self._top_k, queries, limit)
+        return [self._documents[doc_id] for doc_id, _ in ranked]
+
+    def _needs_sync(self) -> bool:
+        if self._synced_at is None:
+            return True
+        if self._synced_generation != get_corpus_generation():
+            return True
+        return time.monotonic() - self._synced_at >= self.sync_seconds
+
+    async def refresh(self, session: AsyncSession) -> None:
+        async with self._refresh_lock:
+            if not self._needs_sync():
+                return
+            generation = get_corpus_generation()
+
+            conn = await session.connection()
+            if await self._loaded_rows_changed(conn):
+                loaded = await self._rebuild(conn)
+                logger.info(f"Vector store en proceso: reconstruido ({loaded} filas)")
+            else:
+                loaded = await self._load_new_rows(conn)
+                if loaded:
+                    logger.info(
+                        f"Vector store en proceso: +{loaded} filas ({self._size})"
+                    )
+
+            self._synced_generation = generation
+            self._synced_at = time.monotonic()
+
+    async def _loaded_rows_changed(self, conn: AsyncConnection) -> bool:
+        # Mismas filas y mismas versiones que las cargadas (id <= ultimo visto)
+        result = await conn.execute(
+            select(func.count(), func.coalesce(func.sum(_ROW_VERSION), 0))
+            .select_from(KnowledgeBase)
+            .where(col(KnowledgeBase.id) <= self._last_id)
+            .where(col(KnowledgeBase.embedding).is_not(None))
+        )
+        rows, versions = result.one()
+        return (int(rows), int(versions)) != (self._size, self._version_sum)
+
+    async def _load_new_rows(self, conn: AsyncConnection) -> int:
+        loaded = 0
+        while True:
+            result = await conn.execute(
+                select(*_ROW_COLUMNS)
+                .where(col(KnowledgeBase.id) > self._last_id)
+                .where(col(KnowledgeBase.embedding).is_not(None))
+                .order_by(col(KnowledgeBase.id))
+                .limit(self._REFRESH_PAGE_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                return loaded
+            self.add(rows)
+            loaded += len(rows)
+
+    async def _rebuild(self, conn: AsyncConnection) -> int:
+        """
+        Carga todo en una matriz nueva y la intercambia al final: las
+        busquedas siguen usando la anterior mientras tanto.
+        """
+        fresh = NumpyVectorStore(
+            dtype=self.dtype_name,
+            path=f"{self.path}.rebuild" if self.path else None,
+            dimensions=self.dimensions,
+        )
+        loaded = await fresh._load_new_rows(conn)
+        with self._lock:
+            if self.path:
+                if fresh.path and os.path.exists(fresh.path):
+                    # El mapeo de 'fresh' sigue valido tras renombrar el archivo
+                    os.replace(fresh.path, self.path)
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+            self._matrix = fresh._matrix
+            self._ids = fresh._ids
+            self._documents = fresh._documents
+            self._size = fresh._size
+            self._capacity = fresh._capacity
+            self._last_id = fresh._last_id
+            self._version_sum = fresh._version_sum
+        return loaded
+
+    def add(self, rows: Sequence[Any]) -> None:
+        """
+        Agrega filas con id, title, content, source, created_at, embedding y
+        row_version (xmin).
+        """
+        if not rows:
+            return
+
+        vectors = _normalize_rows(
+            np.asarray([row.embedding for row in rows], dtype=np.float32)
+        )
+        with self._lock:
+            self._ensure_capacity(self._size + len(rows))
+            end = self._size + len(rows)
+            self._matrix[self._size : end] = vectors.astype(self.dtype)
+            self._ids[self._size : end] = [row.id for row in rows]
+            for row in rows:
+                self._documents[row.id] = KnowledgeBase(
+                    id=row.id,
+                    title=row.title,
+                    content=row.content,
+                    source=row.source,
+                    created_at=row.created_at,
+                )
+            self._size = end
+            self._last_id = max(self._last_id, max(row.id for row in rows))
+            self._version_sum += sum(int(row.row_version) for row in rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = np.empty((0, self.dimensions), dtype=self.dtype)
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _top_k(self, queries: np.ndarray, limit: int) -> list[tuple[int, float]]:
+        with self._lock:
+            size = self._size
+            scores = np.empty((size, len(queries)), dtype=np.float32)
+            for start in range(0, size, self._SEARCH_BLOCK_ROWS):
+                block = self._matrix[start : min(start + self._SEARCH_BLOCK_ROWS, size)]
+                scores[start : start + len(block)] = (
+                    block.astype(np.float32) @ queries.T
+                )
+            ids = self._ids[:size].copy()
+
+        k = min(limit, size)
+        if k < 1:
+            return []
+        best: dict[int, float] = {}
+        for column in scores.T:
+            # argpartition: O(n) para elegir los k mejores, sin ordenar todo
+            top = np.argpartition(-column, k - 1)[:k]
+            for index in top:
+                doc_id = int(ids[index])
+                distance = 1.0 - float(column[index])
+                if distance < best.get(doc_id, np.inf):
+                    best[doc_id] = distance
+
+        return sorted(best.items(), key=lambda item: item[1])
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2, 1024)
+        self._ids = np.resize(self._ids, capacity)
+
+        if not self.path:
+            matrix = np.zeros((capacity, self.dimensions), dtype=self.dtype)
+            matrix[: self._size] = self._matrix[: self._size]
+            self._matrix = matrix
+        else:
+            # Crecer el archivo y volver a mapearlo conserva lo ya escrito
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            mode = "r+b" if self._capacity else "w+b"
+            with open(self.path, mode) as matrix_file:
+                matrix_file.truncate(capacity * self.dimensions * self.dtype.itemsize)
+            self._matrix = np.memmap(
+                self.path,
+                dtype=self.dtype,
+                mode="r+",
+                shape=(capacity, self.dimensions),
+            )
+
+        self._capacity = capacity
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build_vector_store() -> VectorStore:
+    if settings.RAG_VECTOR_STORE == "numpy":
+        path = None
+        if settings.RAG_NUMPY_STORE_DIR:
+            # Un archivo por proceso (cada worker de uvicorn tiene su copia)
+            path = os.path.join(
+                settings.RAG_NUMPY_STORE_DIR,
+                f"knowledge-{os.getpid()}.{settings.RAG_NUMPY_STORE_DTYPE}",
+            )
+        return NumpyVectorStore(
+            dtype=settings.RAG_NUMPY_STORE_DTYPE,
+            path=path,
+            sync_seconds=settings.RAG_NUMPY_STORE_SYNC_SECONDS,
+        )
+    return PgVectorStore()
+
+
+vector_store = build_vector_store()
@@ -14,7 +14,9 @@ class _StubGraph:
         self._response_text = response_text
         self._safety_meta = safety_meta
 
-    async def ainvoke(self, _: dict[str, Any]) -> dict[str, Any]:
+    async def ainvoke(
+        self, _: dict[str, Any], config: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
         result: dict[str, Any] = {"messages": [AIMessage(content=self._response_text)]}
         if self._safety_meta is not None:
             result["safety_meta"] = self._safety_meta
@@ -33,9 +35,13 @@ def _load_agent_module_with_stub_graph(
         response_text=response_text,
         safety_meta=safety_meta,
     )
+    workflow_module.get_threaded_graph = lambda: None
     monkeypatch.setitem(sys.modules, "app.graph.workflow", workflow_stub)
     sys.modules.pop("app.api.v1.endpoints.agent", None)
-    return importlib.import_module("app.api.v1.endpoints.agent")
+    agent_module = importlib.import_module("app.api.v1.endpoints.agent")
+    # Sin cache semantico: no carga el modelo de embeddings
+    monkeypatch.setattr(agent_module.settings, "SEMANTIC_CACHE_ENABLED", False)
+    return agent_module
 
 
 def _build_test_client(agent_module: Any) -> TestClient:
@@ -0,0 +1,87 @@
+import importlib
+import sys
+from types import ModuleType
+from typing import Any, cast
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from app.services.semantic_cache import SemanticCache
+
+
+class _CountingGraph:
+    def __init__(self, used_patient_data: bool = False) -> None:
+        self.calls = 0
+        self._used_patient_data = used_patient_data
+
+    async def ainvoke(
+        self, _: dict[str, Any], config: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        self.calls += 1
+        return {
+            "messages": [AIMessage(content=f"Respuesta {self.calls}")],
+            "used_patient_data": self._used_patient_data,
+        }
+
+
+async def _constant_embedder(_: str) -> list[float]:
+    return [1.0, 0.0]
+
+
+def _build_client(monkeypatch: pytest.MonkeyPatch, graph: _CountingGraph) -> TestClient:
+    workflow_stub = ModuleType("app.graph.workflow")
+    cast(Any, workflow_stub).graph = graph
+    cast(Any, workflow_stub).get_threaded_graph = lambda: None
+    monkeypatch.setitem(sys.modules, "app.graph.workflow", workflow_stub)
+    sys.modules.pop("app.api.v1.endpoints.agent", None)
+    agent_module = importlib.import_module("app.api.v1.endpoints.agent")
+
+    monkeypatch.setattr(agent_module.settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        agent_module,
+        "agent_answer_cache",
+        SemanticCache(
+            namespace="agent",
+            threshold=0.95,
+            ttl_seconds=60,
+            max_items=10,
+            embedder=_constant_embedder,
+        ),
+    )
+
+    # El limiter es global (y cada reimport registra otro limite): aqui no aplica
+    monkeypatch.setattr(agent_module.limiter, "enabled", False)
+
+    app = FastAPI()
+    app.state.limiter = agent_module.limiter
+    app.include_router(agent_module.router, prefix="/api/v1/agent")
+    return TestClient(app)
+
+
+# Verifica que la segunda pregunta equivalente no vuelva a ejecutar el grafo.
+def test_repeated_question_is_served_from_cache(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    graph = _CountingGraph()
+
+    with _build_client(monkeypatch, graph) as client:
+        first = client.post("/api/v1/agent/chat", json={"message": "que es la HbA"})
+        second = client.post("/api/v1/agent/chat", json={"message": "que es la HbA"})
+
+    assert graph.calls == 1
+    assert first.json() == second.json()
+
+
+# Verifica que no se cacheen respuestas que usaron datos de pacientes.
+def test_answers_with_patient_data_are_not_cached(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    graph = _CountingGraph(used_patient_data=True)
+
+    with _build_client(monkeypatch, graph) as client:
+        client.post("/api/v1/agent/chat", json={"message": "resumen de Ana"})
+        client.post("/api/v1/agent/chat", json={"message": "resumen de Ana"})
+
+    assert graph.calls == 2
@@ -0,0 +1,137 @@
+import importlib
+import json
+import sys
+from collections.abc import AsyncIterator
+from types import ModuleType
+from typing import Any, cast
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def _node_event(kind: str, node: str, output: Any = None) -> dict[str, Any]:
+    return {
+        "event": kind,
+        "name": node,
+        "metadata": {"langgraph_node": node},
+        "parent_ids": ["root"],
+        "data": {} if output is None else {"output": output},
+    }
+
+
+def _token(node: str, text: str) -> dict[str, Any]:
+    return {
+        "event": "on_chat_model_stream",
+        "name": "ChatOpenAI",
+        "metadata": {"langgraph_node": node},
+        "parent_ids": ["root", "node"],
+        "data": {"chunk": AIMessageChunk(content=text)},
+    }
+
+
+class _StreamingGraph:
+    def __init__(self, safety_replacement: str | None = None) -> None:
+        self.safety_replacement = safety_replacement
+
+    async def astream_events(
+        self, _: dict[str, Any], version: str, config: dict[str, Any] | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        assert version == "v2"
+        yield _node_event("on_chain_start", "supervisor")
+        # Tokens del supervisor (JSON de ruteo): no deben llegar al cliente
+        yield _token("supervisor", '{"next": "FINISH"}')
+        yield _node_event("on_chain_end", "supervisor", {"next": "FINISH"})
+        yield _node_event("on_chain_start", "specialist")
+        yield _token("specialist", "La HbA1c ")
+        yield _token("specialist", "mide la glucosa promedio.")
+        yield _node_event("on_chain_end", "specialist", {})
+        yield _node_event("on_chain_start", "safety_gate")
+
+        final = "La HbA1c mide la glucosa promedio."
+        gate_output: dict[str, Any] = {"safety_meta": {"path": "pass_through"}}
+        if self.safety_replacement is not None:
+            final = self.safety_replacement
+            gate_output = {
+                "messages": [AIMessage(content=final)],
+                "safety_meta": {"path": "escalation", "escalated": True},
+            }
+        yield _node_event("on_chain_end", "safety_gate", gate_output)
+        yield {
+            "event": "on_chain_end",
+            "name": "LangGraph",
+            "metadata": {},
+            "parent_ids": [],
+            "data": {"output": {"messages": [AIMessage(content=final)]}},
+        }
+
+
+def _build_client(
+    monkeypatch: pytest.MonkeyPatch, graph: _StreamingGraph
+) -> TestClient:
+    workflow_stub = ModuleType("app.graph.workflow")
+    cast(Any, workflow_stub).graph = graph
+    cast(Any, workflow_stub).get_threaded_graph = lambda: None
+    monkeypatch.setitem(sys.modules, "app.graph.workflow", workflow_stub)
+    sys.modules.pop("app.api.v1.endpoints.agent", None)
+    agent_module = importlib.import_module("app.api.v1.endpoints.agent")
+
+    monkeypatch.setattr(agent_module.settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_module.limiter, "enabled", False)
+
+    app = FastAPI()
+    app.state.limiter = agent_module.limiter
+    app.include_router(agent_module.router, prefix="/api/v1/agent")
+    return TestClient(app)
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict[str, Any]]]:
+    events: list[tuple[str, dict[str, Any]]] = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+# Verifica progreso de nodos, tokens solo del especialista y respuesta final.
+def test_stream_emits_progress_tokens_and_done(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    with _build_client(monkeypatch, _StreamingGraph()) as client:
+        response = client.post(
+            "/api/v1/agent/chat/stream", json={"message": "que es la HbA1c"}
+        )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    kinds = [kind for kind, _ in events]
+
+    assert kinds[0] == "start"
+    assert ("route", {"next": "FINISH"}) in events
+    assert ("node_start", {"node": "specialist"}) in events
+    assert [data["text"] for kind, data in events if kind == "token"] == [
+        "La HbA1c ",
+        "mide la glucosa promedio.",
+    ]
+    assert "replace" not in kinds
+    assert events[-1] == ("done", {"response": "La HbA1c mide la glucosa promedio."})
+
+
+# Verifica que el safety gate pueda retractar el borrador ya transmitido.
+def test_stream_emits_replace_when_safety_gate_rewrites(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    graph = _StreamingGraph(safety_replacement="Acude a urgencias de inmediato.")
+
+    with _build_client(monkeypatch, graph) as client:
+        response = client.post(
+            "/api/v1/agent/chat/stream", json={"message": "me duele el pecho"}
+        )
+
+    events = _parse_sse(response.text)
+    kinds = [kind for kind, _ in events]
+
+    assert ("replace", {"text": "Acude a urgencias de inmediato."}) in events
+    assert kinds.index("replace") > kinds.index("token")
+    assert events[-1] == ("done", {"response": "Acude a urgencias de inmediato."})
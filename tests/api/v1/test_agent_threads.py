@@ -0,0 +1,112 @@
+import importlib
+import sys
+from types import ModuleType
+from typing import Any, cast
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+
+class _RecordingGraph:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.configs: list[dict[str, Any] | None] = []
+        self.inputs: list[dict[str, Any]] = []
+
+    async def ainvoke(
+        self, inputs: dict[str, Any], config: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        self.inputs.append(inputs)
+        self.configs.append(config)
+        return {"messages": [AIMessage(content=f"Respuesta {self.name}")]}
+
+
+def _build_client(
+    monkeypatch: pytest.MonkeyPatch,
+    graph: _RecordingGraph,
+    threaded_graph: _RecordingGraph | None,
+) -> TestClient:
+    workflow_stub = ModuleType("app.graph.workflow")
+    cast(Any, workflow_stub).graph = graph
+    cast(Any, workflow_stub).get_threaded_graph = lambda: threaded_graph
+    monkeypatch.setitem(sys.modules, "app.graph.workflow", workflow_stub)
+    sys.modules.pop("app.api.v1.endpoints.agent", None)
+    agent_module = importlib.import_module("app.api.v1.endpoints.agent")
+
+    monkeypatch.setattr(agent_module.settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_module.limiter, "enabled", False)
+
+    app = FastAPI()
+    app.state.limiter = agent_module.limiter
+    app.include_router(agent_module.router, prefix="/api/v1/agent")
+    return TestClient(app)
+
+
+# Verifica que thread_id use el grafo con checkpointer y el id en la config.
+def test_thread_id_runs_checkpointed_graph(monkeypatch: pytest.MonkeyPatch) -> None:
+    graph = _RecordingGraph("sin hilo")
+    threaded_graph = _RecordingGraph("con hilo")
+
+    with _build_client(monkeypatch, graph, threaded_graph) as client:
+        thread_id = client.post("/api/v1/agent/threads").json()["thread_id"]
+        threaded = client.post(
+            "/api/v1/agent/chat",
+            json={"message": "y su ultima HbA1c?", "thread_id": thread_id},
+        )
+        stateless = client.post("/api/v1/agent/chat", json={"message": "hola"})
+
+    assert threaded.json() == {"response": "Respuesta con hilo"}
+    assert stateless.json() == {"response": "Respuesta sin hilo"}
+    [threaded_config] = threaded_graph.configs
+    [stateless_config] = graph.configs
+    assert threaded_config is not None and stateless_config is not None
+    # El checkpointer guarda la clave del hilo, sin la firma
+    assert threaded_config["configurable"]["thread_id"] == thread_id.split(".")[0]
+    assert "thread_id" not in stateless_config["configurable"]
+    # Las claves propias del turno se reinician sobre el estado guardado
+    [inputs] = threaded_graph.inputs
+    assert inputs["workers"] == []
+    assert inputs["pre_routed"] is False
+    assert inputs["used_patient_data"] is False
+
+
+# Verifica que un thread_id no emitido por el servidor no abra ningun hilo.
+def test_forged_thread_id_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    graph = _RecordingGraph("sin hilo")
+    threaded_graph = _RecordingGraph("con hilo")
+
+    with _build_client(monkeypatch, graph, threaded_graph) as client:
+        thread_id = client.post("/api/v1/agent/threads").json()["thread_id"]
+        thread_key, _, signature = thread_id.partition(".")
+        other_key = ("0" if thread_key[0] != "0" else "1") + thread_key[1:]
+        responses = [
+            client.post(
+                "/api/v1/agent/chat",
+                json={"message": "hola", "thread_id": forged},
+            )
+            for forged in ["hilo-1", thread_key, f"{other_key}.{signature}"]
+        ]
+
+    assert [response.status_code for response in responses] == [403, 403, 403]
+    assert threaded_graph.configs == []
+    assert graph.configs == []
+
+
+# Verifica que sin checkpointer el chat siga respondiendo (sin memoria).
+def test_thread_id_falls_back_without_checkpointer(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    graph = _RecordingGraph("sin hilo")
+
+    with _build_client(monkeypatch, graph, None) as client:
+        thread_id = client.post("/api/v1/agent/threads").json()["thread_id"]
+        response = client.post(
+            "/api/v1/agent/chat", json={"message": "hola", "thread_id": thread_id}
+        )
+
+    assert response.status_code == 200
+    [config] = graph.configs
+    assert config is not None
+    assert "thread_id" not in config["configurable"]
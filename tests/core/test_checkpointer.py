@@ -0,0 +1,71 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+
+from app.core import checkpointer
+from app.core.checkpointer import ConversationCheckpointer
+
+
+class _RecordingConnection:
+    # Registra cada sentencia con sus parametros; rowcount fijo por sentencia
+    def __init__(self, rowcounts: list[int]) -> None:
+        self.rowcounts = rowcounts
+        self.calls: list[tuple[str, dict[str, int] | None]] = []
+
+    async def execute(self, statement: str, params: Any = None) -> Any:
+        self.calls.append((statement, params))
+        return SimpleNamespace(rowcount=self.rowcounts[len(self.calls) - 1])
+
+
+class _FakePool:
+    def __init__(self, conn: _RecordingConnection) -> None:
+        self.conn = conn
+        self.checkouts = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[_RecordingConnection]:
+        self.checkouts += 1
+        yield self.conn
+
+
+def _checkpointer() -> ConversationCheckpointer:
+    return ConversationCheckpointer(
+        enabled=True,
+        min_pool_size=1,
+        max_pool_size=2,
+        keep_last=5,
+        ttl_hours=72,
+        prune_interval_seconds=60,
+    )
+
+
+# Verifica las tres podas, en orden, con sus parametros y en una sola conexion.
+def test_prune_runs_each_step_with_its_parameters() -> None:
+    conn = _RecordingConnection(rowcounts=[3, 12, 40])
+    pool = _FakePool(conn)
+    saver = _checkpointer()
+    saver._pool = pool  # type: ignore
+
+    deleted = asyncio.run(saver.prune())
+
+    assert conn.calls == [
+        (checkpointer.PRUNE_EXPIRED_THREADS_SQL, {"ttl_hours": 72}),
+        (checkpointer.PRUNE_OLD_CHECKPOINTS_SQL, {"keep_last": 5}),
+        (checkpointer.PRUNE_ORPHAN_BLOBS_SQL, None),
+    ]
+    assert deleted == {"expired_threads": 3, "old_checkpoints": 12, "orphan_blobs": 40}
+    assert pool.checkouts == 1
+
+
+# Verifica que sin pool (checkpointer desactivado o caido) no se pode nada.
+def test_prune_without_pool_is_a_noop() -> None:
+    assert asyncio.run(_checkpointer().prune()) == {}
+
+
+# Verifica que cada sentencia use los placeholders psycopg de sus parametros.
+def test_prune_statements_reference_their_parameters() -> None:
+    assert "%(ttl_hours)s" in checkpointer.PRUNE_EXPIRED_THREADS_SQL
+    assert "%(keep_last)s" in checkpointer.PRUNE_OLD_CHECKPOINTS_SQL
+    assert "%(" not in checkpointer.PRUNE_ORPHAN_BLOBS_SQL
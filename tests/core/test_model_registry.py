@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.core.model_registry import ModelRegistry, ModelState
+
+
+# Verifica que la carga en segundo plano deje el modelo listo con sus tiempos.
+def test_background_loading_marks_models_ready() -> None:
+    registry = ModelRegistry()
+    warmed: list[str] = []
+    registry.register("embeddings", lambda: "modelo", warmup=warmed.append)
+
+    async def _scenario() -> object:
+        assert registry.is_ready() is False
+        registry.start_background_loading()
+        await registry.wait_until_ready()
+        return await registry.get("embeddings")
+
+    instance = asyncio.run(_scenario())
+
+    report = registry.report()
+    assert instance == "modelo"
+    assert warmed == ["modelo"]
+    assert report["ready"] is True
+    assert report["models"]["embeddings"]["state"] == ModelState.READY
+    assert report["models"]["embeddings"]["load_seconds"] is not None
+    assert report["models"]["embeddings"]["warmup_seconds"] is not None
+
+
+# Verifica que get() comparta una sola carga entre llamadas concurrentes.
+def test_concurrent_get_loads_once() -> None:
+    registry = ModelRegistry()
+    calls: list[str] = []
+
+    def _loader() -> str:
+        calls.append("load")
+        return "reranker"
+
+    registry.register("reranker", _loader)
+
+    async def _scenario() -> list[object]:
+        return list(await asyncio.gather(*(registry.get("reranker") for _ in range(4))))
+
+    results = asyncio.run(_scenario())
+
+    assert calls == ["load"]
+    assert results == ["reranker"] * 4
+
+
+# Verifica que un fallo quede reportado y se reintente en la siguiente peticion.
+def test_failed_load_is_reported_and_retried() -> None:
+    registry = ModelRegistry()
+    attempts: list[int] = []
+
+    def _loader() -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("sin red")
+        return "modelo"
+
+    registry.register("embeddings", _loader)
+
+    async def _first() -> None:
+        await registry.get("embeddings")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_first())
+
+    report = registry.report()
+    assert report["ready"] is False
+    assert report["models"]["embeddings"]["state"] == ModelState.FAILED
+    assert report["models"]["embeddings"]["error"] == "sin red"
+
+    assert asyncio.run(registry.get("embeddings")) == "modelo"
+    assert registry.is_ready() is True
+
+
+# Verifica que el reporte incluya las fases de arranque registradas.
+def test_report_includes_startup_phases() -> None:
+    registry = ModelRegistry()
+    registry.record_startup_phase("db_init", 0.12345)
+
+    assert registry.report()["startup"] == {"db_init": 0.123}
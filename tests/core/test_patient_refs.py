@@ -0,0 +1,17 @@
+from app.core.patient_refs import has_patient_reference, patient_references
+
+
+# Verifica que se detecten IDs y nombres de paciente normalizados.
+def test_patient_references_detects_ids_and_names() -> None:
+    assert patient_references("Muestrame el historial del paciente 42") == {"42"}
+    assert patient_references("Datos del paciente Lopez") == {"lopez"}
+    assert patient_references("Historial de Maria Lopez") == {"maria lopez"}
+    assert has_patient_reference("Ficha del paciente #7")
+    assert not has_patient_reference("Que es la metformina?")
+
+
+# Verifica que titulos clinicos con mayuscula no se tomen por nombres.
+def test_clinical_titles_are_not_patient_names() -> None:
+    assert patient_references("Datos de Prevalencia de diabetes") == set()
+    assert patient_references("Historial de Hipertensión arterial") == set()
+    assert patient_references("Historial de Hipertensión Arterial") == set()
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.core.ttl_cache import AsyncTTLCache
+
+
+# Verifica que llamadas concurrentes con la misma clave compartan un solo calculo.
+def test_concurrent_identical_keys_share_one_computation() -> None:
+    cache: AsyncTTLCache[str, list[str]] = AsyncTTLCache(max_items=10, ttl_seconds=60)
+    calls: list[str] = []
+
+    async def _expand() -> list[str]:
+        calls.append("llm")
+        await asyncio.sleep(0.01)
+        return ["variante 1", "variante 2"]
+
+    async def _scenario() -> list[list[str]]:
+        results = await asyncio.gather(
+            *(cache.get_or_compute("diabetes", _expand) for _ in range(5))
+        )
+        # Ya cacheado: no vuelve a llamar
+        results.append(await cache.get_or_compute("diabetes", _expand))
+        return list(results)
+
+    results = asyncio.run(_scenario())
+
+    assert calls == ["llm"]
+    assert all(result == ["variante 1", "variante 2"] for result in results)
+
+
+# Verifica que los errores lleguen a todos los que esperaban y no se cacheen.
+def test_errors_are_shared_but_not_cached() -> None:
+    cache: AsyncTTLCache[str, str] = AsyncTTLCache(max_items=10, ttl_seconds=60)
+    attempts: list[int] = []
+
+    async def _flaky() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("LLM caido")
+        return "ok"
+
+    async def _scenario() -> str:
+        results = await asyncio.gather(
+            cache.get_or_compute("q", _flaky),
+            cache.get_or_compute("q", _flaky),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        return await cache.get_or_compute("q", _flaky)
+
+    assert asyncio.run(_scenario()) == "ok"
+    assert len(attempts) == 2
+
+
+# Verifica que si se cancela quien calculaba, otro de los que esperaban lo relevan.
+def test_cancelled_leader_hands_over_to_a_waiting_caller() -> None:
+    cache: AsyncTTLCache[str, str] = AsyncTTLCache(max_items=10, ttl_seconds=60)
+    attempts: list[int] = []
+
+    async def _slow() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def _scenario() -> list[str]:
+        leader = asyncio.create_task(cache.get_or_compute("q", _slow))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.create_task(cache.get_or_compute("q", _slow)) for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        return list(results)
+
+    assert asyncio.run(_scenario()) == ["ok", "ok", "ok"]
+    # Uno solo de los que esperaban repitio el calculo
+    assert len(attempts) == 2
+
+
+# Verifica la expiracion por TTL y el limite de tamaño (LRU).
+def test_entries_expire_and_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("app.core.ttl_cache.time.monotonic", lambda: now[0])
+    cache: AsyncTTLCache[str, int] = AsyncTTLCache(max_items=2, ttl_seconds=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.get("c") is None
@@ -0,0 +1,42 @@
+import struct
+from datetime import datetime
+
+from app.db import bulk
+from app.models.knowledge import KnowledgeBase
+
+
+def _read_fields(payload: bytes) -> list[bytes | None]:
+    (count,) = struct.unpack("!h", payload[:2])
+    offset = 2
+    fields: list[bytes | None] = []
+    for _ in range(count):
+        (length,) = struct.unpack("!i", payload[offset : offset + 4])
+        offset += 4
+        if length == -1:
+            fields.append(None)
+            continue
+        fields.append(payload[offset : offset + length])
+        offset += length
+    assert offset == len(payload)
+    return fields
+
+
+# Verifica la codificacion binaria de COPY para una fila de conocimiento.
+def test_encode_knowledge_row_uses_binary_copy_layout() -> None:
+    row = KnowledgeBase(
+        title="guia.pdf - Pag 1",
+        content="Criterios de diagnostico",
+        source=None,
+        created_at=datetime(2000, 1, 1, 0, 0, 1),
+        embedding=[1.0, 2.0],
+    )
+
+    fields = _read_fields(bulk.encode_knowledge_row(row))
+
+    assert len(fields) == len(bulk.KNOWLEDGE_COPY_COLUMNS)
+    assert fields[0] == b"guia.pdf - Pag 1"
+    assert fields[1] == b"Criterios de diagnostico"
+    assert fields[2] is None
+    assert fields[3] == struct.pack("!q", 1_000_000)
+    # pgvector: dimension, campo reservado y float32 big-endian
+    assert fields[4] == struct.pack("!hh2f", 2, 0, 1.0, 2.0)
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.db.listing import build_listing_statement
+from app.db.search_indexes import build_listing_index_ddl
+
+
+def _sql(**kwargs: object) -> str:
+    statement = build_listing_statement(**kwargs)  # type: ignore
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(),  # type: ignore
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+# Verifica que el listado nunca cargue la columna de embeddings.
+def test_listing_projects_columns_without_embedding() -> None:
+    sql = _sql(limit=101)
+
+    assert "knowledgebase.title" in sql
+    assert "embedding" not in sql
+    assert "ORDER BY knowledgebase.id" in sql
+    assert "LIMIT 101" in sql
+    assert "OFFSET" not in sql
+
+
+# Verifica el cursor por id y los filtros opcionales.
+def test_listing_applies_cursor_and_filters() -> None:
+    statement = build_listing_statement(
+        after_id=40,
+        source="guia.pdf",
+        created_from=datetime(2025, 1, 1),
+        created_to=datetime(2025, 2, 1),
+    )
+    compiled = statement.compile(dialect=postgresql.dialect())  # type: ignore
+    sql = str(compiled)
+
+    assert "knowledgebase.id > %(id_1)s" in sql
+    assert "knowledgebase.source = %(source_1)s" in sql
+    assert "knowledgebase.created_at >= %(created_at_1)s" in sql
+    assert "knowledgebase.created_at < %(created_at_2)s" in sql
+    assert "LIMIT" not in sql
+    assert compiled.params["id_1"] == 40
+    assert compiled.params["source_1"] == "guia.pdf"
+
+
+# Verifica que las fechas con zona se comparen como UTC sin zona (como created_at).
+def test_listing_normalizes_aware_datetimes_to_naive_utc() -> None:
+    statement = build_listing_statement(
+        created_from=datetime(2025, 1, 1, 21, 0, tzinfo=timezone(timedelta(hours=-3))),
+        created_to=datetime(2025, 2, 1),
+    )
+    params = statement.compile(dialect=postgresql.dialect()).params  # type: ignore
+
+    assert params["created_at_1"] == datetime(2025, 1, 2, 0, 0)
+    assert params["created_at_1"].tzinfo is None
+    assert params["created_at_2"] == datetime(2025, 2, 1)
+
+
+# Verifica los indices compuestos que sostienen el keyset con filtros.
+def test_listing_indexes_ddl() -> None:
+    ddl = build_listing_index_ddl()
+
+    assert any("(source, id)" in statement for statement in ddl)
+    assert any("(created_at, id)" in statement for statement in ddl)
+    assert all("IF NOT EXISTS" in statement for statement in ddl)
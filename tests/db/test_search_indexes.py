@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from app.db import search_indexes
+
+
+# Verifica que el DDL de HNSW use los parametros de construccion configurados.
+def test_hnsw_ddl_uses_configured_build_parameters(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_M", 24)
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_EF_CONSTRUCTION", 128)
+
+    ddl = search_indexes.build_vector_index_ddl("hnsw")
+
+    assert ddl.startswith("CREATE INDEX IF NOT EXISTS ix_knowledgebase_embedding_hnsw")
+    assert "USING hnsw (embedding vector_cosine_ops)" in ddl
+    assert "WITH (m = 24, ef_construction = 128)" in ddl
+
+
+# Verifica que un indice con otros parametros se detecte como desactualizado.
+def test_existing_index_is_rebuilt_when_parameters_change(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_IVFFLAT_LISTS", 100)
+    indexdef = (
+        "CREATE INDEX ix_knowledgebase_embedding_ivfflat ON public.knowledgebase "
+        "USING ivfflat (embedding vector_cosine_ops) WITH (lists='100')"
+    )
+
+    assert search_indexes.index_matches(indexdef, "ivfflat")
+
+    monkeypatch.setattr(search_indexes.settings, "RAG_IVFFLAT_LISTS", 400)
+    assert not search_indexes.index_matches(indexdef, "ivfflat")
+
+
+# Verifica que el nivel binario use un indice por expresion con Hamming.
+def test_binary_compressed_index_is_an_expression_index() -> None:
+    ddl = search_indexes.build_compressed_index_ddl("binary", concurrently=True)
+
+    assert ddl.startswith(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledgebase_embedding_bit_hnsw"
+    )
+    assert "USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops)" in ddl
+
+
+def test_halfvec_compressed_index_uses_halfvec_cosine_ops() -> None:
+    ddl = search_indexes.build_compressed_index_ddl("halfvec")
+
+    assert "CONCURRENTLY" not in ddl
+    assert "USING hnsw ((embedding::halfvec(1024)) halfvec_cosine_ops)" in ddl
+
+
+class _FakeResult:
+    def __init__(self, value: object) -> None:
+        self.value = value
+
+    def scalar_one_or_none(self) -> object:
+        return self.value
+
+    def scalar_one(self) -> object:
+        return self.value
+
+
+class _RecordingConnection:
+    # Devuelve el indexdef guardado en pg_indexes y registra cada sentencia
+    def __init__(self, indexdef: str | None) -> None:
+        self.indexdef = indexdef
+        self.statements: list[str] = []
+
+    async def execute(self, statement: object, _: object = None) -> _FakeResult:
+        self.statements.append(str(statement))
+        return _FakeResult(self.indexdef)
+
+
+# Verifica que el indice comprimido se reconstruya si cambian m/ef_construction.
+def test_compressed_index_is_rebuilt_when_hnsw_parameters_change(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_VECTOR_COMPRESSION", "binary")
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_M", 16)
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_EF_CONSTRUCTION", 64)
+    indexdef = (
+        "CREATE INDEX ix_knowledgebase_embedding_bit_hnsw ON public.knowledgebase "
+        "USING hnsw (...) WITH (m='16', ef_construction='64')"
+    )
+
+    unchanged = _RecordingConnection(indexdef)
+    asyncio.run(search_indexes.ensure_compressed_vector_index(unchanged))  # type: ignore
+
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_M", 32)
+    changed = _RecordingConnection(indexdef)
+    asyncio.run(search_indexes.ensure_compressed_vector_index(changed))  # type: ignore
+
+    assert not any("CREATE INDEX" in s for s in unchanged.statements)
+    assert "DROP INDEX IF EXISTS ix_knowledgebase_embedding_bit_hnsw" in (
+        changed.statements
+    )
+    assert changed.statements[-1].startswith(
+        "CREATE INDEX IF NOT EXISTS ix_knowledgebase_embedding_bit_hnsw"
+    )
+    assert "WITH (m = 32, ef_construction = 64)" in changed.statements[-1]
+
+
+class _CountingConnection(_RecordingConnection):
+    # Sin indice previo; el COUNT(*) de la tabla devuelve 'rows'
+    def __init__(self, rows: int) -> None:
+        super().__init__(None)
+        self.rows = rows
+
+    async def execute(self, statement: object, _: object = None) -> _FakeResult:
+        result = await super().execute(statement, _)
+        if "count(" in str(statement):
+            return _FakeResult(self.rows)
+        return result
+
+
+# Verifica que IVFFlat no se construya sobre una tabla con pocas filas.
+def test_ivfflat_index_waits_for_enough_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_VECTOR_INDEX", "ivfflat")
+    monkeypatch.setattr(search_indexes.settings, "RAG_IVFFLAT_MIN_ROWS", 1000)
+    monkeypatch.setattr(
+        search_indexes.settings, "RAG_INDEX_BUILD_MAINTENANCE_WORK_MEM", ""
+    )
+
+    empty = _CountingConnection(0)
+    asyncio.run(search_indexes.ensure_vector_index(empty))  # type: ignore
+    loaded = _CountingConnection(5000)
+    asyncio.run(search_indexes.ensure_vector_index(loaded))  # type: ignore
+
+    assert not any("USING ivfflat" in s for s in empty.statements)
+    assert loaded.statements[-1].startswith(
+        "CREATE INDEX IF NOT EXISTS ix_knowledgebase_embedding_ivfflat"
+    )
+
+
+# Verifica que ef_search derivado de los candidatos no pase del maximo de pgvector.
+def test_hnsw_ef_search_is_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_HNSW_EF_SEARCH", 80)
+
+    assert search_indexes.hnsw_ef_search() == 80
+    assert search_indexes.hnsw_ef_search(400) == 400
+    assert search_indexes.hnsw_ef_search(50_000) == search_indexes.HNSW_MAX_EF_SEARCH
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import search_indexes, text_search
+
+
+# Verifica que el DDL cree la columna tsvector generada y su indice GIN.
+def test_text_search_ddl_uses_generated_column_and_gin(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_TEXT_SEARCH_CONFIG", "spanish")
+
+    alter, index = search_indexes.build_text_search_ddl()
+
+    assert "ADD COLUMN IF NOT EXISTS search_vector tsvector" in alter
+    assert "GENERATED ALWAYS AS (to_tsvector('spanish'" in alter
+    assert alter.endswith("STORED")
+    assert "USING gin (search_vector)" in index
+
+
+def test_text_search_config_is_validated(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        search_indexes.settings, "RAG_TEXT_SEARCH_CONFIG", "spanish'); DROP"
+    )
+
+    with pytest.raises(ValueError):
+        search_indexes.build_text_search_ddl()
+
+
+# Verifica que todas las variantes viajen en una sola consulta full-text.
+def test_lexical_statement_has_one_value_per_query() -> None:
+    statement = text_search.build_lexical_statement(2)
+    sql = str(statement.compile(dialect=postgresql.dialect()))  # type: ignore
+
+    assert "CAST(%(t0)s AS text)" in sql
+    assert "CAST(%(t1)s AS text)" in sql
+    assert "websearch_to_tsquery" in sql
+    assert "t.search_vector @@ tsq.query" in sql
+
+
+class _FakeResult:
+    def __init__(self, value: object) -> None:
+        self.value = value
+
+    def scalar_one_or_none(self) -> object:
+        return self.value
+
+
+class _RecordingConnection:
+    # Devuelve la expresion de la columna generada y registra cada sentencia
+    def __init__(self, expression: str | None) -> None:
+        self.expression = expression
+        self.statements: list[str] = []
+
+    async def execute(self, statement: object, _: object = None) -> _FakeResult:
+        self.statements.append(str(statement))
+        return _FakeResult(self.expression)
+
+
+def _ensure(expression: str | None) -> list[str]:
+    conn = _RecordingConnection(expression)
+    asyncio.run(search_indexes.ensure_text_search_index(conn))  # type: ignore
+    return conn.statements[1:]
+
+
+# Verifica que un cambio de RAG_TEXT_SEARCH_CONFIG reconstruya la columna.
+def test_text_search_column_is_rebuilt_when_config_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(search_indexes.settings, "RAG_TEXT_SEARCH_CONFIG", "simple")
+    current = (
+        "to_tsvector('simple'::regconfig, ((COALESCE(title, ''::character varying))"
+    )
+    previous = current.replace("'simple'", "'spanish'")
+
+    unchanged = _ensure(current)
+    rebuilt = _ensure(previous)
+    created = _ensure(None)
+
+    assert not any("DROP COLUMN" in statement for statement in unchanged)
+    assert rebuilt[0] == "ALTER TABLE knowledgebase DROP COLUMN IF EXISTS search_vector"
+    assert "to_tsvector('simple'" in rebuilt[1]
+    assert len(created) == 2
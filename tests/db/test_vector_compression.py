@@ -0,0 +1,26 @@
+from app.db.vector_compression import TierReport, format_report, recall_at_k
+
+
+def test_recall_at_k_counts_overlap_with_exact_results() -> None:
+    assert recall_at_k([1, 2, 3, 9], [1, 2, 3, 4]) == 0.75
+    assert recall_at_k([], []) == 1.0
+
+
+# Verifica que el reporte muestre tamaño por fila y recall de cada nivel.
+def test_report_lists_size_and_recall_per_tier() -> None:
+    reports = [
+        TierReport(
+            "hnsw", "ix_knowledgebase_embedding_hnsw", 8 * 1024 * 1024, 1024, 1.0
+        ),
+        TierReport(
+            "binary", "ix_knowledgebase_embedding_bit_hnsw", 512 * 1024, 1024, 0.9
+        ),
+    ]
+
+    output = format_report(reports, k=10).splitlines()
+
+    assert "recall@10" in output[0]
+    assert "8.00" in output[1]
+    assert "8192.0" in output[1]
+    assert "512.0" in output[2]
+    assert "0.900" in output[2]
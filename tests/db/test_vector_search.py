@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import vector_search
+
+
+class FakeResult:
+    def __init__(self, rows: list[Any]) -> None:
+        self._rows = rows
+
+    def all(self) -> list[Any]:
+        return self._rows
+
+
+class FakeSession:
+    # Hace tambien de conexion: session.connection() devuelve la misma instancia
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+        self.statements: list[Any] = []
+        self.params: list[dict[str, Any]] = []
+
+    async def connection(self) -> "FakeSession":
+        return self
+
+    async def execute(self, statement: Any, params: dict[str, Any]) -> FakeResult:
+        self.statements.append(statement)
+        self.params.append(params)
+        return FakeResult(self.rows)
+
+
+# Verifica que todas las queries viajen en una sola sentencia con dedup en SQL.
+def test_multi_query_statement_has_one_value_per_vector() -> None:
+    statement = vector_search.build_multi_query_statement(3)
+    sql = str(statement.compile(dialect=postgresql.dialect()))  # type: ignore
+
+    for i in range(3):
+        assert f"CAST(%(q{i})s AS vector(1024))" in sql
+    assert "CROSS JOIN LATERAL" in sql
+    assert "GROUP BY c.id" in sql
+    assert "kb.embedding" not in sql
+
+
+def test_multi_query_statement_requires_vectors() -> None:
+    with pytest.raises(ValueError):
+        vector_search.build_multi_query_statement(0)
+
+
+# Verifica que se haga un solo round trip y se devuelvan documentos sin embedding.
+def test_multi_query_search_runs_single_statement() -> None:
+    created_at = datetime(2024, 1, 1)
+    session = FakeSession(
+        [
+            SimpleNamespace(
+                id=7,
+                title="guia.pdf - Pag 1",
+                content="texto",
+                source="guia.pdf",
+                created_at=created_at,
+                distance=0.1,
+            )
+        ]
+    )
+
+    docs = asyncio.run(
+        vector_search.multi_query_search(
+            session,  # type: ignore
+            [[0.1] * 1024, [0.2] * 1024],
+            limit=10,
+        )
+    )
+
+    assert len(session.statements) == 1
+    assert session.params[0]["limit"] == 10
+    assert [doc.id for doc in docs] == [7]
+    assert docs[0].embedding is None
+    assert docs[0].created_at == created_at
+
+
+# Verifica las dos etapas: ANN comprimido y re-puntuacion con precision completa.
+def test_compressed_statement_rescores_with_full_precision() -> None:
+    statement = vector_search.build_multi_query_statement(1, "binary")
+    sql = str(statement.compile(dialect=postgresql.dialect()))  # type: ignore
+
+    assert (
+        "ORDER BY binary_quantize(t.embedding)::bit(1024) <~> binary_quantize(q.vec)"
+        in sql
+    )
+    assert "LIMIT %(candidates)s" in sql
+    assert "SELECT s.id, s.embedding <=> q.vec AS distance" in sql
+
+
+def test_first_stage_candidates_follow_rescore_factor(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(vector_search.settings, "RAG_VECTOR_COMPRESSION", "none")
+    assert vector_search.first_stage_candidates(8) == 8
+
+    monkeypatch.setattr(vector_search.settings, "RAG_VECTOR_COMPRESSION", "halfvec")
+    monkeypatch.setattr(vector_search.settings, "RAG_VECTOR_RESCORE_FACTOR", 5)
+    assert vector_search.first_stage_candidates(8) == 40
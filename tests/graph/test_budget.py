@@ -0,0 +1,178 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig
+
+from app.core import observability
+from app.graph import budget as budget_module
+from app.graph.budget import (
+    BUDGET_EXEMPT_TAG,
+    BudgetExhaustedError,
+    RequestBudget,
+    budget_config,
+    interrupted_report,
+    within_deadline,
+)
+from app.graph.nodes import pre_router
+
+
+def _budget(**overrides: Any) -> RequestBudget:
+    values: dict[str, Any] = {
+        "timeout_seconds": 30.0,
+        "max_llm_calls": 2,
+        "max_tokens": 10_000,
+    }
+    values.update(overrides)
+    return RequestBudget(**values)
+
+
+# Verifica que el callback cuente llamadas y corte las que exceden el limite.
+def test_callback_counts_calls_and_blocks_after_limit() -> None:
+    observability.reset_counters()
+    budget = _budget(max_llm_calls=2)
+    config = budget_config(budget)
+    llm = FakeListChatModel(responses=["uno", "dos", "tres", "final"])
+
+    async def _run() -> str:
+        await llm.ainvoke("a", config=config)
+        await llm.ainvoke("b", config=config)
+        with pytest.raises(BudgetExhaustedError):
+            await llm.ainvoke("c", config=config)
+        # La respuesta final (especialista) esta exenta del presupuesto
+        exempt: RunnableConfig = {**config, "tags": [BUDGET_EXEMPT_TAG]}
+        return (await llm.ainvoke("d", config=exempt)).text
+
+    assert asyncio.run(_run()) == "tres"
+    assert budget.llm_calls == 3
+    assert budget.exhausted() == "llm_calls"
+    # Una sola vez por peticion aunque se consulte varias veces
+    assert observability.get_counter_value("agent_budget_exhausted_total") == 1
+    assert observability.get_counter_value("agent_budget_exhausted_total_llm_calls")
+
+
+# Verifica el agotamiento por deadline y por tokens.
+def test_budget_exhausts_on_deadline_and_tokens(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = [100.0]
+    monkeypatch.setattr(budget_module.time, "monotonic", lambda: now[0])
+
+    by_deadline = _budget(timeout_seconds=5.0, started_at=now[0])
+    by_tokens = _budget(max_tokens=100)
+    by_tokens.tokens = 150
+
+    assert by_deadline.exhausted() is None
+    now[0] += 6.0
+    assert by_deadline.remaining_seconds() == 0.0
+    assert by_deadline.exhausted() == "deadline"
+    assert by_tokens.exhausted() == "tokens"
+
+
+# Verifica que con el presupuesto agotado el pre-router vaya al especialista.
+def test_pre_router_finishes_when_budget_is_exhausted() -> None:
+    budget = _budget(max_llm_calls=0)
+
+    update = asyncio.run(
+        pre_router.pre_router_node(
+            {"messages": [HumanMessage(content="paciente 42")], "next": None},
+            budget_config(budget),
+        )
+    )
+
+    assert update == {"next": "FINISH", "workers": [], "pre_routed": True}
+
+
+class _StreamingUsageModel(BaseChatModel):
+    # Como ChatOpenAI con stream_usage: el ultimo chunk trae el uso de tokens
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-usage"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        raise NotImplementedError
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for text in ("Hola ", "doctor"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata={
+                    "input_tokens": 90,
+                    "output_tokens": 30,
+                    "total_tokens": 120,
+                },
+            )
+        )
+
+
+# Verifica que el uso informado en streaming consuma el presupuesto de tokens.
+def test_streamed_usage_counts_against_token_budget() -> None:
+    budget = _budget(max_tokens=100)
+    config = budget_config(budget)
+    llm = _StreamingUsageModel()
+
+    async def _run() -> str:
+        chunks = [chunk async for chunk in llm.astream("hola", config=config)]
+        return "".join(chunk.text for chunk in chunks)
+
+    assert asyncio.run(_run()) == "Hola doctor"
+    assert budget.tokens == 120
+    assert budget.exhausted() == "tokens"
+
+
+# Verifica que un aviso de presupuesto no marque al paciente como ya consultado.
+def test_interrupted_report_does_not_cover_patient_in_thread() -> None:
+    messages: list[BaseMessage] = [
+        HumanMessage(content="Dame los datos del paciente 42"),
+        interrupted_report("DATA_AGENT"),
+        AIMessage(content="No pude consultar los datos a tiempo"),
+        HumanMessage(content="Dame los datos del paciente 42"),
+    ]
+
+    decision = pre_router.rule_based_route(messages, parallel=False)
+
+    assert pre_router.patients_in_thread(messages) == set()
+    assert pre_router.workers_replied(messages[:2]) == set()
+    assert decision is not None and decision.workers == ["DATA_AGENT"]
+
+
+# Verifica que una llamada lenta se corte en el deadline restante.
+def test_within_deadline_bounds_slow_calls() -> None:
+    budget = _budget(timeout_seconds=0.05)
+
+    async def _slow() -> str:
+        await asyncio.sleep(1)
+        return "tarde"
+
+    async def _run() -> None:
+        with pytest.raises(TimeoutError):
+            await within_deadline(_slow(), budget_config(budget))  # type: ignore
+        assert await within_deadline(asyncio.sleep(0, "sin budget"), None) == (
+            "sin budget"
+        )
+
+    asyncio.run(_run())
+    assert budget.exhausted() == "deadline"
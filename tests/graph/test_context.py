@@ -0,0 +1,112 @@
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.core import observability
+from app.graph import context
+
+_LONG_REPORT = "Respuesta del DATA_AGENT: " + "HbA1c 8.1%, glucosa 180. " * 200
+
+
+def _thread() -> list[BaseMessage]:
+    return [
+        HumanMessage(content="Dame los datos del paciente 42"),
+        AIMessage(content=_LONG_REPORT, name="DATA_AGENT"),
+        AIMessage(content="El paciente 42 tiene HbA1c de 8.1%"),
+        HumanMessage(content="Que es la metformina?"),
+        AIMessage(content="Respuesta del DOCS_AGENT: biguanida...", name="DOCS_AGENT"),
+        AIMessage(content="La metformina es una biguanida"),
+    ]
+
+
+def _contents(messages: list[BaseMessage]) -> list[str]:
+    return [message.text for message in messages]
+
+
+# Verifica que el supervisor vea la pregunta completa y reportes resumidos.
+def test_supervisor_view_summarizes_reports(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(context.settings, "GRAPH_CONTEXT_SUMMARY_TOKENS", 20)
+    question = HumanMessage(content="Y el paciente 42 que tratamiento lleva? " * 10)
+    messages = _thread() + [question, AIMessage(content=_LONG_REPORT)]
+
+    view = context.supervisor_view(messages)
+
+    assert view[-2] is question
+    assert view[-1].text.startswith("Respuesta del DATA_AGENT")
+    assert view[-1].text.endswith("[recortado]")
+    assert context.count_tokens(view) < context.count_tokens(messages) // 5
+
+
+# Verifica que un worker vea solo la pregunta y los reportes del mismo paciente.
+def test_worker_view_keeps_question_and_relevant_reports() -> None:
+    messages = _thread() + [HumanMessage(content="Y sus alergias?")]
+
+    view = context.worker_view(messages, "DATA_AGENT")
+
+    assert _contents(view)[-1] == "Y sus alergias?"
+    assert len(view) == 2
+    assert view[0].text.startswith("Respuesta del DATA_AGENT")
+    # Sin respuestas finales ni reportes de otros temas (metformina)
+    assert not any("metformina" in text for text in _contents(view))
+
+
+# Verifica que el especialista conserve la pregunta aunque el turno no entre.
+def test_specialist_view_truncates_to_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(context.settings, "GRAPH_CONTEXT_SPECIALIST_TOKENS", 300)
+    question = HumanMessage(content="Resume el caso del paciente 42")
+    messages = _thread() + [question, AIMessage(content=_LONG_REPORT)]
+
+    view = context.specialist_view(messages)
+
+    assert question in view
+    assert view[-1].text.endswith("[recortado]")
+    assert context.count_tokens(view) <= 300
+
+
+# Verifica el histograma de tokens de prompt por nodo.
+def test_record_prompt_tokens_observes_per_node_histogram() -> None:
+    observability.reset_counters()
+
+    tokens = context.record_prompt_tokens(
+        "DOCS_AGENT", "Eres un medico", [HumanMessage(content="hola")]
+    )
+
+    summary = observability.get_histogram_summary("graph_prompt_tokens_docs_agent")
+    assert tokens > 0
+    assert summary["count"] == 1
+    assert summary["max"] == tokens
+
+
+# Verifica que el especialista reciba completo el reporte previo del paciente.
+def test_specialist_view_keeps_patient_reports_in_full() -> None:
+    other_report = "Respuesta del DATA_AGENT: " + "Paciente 7 sin alergias. " * 200
+    messages = _thread() + [
+        HumanMessage(content="Dame los datos del paciente 7"),
+        AIMessage(content=other_report, name="DATA_AGENT"),
+        AIMessage(content="El paciente 7 no tiene alergias"),
+        HumanMessage(content="Y el paciente 42 sigue con metformina?"),
+    ]
+
+    view = context.specialist_view(messages)
+    contents = _contents(view)
+
+    assert _LONG_REPORT in contents
+    assert other_report not in contents
+    assert any(
+        text.startswith("Respuesta del DATA_AGENT: Paciente 7") for text in contents
+    )
+    assert contents[-1] == "Y el paciente 42 sigue con metformina?"
+
+
+# Verifica que el reporte previo del paciente se recorte en vez de descartarse.
+def test_specialist_view_truncates_patient_reports_over_budget(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(context.settings, "GRAPH_CONTEXT_SPECIALIST_TOKENS", 200)
+    messages = _thread() + [HumanMessage(content="Y el paciente 42 sigue igual?")]
+
+    view = context.specialist_view(messages)
+
+    assert view[0].text.startswith("Respuesta del DATA_AGENT: HbA1c")
+    assert view[0].text.endswith("[recortado]")
+    assert view[-1].text == "Y el paciente 42 sigue igual?"
+    assert context.count_tokens(view) <= 200
@@ -0,0 +1,150 @@
+import asyncio
+
+import numpy as np
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.core import observability
+from app.graph.nodes import pre_router
+from app.graph.state import AgentState
+from app.services.route_classifier import RouteClassifier
+
+
+def _state(*messages: object) -> AgentState:
+    return {"messages": list(messages), "next": None}  # type: ignore
+
+
+# Verifica que un ID explicito de paciente vaya a DATA_AGENT sin supervisor.
+def test_rules_route_patient_id_to_data_agent() -> None:
+    decision = pre_router.rule_based_route(
+        [HumanMessage(content="Muestrame el historial del paciente 42")],
+        parallel=False,
+    )
+
+    assert decision is not None
+    assert decision.workers == ["DATA_AGENT"]
+    assert decision.confidence >= 0.9
+
+
+# Verifica que paciente + guias pida ambos workers solo en modo paralelo.
+def test_rules_request_both_workers_in_parallel_mode() -> None:
+    messages: list[BaseMessage] = [
+        HumanMessage(
+            content="Revisa la ficha de Juan Perez y el tratamiento segun guias"
+        )
+    ]
+
+    sequential = pre_router.rule_based_route(messages, parallel=False)
+    parallel = pre_router.rule_based_route(messages, parallel=True)
+
+    assert sequential is not None and sequential.workers == ["DATA_AGENT"]
+    assert parallel is not None and parallel.workers == ["DATA_AGENT", "DOCS_AGENT"]
+
+
+# Verifica que tras responder ambos workers se termine (FINISH).
+def test_rules_finish_after_both_workers_replied() -> None:
+    decision = pre_router.rule_based_route(
+        [
+            HumanMessage(content="paciente 7 y guias de hipertension"),
+            AIMessage(content="datos", name="DATA_AGENT"),
+            AIMessage(content="Respuesta del DOCS_AGENT: guias"),
+        ],
+        parallel=False,
+    )
+
+    assert decision is not None
+    assert decision.workers == []
+    assert decision.confidence == 1.0
+
+
+# Verifica que solo cuenten las respuestas del turno actual.
+def test_workers_replied_ignores_previous_turns() -> None:
+    replied = pre_router.workers_replied(
+        [
+            HumanMessage(content="paciente 1"),
+            AIMessage(content="datos", name="DATA_AGENT"),
+            HumanMessage(content="y el paciente 2?"),
+        ]
+    )
+
+    assert replied == set()
+
+
+# Verifica que una pregunta ambigua delegue en el supervisor y cuente el fallback.
+def test_node_falls_back_to_supervisor_when_uncertain(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    observability.reset_counters()
+    monkeypatch.setattr(pre_router, "route_classifier", RouteClassifier(20))
+
+    update = asyncio.run(
+        pre_router.pre_router_node(_state(HumanMessage(content="y eso me preocupa")))
+    )
+
+    assert update == {"pre_routed": False}
+    assert observability.get_counter_value(observability.PRE_ROUTER_FALLBACK_TOTAL) == 1
+    assert observability.get_gauge_value(observability.PRE_ROUTER_FALLBACK_RATE) == 1.0
+
+
+# Verifica que el clasificador entrenado decida cuando las reglas no aplican.
+def test_node_uses_trained_classifier(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _embed(text: str) -> list[float]:
+        return [1.0, 0.0] if "laboratorio" in text else [0.0, 1.0]
+
+    classifier = RouteClassifier(min_examples=2, embedder=_embed)
+    for _ in range(2):
+        classifier.learn_vector(np.array([1.0, 0.0]), "DATA_AGENT")
+        classifier.learn_vector(np.array([0.0, 1.0]), "FINISH")
+
+    observability.reset_counters()
+    monkeypatch.setattr(pre_router, "route_classifier", classifier)
+    monkeypatch.setattr(pre_router.settings, "GRAPH_PARALLEL_DISPATCH", False)
+
+    update = asyncio.run(
+        pre_router.pre_router_node(
+            _state(HumanMessage(content="ultimos resultados de laboratorio"))
+        )
+    )
+
+    assert update == {
+        "next": "DATA_AGENT",
+        "workers": ["DATA_AGENT"],
+        "pre_routed": True,
+    }
+    assert (
+        observability.get_counter_value(observability.PRE_ROUTER_CLASSIFIER_TOTAL) == 1
+    )
+
+
+# Verifica que en un hilo no se vuelva a consultar un paciente ya reportado.
+def test_rules_reuse_patient_report_from_previous_turn() -> None:
+    history: list[BaseMessage] = [
+        HumanMessage(content="Dame los datos del paciente 42"),
+        AIMessage(content="Respuesta del DATA_AGENT: HbA1c 8.1%"),
+        AIMessage(content="El paciente 42 tiene HbA1c de 8.1%"),
+    ]
+
+    follow_up = pre_router.rule_based_route(
+        history + [HumanMessage(content="Y el paciente 42 tiene alergias?")],
+        parallel=False,
+    )
+    new_patient = pre_router.rule_based_route(
+        history + [HumanMessage(content="Y el paciente 7?")], parallel=False
+    )
+    with_theory = pre_router.rule_based_route(
+        history + [HumanMessage(content="Que tratamiento para el paciente 42?")],
+        parallel=False,
+    )
+
+    assert follow_up is not None and follow_up.workers == []
+    assert new_patient is not None and new_patient.workers == ["DATA_AGENT"]
+    assert with_theory is not None and with_theory.workers == ["DOCS_AGENT"]
+
+
+# Verifica que titulos clinicos con mayuscula no se tomen por nombres.
+def test_clinical_titles_are_not_patient_names() -> None:
+    decision = pre_router.rule_based_route(
+        [HumanMessage(content="Datos de Prevalencia de diabetes en adultos")],
+        parallel=False,
+    )
+    assert decision is None or "DATA_AGENT" not in decision.workers
@@ -0,0 +1,133 @@
+import asyncio
+from typing import Any
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph  # type: ignore
+from langgraph.types import Send  # type: ignore
+
+from app.graph.routing import add_supervisor_edges, dispatch_workers
+from app.graph.state import AgentState
+
+
+# Verifica que el fan-out cree un Send por worker valido y sin duplicados.
+def test_dispatch_workers_sends_each_requested_worker_once() -> None:
+    state: AgentState = {
+        "messages": [],
+        "next": "DATA_AGENT",
+        "workers": ["DATA_AGENT", "DOCS_AGENT", "DATA_AGENT", "OTRO"],
+    }
+
+    sends = dispatch_workers(state)
+
+    assert isinstance(sends, list)
+    assert all(isinstance(send, Send) for send in sends)
+    assert [send.node for send in sends] == ["DATA_AGENT", "DOCS_AGENT"]
+
+
+def test_dispatch_workers_without_workers_finishes() -> None:
+    assert dispatch_workers({"messages": [], "next": "FINISH", "workers": []}) == (
+        "FINISH"
+    )
+
+
+def _build_graph(
+    parallel: bool,
+    plan: list[dict[str, Any]],
+    pre_plan: list[dict[str, Any]] | None = None,
+) -> tuple[Any, dict[str, int]]:
+    stats: dict[str, int] = {
+        "supervisor": 0,
+        "pre_router": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+
+    async def _pre_router(_: AgentState) -> dict[str, Any]:
+        steps = pre_plan or [{"pre_routed": False}]
+        step = steps[min(stats["pre_router"], len(steps) - 1)]
+        stats["pre_router"] += 1
+        return step
+
+    async def _supervisor(_: AgentState) -> dict[str, Any]:
+        step = plan[min(stats["supervisor"], len(plan) - 1)]
+        stats["supervisor"] += 1
+        return step
+
+    def _worker(name: str) -> Any:
+        async def _run(_: AgentState) -> dict[str, Any]:
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            await asyncio.sleep(0.02)
+            stats["in_flight"] -= 1
+            return {"messages": [AIMessage(content=f"Respuesta de {name}")]}
+
+        return _run
+
+    async def _specialist(_: AgentState) -> dict[str, Any]:
+        return {"messages": [AIMessage(content="final")]}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("pre_router", _pre_router)  # type: ignore
+    workflow.add_node("supervisor", _supervisor)  # type: ignore
+    workflow.add_node("DOCS_AGENT", _worker("DOCS_AGENT"))  # type: ignore
+    workflow.add_node("DATA_AGENT", _worker("DATA_AGENT"))  # type: ignore
+    workflow.add_node("specialist", _specialist)  # type: ignore
+    workflow.add_edge(START, "pre_router" if pre_plan else "supervisor")
+    add_supervisor_edges(workflow, parallel=parallel, pre_router=bool(pre_plan))
+    workflow.add_edge("specialist", END)
+    return workflow.compile(), stats  # type: ignore
+
+
+# Verifica que ambos workers corran a la vez y el supervisor vuelva una sola vez.
+def test_parallel_dispatch_runs_workers_in_one_step() -> None:
+    graph, stats = _build_graph(
+        parallel=True,
+        plan=[
+            {"next": "DATA_AGENT", "workers": ["DATA_AGENT", "DOCS_AGENT"]},
+            {"next": "FINISH", "workers": []},
+        ],
+    )
+
+    result = asyncio.run(
+        graph.ainvoke({"messages": [HumanMessage(content="caso y guias")]})
+    )
+
+    contents = [message.content for message in result["messages"]]
+    assert stats["max_in_flight"] == 2
+    assert stats["supervisor"] == 2
+    assert "Respuesta de DATA_AGENT" in contents
+    assert "Respuesta de DOCS_AGENT" in contents
+    assert contents[-1] == "final"
+
+
+# Verifica que el modo secuencial siga llamando un worker por turno.
+def test_sequential_dispatch_keeps_one_worker_per_turn() -> None:
+    graph, stats = _build_graph(
+        parallel=False,
+        plan=[{"next": "DATA_AGENT"}, {"next": "DOCS_AGENT"}, {"next": "FINISH"}],
+    )
+
+    asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="caso y guias")]}))
+
+    assert stats["max_in_flight"] == 1
+    assert stats["supervisor"] == 3
+
+
+# Verifica que el pre-router salte al supervisor solo cuando no esta seguro.
+def test_pre_router_skips_supervisor_when_confident() -> None:
+    graph, stats = _build_graph(
+        parallel=False,
+        plan=[{"next": "FINISH"}],
+        pre_plan=[
+            {"pre_routed": True, "next": "DATA_AGENT", "workers": ["DATA_AGENT"]},
+            {"pre_routed": False},
+        ],
+    )
+
+    result = asyncio.run(
+        graph.ainvoke({"messages": [HumanMessage(content="paciente 42")]})
+    )
+
+    assert stats["pre_router"] == 2
+    assert stats["supervisor"] == 1
+    assert result["messages"][-1].content == "final"
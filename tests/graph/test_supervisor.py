@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.graph.nodes import supervisor
+from app.graph.state import AgentState
+
+
+class _FakeLLM:
+    # Sustituye a llm_service.llm: la salida estructurada es fija (o un error)
+    def __init__(self, result: Any) -> None:
+        self.result = result
+
+    def with_structured_output(self, *_: Any, **__: Any) -> RunnableLambda[Any, Any]:
+        def _answer(_: Any) -> Any:
+            if isinstance(self.result, Exception):
+                raise self.result
+            return self.result
+
+        return RunnableLambda(_answer)
+
+
+def _run_supervisor(
+    monkeypatch: pytest.MonkeyPatch, result: Any
+) -> tuple[dict[str, Any], list[tuple[str, str]]]:
+    learned: list[tuple[str, str]] = []
+
+    async def _learn(text: str, label: str) -> None:
+        await asyncio.sleep(0)
+        learned.append((text, label))
+
+    monkeypatch.setattr(supervisor.llm_service, "llm", _FakeLLM(result))
+    monkeypatch.setattr(supervisor.route_classifier, "learn", _learn)
+    monkeypatch.setattr(supervisor.settings, "GRAPH_PARALLEL_DISPATCH", False)
+    monkeypatch.setattr(supervisor.settings, "GRAPH_PRE_ROUTER_ENABLED", True)
+    state: AgentState = {
+        "messages": [HumanMessage(content="Que opinas del caso?")],
+        "next": None,
+    }  # type: ignore
+
+    async def _run() -> dict[str, Any]:
+        update = await supervisor.supervisor_node(state)
+        # El entrenamiento corre en segundo plano, fuera del camino del nodo
+        assert learned == []
+        await supervisor.wait_for_learning()
+        return update
+
+    return asyncio.run(_run()), learned
+
+
+# Verifica que la decision del LLM se aprenda en segundo plano.
+def test_supervisor_learns_llm_decision_in_background(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    result = supervisor.RouteResponse(next="DOCS_AGENT")
+
+    update, learned = _run_supervisor(monkeypatch, result)
+
+    assert update == {"next": "DOCS_AGENT"}
+    assert learned == [("Que opinas del caso?", "DOCS_AGENT")]
+
+
+# Verifica que un FINISH por error del LLM no entrene al clasificador.
+def test_supervisor_does_not_learn_fallbacks(monkeypatch: pytest.MonkeyPatch) -> None:
+    update, learned = _run_supervisor(monkeypatch, ValueError("json invalido"))
+
+    assert update == {"next": "FINISH"}
+    assert learned == []
@@ -0,0 +1,56 @@
+import asyncio
+from pathlib import Path
+
+from app.core import observability
+from app.services.embedding_cache import EmbeddingCache
+
+
+# Verifica que el LRU en memoria descarte la entrada menos usada.
+def test_memory_tier_evicts_least_recently_used() -> None:
+    observability.reset_counters()
+    cache = EmbeddingCache(model_id="e5", max_items=2)
+
+    asyncio.run(cache.put_many(["a", "b"], [[1.0], [2.0]]))
+    asyncio.run(cache.get_many(["a"]))
+    asyncio.run(cache.put_many(["c"], [[3.0]]))
+
+    results = asyncio.run(cache.get_many(["a", "b", "c"]))
+
+    assert results == [[1.0], None, [3.0]]
+    assert (
+        observability.get_counter_value(observability.EMBEDDING_CACHE_MISSES_TOTAL) == 1
+    )
+
+
+# Verifica que el nivel SQLite sobreviva a una nueva instancia del cache.
+def test_persistent_tier_survives_new_instance(tmp_path: Path) -> None:
+    observability.reset_counters()
+    db_path = str(tmp_path / "embeddings.sqlite3")
+
+    first = EmbeddingCache(model_id="e5", max_items=10, db_path=db_path)
+    asyncio.run(first.put_many(["passage: hola"], [[0.5, 0.25]]))
+
+    second = EmbeddingCache(model_id="e5", max_items=10, db_path=db_path)
+    results = asyncio.run(second.get_many(["passage: hola"]))
+
+    assert results == [[0.5, 0.25]]
+    assert (
+        observability.get_counter_value(
+            observability.EMBEDDING_CACHE_PERSISTENT_HITS_TOTAL
+        )
+        == 1
+    )
+
+
+# Verifica que cambiar el modelo invalide los vectores persistidos.
+def test_persistent_tier_is_invalidated_when_model_changes(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "embeddings.sqlite3")
+
+    old_model = EmbeddingCache(model_id="e5-large", max_items=10, db_path=db_path)
+    asyncio.run(old_model.put_many(["passage: hola"], [[0.5]]))
+
+    new_model = EmbeddingCache(model_id="e5-small", max_items=10, db_path=db_path)
+    assert asyncio.run(new_model.get_many(["passage: hola"])) == [None]
+
+    reopened = EmbeddingCache(model_id="e5-large", max_items=10, db_path=db_path)
+    assert asyncio.run(reopened.get_many(["passage: hola"])) == [None]
@@ -0,0 +1,168 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import pytest
+
+from app.core.observability import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_QUEUE_WAIT_SECONDS,
+    get_histogram_summary,
+    reset_counters,
+)
+from app.services import embedding_engine
+from app.services.embedding_engine import EmbeddingEngine, ProcessPoolBackend
+
+
+class _FakeBackend:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.batches: list[list[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.fail:
+            msg = "modelo caido"
+            raise RuntimeError(msg)
+        return [[float(len(text))] for text in texts]
+
+    def warmup(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+# Verifica que textos de llamadas concurrentes se agrupen en un solo lote.
+def test_concurrent_callers_share_one_batch() -> None:
+    reset_counters()
+    backend = _FakeBackend()
+    engine = EmbeddingEngine(backend, max_batch_size=32, max_wait_ms=20)
+
+    async def _scenario() -> list[list[list[float]]]:
+        results = await asyncio.gather(
+            engine.embed(["query: a"]),
+            engine.embed(["passage: bb", "passage: ccc"]),
+            engine.embed(["query: dddd"]),
+        )
+        await engine.stop()
+        return list(results)
+
+    results = asyncio.run(_scenario())
+
+    assert len(backend.batches) == 1
+    assert results == [[[8.0]], [[11.0], [12.0]], [[11.0]]]
+    assert get_histogram_summary(EMBEDDING_BATCH_SIZE)["max"] == 4
+    assert get_histogram_summary(EMBEDDING_QUEUE_WAIT_SECONDS)["count"] == 4
+
+
+# Verifica que el lote se cierre al llegar al tamaño maximo.
+def test_batches_close_at_max_batch_size() -> None:
+    backend = _FakeBackend()
+    engine = EmbeddingEngine(backend, max_batch_size=2, max_wait_ms=20)
+
+    async def _scenario() -> list[list[float]]:
+        vectors = await engine.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+        await engine.stop()
+        return vectors
+
+    vectors = asyncio.run(_scenario())
+
+    assert [len(batch) for batch in backend.batches] == [2, 2, 1]
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+
+
+# Verifica que corran varios lotes a la vez, hasta el numero de workers.
+def test_concurrency_limits_batches_in_flight() -> None:
+    backend = _FakeBackend(delay=0.02)
+    engine = EmbeddingEngine(backend, max_batch_size=1, max_wait_ms=0, concurrency=2)
+
+    async def _scenario() -> None:
+        await engine.embed(["a", "b", "c", "d"])
+        await engine.stop()
+
+    asyncio.run(_scenario())
+
+    assert len(backend.batches) == 4
+    assert backend.max_in_flight == 2
+
+
+# Verifica que un fallo del modelo llegue a todos los llamadores del lote.
+def test_backend_errors_propagate_to_callers() -> None:
+    engine = EmbeddingEngine(_FakeBackend(fail=True), max_batch_size=8, max_wait_ms=5)
+
+    async def _scenario() -> None:
+        try:
+            await engine.embed(["a", "b"])
+        finally:
+            await engine.stop()
+
+    with pytest.raises(RuntimeError, match="modelo caido"):
+        asyncio.run(_scenario())
+
+
+# Verifica que stop() haga fallar los lotes en vuelo y lo que quedo en cola.
+def test_stop_fails_in_flight_and_queued_callers() -> None:
+    engine = EmbeddingEngine(
+        _FakeBackend(delay=10), max_batch_size=1, max_wait_ms=1, concurrency=1
+    )
+
+    async def _scenario() -> list[Any]:
+        callers = [
+            asyncio.create_task(engine.embed(["en vuelo"])),
+            asyncio.create_task(engine.embed(["en cola"])),
+        ]
+        await asyncio.sleep(0.05)
+        await engine.stop()
+        return await asyncio.wait_for(
+            asyncio.gather(*callers, return_exceptions=True), timeout=1
+        )
+
+    results = asyncio.run(_scenario())
+
+    assert len(results) == 2
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert all("detenido" in str(result) for result in results)
+
+
+class _BrokenPool(ThreadPoolExecutor):
+    # Como un ProcessPoolExecutor tras morir un worker
+    def submit(self, *_: Any, **__: Any) -> Any:
+        raise BrokenProcessPool("worker muerto")
+
+
+class _FakeEmbeddings:
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[float(len(text))] for text in texts]
+
+
+# Verifica que un pool de procesos roto se recree en lugar de fallar para siempre.
+def test_broken_process_pool_is_recreated(monkeypatch: pytest.MonkeyPatch) -> None:
+    pools: list[ThreadPoolExecutor] = [_BrokenPool(), ThreadPoolExecutor()]
+
+    def _next_pool(_: ProcessPoolBackend) -> ThreadPoolExecutor:
+        return pools.pop(0)
+
+    monkeypatch.setattr(ProcessPoolBackend, "_new_pool", _next_pool)
+    # El pool de reemplazo corre en hilos: comparte el modelo del modulo
+    monkeypatch.setattr(embedding_engine, "_worker_embeddings", _FakeEmbeddings())
+    backend = ProcessPoolBackend("modelo", workers=1)
+
+    async def _scenario() -> list[list[float]]:
+        with pytest.raises(BrokenProcessPool):
+            await backend.embed(["a"])
+        return await backend.embed(["bbb"])
+
+    assert asyncio.run(_scenario()) == [[3.0]]
+    assert pools == []
+    backend.close()
@@ -0,0 +1,135 @@
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, cast
+
+import pytest
+
+from app.schemas.knowledge import IngestionJobStatus
+from app.services.pdf_parser import PDFSource
+
+
+def _load_jobs_module(monkeypatch: pytest.MonkeyPatch):
+    # El pipeline importa llm_service (carga modelos): lo reemplazamos
+    llm_stub = ModuleType("app.services.llm_service")
+    cast(Any, llm_stub).llm_service = object()
+    monkeypatch.setitem(sys.modules, "app.services.llm_service", llm_stub)
+    sys.modules.pop("app.services.ingestion_pipeline", None)
+    sys.modules.pop("app.services.ingestion_jobs", None)
+    return importlib.import_module("app.services.ingestion_jobs")
+
+
+def _staged_pdf(tmp_path: Path, name: str) -> PDFSource:
+    pdf_path = tmp_path / name
+    pdf_path.write_bytes(b"%PDF-1.4")
+    return PDFSource(path=str(pdf_path))
+
+
+# Verifica que el trabajo reporte progreso y termine como completado.
+def test_job_reports_progress_and_completes(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    module = _load_jobs_module(monkeypatch)
+
+    async def _runner(source: PDFSource, filename: str, stats: Any) -> None:
+        stats.pages_parsed = 3
+        stats.chunks_embedded = 7
+        stats.chunks_stored = 7
+
+    async def _scenario() -> Any:
+        manager = module.IngestionJobManager(
+            max_workers=1, max_queued=2, history_size=10, runner=_runner
+        )
+        job = manager.submit(_staged_pdf(tmp_path, "guia.pdf"), "guia.pdf")
+        assert job.status == IngestionJobStatus.QUEUED
+        await manager._queue.join()  # type: ignore
+        await manager.stop()
+        return manager.get(job.job_id)
+
+    job = asyncio.run(_scenario())
+
+    read = job.to_read()
+    assert read.status == IngestionJobStatus.COMPLETED
+    assert read.pages_parsed == 3
+    assert read.chunks_stored == 7
+    assert read.finished_at is not None
+    assert not Path(str(job.source.path)).exists()
+
+
+# Verifica que un fallo quede registrado en el trabajo con su error.
+def test_job_records_failure(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    module = _load_jobs_module(monkeypatch)
+
+    async def _runner(source: PDFSource, filename: str, stats: Any) -> None:
+        raise RuntimeError("PDF corrupto")
+
+    async def _scenario() -> Any:
+        manager = module.IngestionJobManager(
+            max_workers=1, max_queued=2, history_size=10, runner=_runner
+        )
+        job = manager.submit(_staged_pdf(tmp_path, "roto.pdf"), "roto.pdf")
+        await manager._queue.join()  # type: ignore
+        await manager.stop()
+        return job
+
+    job = asyncio.run(_scenario())
+
+    assert job.status == IngestionJobStatus.FAILED
+    assert job.error == "PDF corrupto"
+
+
+# Verifica que la cola acotada rechace trabajos cuando esta llena.
+def test_submit_rejects_when_queue_is_full(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    module = _load_jobs_module(monkeypatch)
+    release = asyncio.Event()
+
+    async def _runner(source: PDFSource, filename: str, stats: Any) -> None:
+        await release.wait()
+
+    async def _scenario() -> None:
+        manager = module.IngestionJobManager(
+            max_workers=1, max_queued=1, history_size=10, runner=_runner
+        )
+        manager.submit(_staged_pdf(tmp_path, "a.pdf"), "a.pdf")
+        await asyncio.sleep(0)  # el worker toma el primero
+        manager.submit(_staged_pdf(tmp_path, "b.pdf"), "b.pdf")
+
+        with pytest.raises(module.IngestionQueueFullError):
+            manager.submit(_staged_pdf(tmp_path, "c.pdf"), "c.pdf")
+
+        release.set()
+        await manager._queue.join()  # type: ignore
+        await manager.stop()
+
+    asyncio.run(_scenario())
+
+
+# Verifica que al detener se cancelen los trabajos y se borren sus temporales.
+def test_stop_cancels_running_and_queued_jobs(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    module = _load_jobs_module(monkeypatch)
+
+    async def _runner(source: PDFSource, filename: str, stats: Any) -> None:
+        await asyncio.Event().wait()
+
+    async def _scenario() -> tuple[Any, Any]:
+        manager = module.IngestionJobManager(
+            max_workers=1, max_queued=2, history_size=10, runner=_runner
+        )
+        running = manager.submit(_staged_pdf(tmp_path, "a.pdf"), "a.pdf")
+        await asyncio.sleep(0)  # el worker toma el primero
+        queued = manager.submit(_staged_pdf(tmp_path, "b.pdf"), "b.pdf")
+        await manager.stop()
+        return running, queued
+
+    running, queued = asyncio.run(_scenario())
+
+    for job in (running, queued):
+        assert job.status == IngestionJobStatus.CANCELLED
+        assert job.finished_at is not None
+        assert not Path(str(job.source.path)).exists()
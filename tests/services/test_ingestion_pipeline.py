@@ -0,0 +1,156 @@
+import asyncio
+import importlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, cast
+
+import pymupdf  # type: ignore
+import pytest
+
+from app.services import pdf_parser
+
+
+class _StubLLMService:
+    def __init__(self) -> None:
+        self.calls: list[int] = []
+
+    async def embed_passages(
+        self, texts: list[str], batch_size: int | None = None
+    ) -> list[list[float]]:
+        self.calls.append(len(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class _StubSession:
+    def __init__(self) -> None:
+        self.pending: list[Any] = []
+        self.committed_batches: list[list[Any]] = []
+
+    def add_all(self, rows: list[Any]) -> None:
+        self.pending.extend(rows)
+
+    async def commit(self) -> None:
+        self.committed_batches.append(self.pending)
+        self.pending = []
+
+
+async def _fake_copy(session: _StubSession, rows: list[Any]) -> int:
+    session.add_all(rows)
+    return len(rows)
+
+
+def _fake_parse_page_range(
+    source: Any, start: int, stop: int, chunk_size: int, chunk_overlap: int
+) -> tuple[int, list[tuple[int, str]]]:
+    chunks = [(page, f"Contenido de la pagina {page}") for page in range(start, stop)]
+    return stop - start, chunks
+
+
+def _load_pipeline_module(
+    monkeypatch: pytest.MonkeyPatch, llm: _StubLLMService, total_pages: int = 5
+):
+    llm_stub = ModuleType("app.services.llm_service")
+    cast(Any, llm_stub).llm_service = llm
+    monkeypatch.setitem(sys.modules, "app.services.llm_service", llm_stub)
+    sys.modules.pop("app.services.ingestion_pipeline", None)
+    module = importlib.import_module("app.services.ingestion_pipeline")
+
+    # Sin procesos ni PDF real: hilos y un parser falso
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(module, "get_process_pool", lambda: pool)
+
+    def _count_pages(source: Any) -> int:
+        return total_pages
+
+    monkeypatch.setattr(module, "count_pages", _count_pages)
+    monkeypatch.setattr(module, "parse_page_range", _fake_parse_page_range)
+    monkeypatch.setattr(module, "copy_knowledge_chunks", _fake_copy)
+    monkeypatch.setattr(module.settings, "RAG_PARSER_PAGES_PER_TASK", 2)
+    return module
+
+
+# Verifica que cada lote se embeba y se confirme por separado.
+def test_pipeline_commits_each_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    llm = _StubLLMService()
+    module = _load_pipeline_module(monkeypatch, llm)
+    session = _StubSession()
+
+    pipeline = module.PDFIngestionPipeline(
+        session, "guia.pdf", batch_size=2, queue_size=1
+    )
+    stats = asyncio.run(pipeline.run(pdf_parser.PDFSource(path="guia.pdf")))
+
+    assert stats.pages_parsed == 5
+    assert stats.chunks_embedded == 5
+    assert stats.chunks_stored == 5
+    assert llm.calls == [2, 2, 1]
+    assert [len(batch) for batch in session.committed_batches] == [2, 2, 1]
+    first = session.committed_batches[0][0]
+    assert first.title == "guia.pdf - Pag 1"
+    assert first.source == "guia.pdf"
+
+
+# Verifica que un fallo en embeddings corte el pipeline sin perder lo guardado.
+def test_pipeline_keeps_committed_batches_on_failure(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class _FailingLLMService(_StubLLMService):
+        async def embed_passages(
+            self, texts: list[str], batch_size: int | None = None
+        ) -> list[list[float]]:
+            if self.calls:
+                raise RuntimeError("embeddings caidos")
+            return await super().embed_passages(texts, batch_size)
+
+    module = _load_pipeline_module(monkeypatch, _FailingLLMService(), total_pages=6)
+    session = _StubSession()
+
+    pipeline = module.PDFIngestionPipeline(
+        session, "guia.pdf", batch_size=2, queue_size=1
+    )
+    with pytest.raises(RuntimeError, match="embeddings caidos"):
+        asyncio.run(pipeline.run(pdf_parser.PDFSource(path="guia.pdf")))
+
+    assert [len(batch) for batch in session.committed_batches] == [2]
+
+
+def _build_pdf(pages: int) -> bytes:
+    doc = pymupdf.open()  # type: ignore
+    for i in range(pages):
+        page = doc.new_page()  # type: ignore
+        page.insert_text((72, 72), f"Pagina numero {i}")  # type: ignore
+    data: bytes = doc.tobytes()  # type: ignore
+    doc.close()  # type: ignore
+    return data
+
+
+# Verifica que el parser trocee solo el rango pedido desde un archivo (mmap).
+def test_parse_page_range_only_reads_requested_pages(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "guia.pdf"
+    pdf_path.write_bytes(_build_pdf(4))
+    source = pdf_parser.PDFSource(path=str(pdf_path))
+
+    assert pdf_parser.count_pages(source) == 4
+
+    pages, chunks = pdf_parser.parse_page_range(
+        source, 1, 3, chunk_size=200, chunk_overlap=0
+    )
+
+    assert pages == 2
+    assert [page for page, _ in chunks] == [1, 2]
+    assert "Pagina numero 1" in chunks[0][1]
+
+
+# Verifica que un PDF en memoria se lea completo sin pasar por disco.
+def test_parse_page_range_reads_in_memory_source_to_the_end() -> None:
+    source = pdf_parser.PDFSource(data=_build_pdf(3))
+
+    pages, chunks = pdf_parser.parse_page_range(
+        source, 0, None, chunk_size=200, chunk_overlap=0
+    )
+
+    assert source.in_memory
+    assert pages == 3
+    assert [page for page, _ in chunks] == [0, 1, 2]
@@ -0,0 +1,45 @@
+import asyncio
+import importlib
+import io
+import os
+import sys
+from types import ModuleType
+from typing import Any, cast
+
+import pytest
+from fastapi import UploadFile
+
+
+def _load_module(monkeypatch: pytest.MonkeyPatch):
+    # FlashRank no hace falta para preparar uploads
+    flashrank_stub = ModuleType("flashrank")
+    cast(Any, flashrank_stub).Ranker = object
+    cast(Any, flashrank_stub).RerankRequest = object
+    monkeypatch.setitem(sys.modules, "flashrank", flashrank_stub)
+    monkeypatch.delitem(sys.modules, "app.services.reranker_service", raising=False)
+    monkeypatch.delitem(sys.modules, "app.services.knowledge_service", raising=False)
+    return importlib.import_module("app.services.knowledge_service")
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=len(data), filename="guia.pdf")
+
+
+# Verifica que los uploads chicos queden en memoria y los grandes en RAG_TEMP_DIR.
+def test_stage_upload_keeps_small_pdfs_in_memory(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+) -> None:
+    module = _load_module(monkeypatch)
+    monkeypatch.setattr(module.settings, "RAG_PDF_IN_MEMORY_MAX_BYTES", 10)
+    monkeypatch.setattr(module.settings, "RAG_TEMP_DIR", str(tmp_path))
+    service = module.knowledge_service
+
+    small = asyncio.run(service.stage_upload(_upload(b"%PDF-chico")))
+    large = asyncio.run(service.stage_upload(_upload(b"%PDF-" + b"x" * 20)))
+
+    assert small.data == b"%PDF-chico" and small.path is None
+    assert large.data is None and large.path is not None
+    assert os.path.dirname(large.path) == str(tmp_path)
+    assert large.path.endswith(".pdf")
+    with open(large.path, "rb") as handle:
+        assert handle.read() == b"%PDF-" + b"x" * 20
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_engine import embedding_model_tag
+from app.services.onnx_embeddings import (
+    cosine_agreement,
+    mean_pool,
+    summarize_latencies,
+)
+
+
+# Verifica que el pooling promedie solo los tokens reales y normalice.
+def test_mean_pool_ignores_padding_and_normalizes() -> None:
+    hidden = np.array(
+        [
+            [[3.0, 0.0], [1.0, 0.0], [100.0, 100.0]],
+            [[0.0, 2.0], [0.0, 4.0], [0.0, 6.0]],
+        ],
+        dtype=np.float32,
+    )
+    mask = np.array([[1, 1, 0], [1, 1, 1]], dtype=np.int64)
+
+    pooled = mean_pool(hidden, mask)
+
+    np.testing.assert_allclose(pooled, [[1.0, 0.0], [0.0, 1.0]])
+
+
+# Verifica el reporte de paridad coseno entre dos backends.
+def test_cosine_agreement_reports_min_and_mean() -> None:
+    reference = [[1.0, 0.0], [0.0, 1.0]]
+    candidate = [[2.0, 0.0], [1.0, 1.0]]
+
+    report = cosine_agreement(reference, candidate)
+
+    assert report.texts == 2
+    assert math.isclose(report.min_cosine, 1 / np.sqrt(2), rel_tol=1e-6)
+    assert math.isclose(report.mean_cosine, (1 + 1 / np.sqrt(2)) / 2, rel_tol=1e-6)
+
+
+# Verifica percentiles y throughput del benchmark.
+def test_summarize_latencies() -> None:
+    report = summarize_latencies("onnx-int8", 8, [0.01, 0.02, 0.03, 0.04, 0.1])
+
+    assert math.isclose(report.p50_ms, 30.0)
+    assert report.p95_ms > report.p50_ms
+    assert math.isclose(report.texts_per_second, 8 / 0.04)
+
+
+# Verifica que el id del cache distinga los vectores de cada backend.
+def test_embedding_model_tag_includes_onnx_backend(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "torch")
+    assert embedding_model_tag() == settings.EMBEDDING_MODEL_ID
+
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(settings, "EMBEDDING_ONNX_QUANTIZE", True)
+    assert embedding_model_tag() == f"{settings.EMBEDDING_MODEL_ID}@onnx-int8"
+
+    monkeypatch.setattr(settings, "EMBEDDING_ONNX_QUANTIZE", False)
+    assert embedding_model_tag() == f"{settings.EMBEDDING_MODEL_ID}@onnx-fp32"
@@ -0,0 +1,23 @@
+from app.models.knowledge import KnowledgeBase
+from app.services.rank_fusion import reciprocal_rank_fusion
+
+
+def _doc(doc_id: int) -> KnowledgeBase:
+    return KnowledgeBase(id=doc_id, title=f"doc {doc_id}", content="texto")
+
+
+# Verifica que un documento presente en ambos rankings quede primero.
+def test_rrf_promotes_documents_found_by_both_retrievers() -> None:
+    vector_ranking = [_doc(1), _doc(2), _doc(3)]
+    lexical_ranking = [_doc(4), _doc(3)]
+
+    fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], rrf_k=60)
+
+    assert [doc.id for doc in fused] == [3, 1, 4, 2]
+
+
+# Verifica que la fusion no duplique documentos y tolere rankings vacios.
+def test_rrf_deduplicates_and_handles_empty_lists() -> None:
+    fused = reciprocal_rank_fusion([[_doc(1), _doc(2)], [], [_doc(2)]], rrf_k=60)
+
+    assert [doc.id for doc in fused] == [2, 1]
@@ -0,0 +1,211 @@
+import asyncio
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, cast
+
+import pytest
+
+from app.core import observability
+
+if TYPE_CHECKING:
+    # Solo para tipar: el modulo real se importa con FlashRank simulado
+    from app.services.reranker_service import RerankerService
+
+
+class _FakeRanker:
+    # Ranker.rerank de FlashRank: puntua (largo del texto) y ordena
+    def __init__(self, **_: Any) -> None:
+        self.threads: list[str] = []
+        self.queries: list[str] = []
+
+    def rerank(self, request: Any) -> list[dict[str, Any]]:
+        self.threads.append(threading.current_thread().name)
+        self.queries.append(request.query)
+        ranked = [{**p, "score": float(len(p["text"]))} for p in request.passages]
+        return sorted(ranked, key=lambda p: p["score"], reverse=True)
+
+
+class _FakeRerankRequest:
+    def __init__(self, query: str, passages: list[dict[str, Any]]) -> None:
+        self.query = query
+        self.passages = passages
+
+
+def _load_module(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    flashrank_stub = ModuleType("flashrank")
+    cast(Any, flashrank_stub).Ranker = _FakeRanker
+    cast(Any, flashrank_stub).RerankRequest = _FakeRerankRequest
+    monkeypatch.setitem(sys.modules, "flashrank", flashrank_stub)
+    sys.modules.pop("app.services.reranker_service", None)
+    return importlib.import_module("app.services.reranker_service")
+
+
+def _passages(*texts: str) -> list[dict[str, Any]]:
+    return [{"id": str(i), "text": text, "meta": {}} for i, text in enumerate(texts)]
+
+
+# Verifica que busquedas concurrentes se junten en un lote, fuera del event loop.
+def test_concurrent_requests_share_one_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    module = _load_module(monkeypatch)
+    observability.reset_counters()
+    ranker = _FakeRanker()
+    service: RerankerService = module.RerankerService(
+        ranker, batch_window_ms=50, max_batch_requests=8, max_batch_pairs=64
+    )
+
+    async def _scenario() -> list[list[dict[str, Any]]]:
+        results = await asyncio.gather(
+            service.rerank("q1", _passages("a", "ccc", "bb")),
+            service.rerank("q2", _passages("dddd", "e")),
+        )
+        await service.stop()
+        return list(results)
+
+    first, second = asyncio.run(_scenario())
+    service.shutdown()
+
+    assert [p["text"] for p in first] == ["ccc", "bb", "a"]
+    assert [p["text"] for p in second] == ["dddd", "e"]
+    # Un Ranker.rerank por peticion, ambos en el mismo paso por el pool
+    assert ranker.queries == ["q1", "q2"]
+    assert len(set(ranker.threads)) == 1
+    assert all(name.startswith("reranker") for name in ranker.threads)
+    summary = observability.get_histogram_summary(observability.RERANK_BATCH_REQUESTS)
+    assert summary["count"] == 1
+    assert summary["max"] == 2
+    pairs = observability.get_histogram_summary(observability.RERANK_BATCH_PAIRS)
+    assert pairs["max"] == 5
+
+
+# Verifica que con varios workers los lotes corran en paralelo.
+def test_workers_run_batches_in_parallel(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = _load_module(monkeypatch)
+    # Cada lote espera al otro: con un solo hilo la barrera se rompe
+    barrier = threading.Barrier(2, timeout=5)
+
+    class _BlockingRanker(_FakeRanker):
+        def rerank(self, request: Any) -> list[dict[str, Any]]:
+            barrier.wait()
+            return super().rerank(request)
+
+    service: RerankerService = module.RerankerService(
+        _BlockingRanker(),
+        batch_window_ms=1,
+        max_batch_requests=1,
+        max_batch_pairs=64,
+        workers=2,
+    )
+
+    async def _scenario() -> list[list[dict[str, Any]]]:
+        results = await asyncio.gather(
+            service.rerank("q1", _passages("a")),
+            service.rerank("q2", _passages("b")),
+        )
+        await service.stop()
+        return list(results)
+
+    first, second = asyncio.run(_scenario())
+    service.shutdown()
+
+    assert [p["text"] for p in first] == ["a"]
+    assert [p["text"] for p in second] == ["b"]
+
+
+# Verifica que cada peticion se resuelva sin esperar al resto de su lote.
+def test_each_request_resolves_before_the_rest_of_its_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    module = _load_module(monkeypatch)
+    observability.reset_counters()
+    gate = threading.Event()
+
+    class _GatedRanker(_FakeRanker):
+        def rerank(self, request: Any) -> list[dict[str, Any]]:
+            if request.query == "q2":
+                gate.wait(timeout=5)
+            return super().rerank(request)
+
+    service: RerankerService = module.RerankerService(
+        _GatedRanker(), batch_window_ms=50, max_batch_requests=8, max_batch_pairs=64
+    )
+
+    async def _scenario() -> tuple[list[dict[str, Any]], bool]:
+        first = asyncio.create_task(service.rerank("q1", _passages("a")))
+        second = asyncio.create_task(service.rerank("q2", _passages("b")))
+        result: list[dict[str, Any]] = await asyncio.wait_for(first, timeout=2)
+        second_pending = not second.done()
+        gate.set()
+        await second
+        await service.stop()
+        return result, second_pending
+
+    first, second_pending = asyncio.run(_scenario())
+    service.shutdown()
+
+    assert [p["text"] for p in first] == ["a"]
+    assert second_pending
+    summary = observability.get_histogram_summary(observability.RERANK_BATCH_REQUESTS)
+    assert summary["count"] == 1
+
+
+# Verifica que un error de inferencia llegue a todas las peticiones del lote.
+def test_batch_errors_propagate_to_callers(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = _load_module(monkeypatch)
+    ranker = _FakeRanker()
+
+    def _broken_rerank(*_: Any) -> list[Any]:
+        raise RuntimeError("onnx caido")
+
+    monkeypatch.setattr(ranker, "rerank", _broken_rerank)
+    service: RerankerService = module.RerankerService(
+        ranker, batch_window_ms=1, max_batch_requests=4, max_batch_pairs=64
+    )
+
+    async def _scenario() -> None:
+        try:
+            await service.rerank("q", _passages("a"))
+        finally:
+            await service.stop()
+
+    with pytest.raises(RuntimeError, match="onnx caido"):
+        asyncio.run(_scenario())
+    service.shutdown()
+
+
+# Verifica que stop() haga fallar el lote en vuelo y lo que quedo en cola.
+def test_stop_fails_in_flight_and_queued_callers(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    module = _load_module(monkeypatch)
+    release = threading.Event()
+
+    class _SlowRanker(_FakeRanker):
+        def rerank(self, request: Any) -> list[dict[str, Any]]:
+            release.wait(timeout=5)
+            return super().rerank(request)
+
+    service: RerankerService = module.RerankerService(
+        _SlowRanker(), batch_window_ms=1, max_batch_requests=1, max_batch_pairs=64
+    )
+
+    async def _scenario() -> list[Any]:
+        callers = [
+            asyncio.create_task(service.rerank("en vuelo", _passages("a"))),
+            asyncio.create_task(service.rerank("en cola", _passages("b"))),
+        ]
+        await asyncio.sleep(0.05)
+        await service.stop()
+        return await asyncio.wait_for(
+            asyncio.gather(*callers, return_exceptions=True), timeout=1
+        )
+
+    results = asyncio.run(_scenario())
+    release.set()
+    service.shutdown()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert all("detenido" in str(result) for result in results)
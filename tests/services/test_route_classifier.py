@@ -0,0 +1,51 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+
+from app.services.route_classifier import RouteClassifier
+
+
+def _vector(index: int) -> list[float]:
+    vector = [0.0, 0.0, 0.0]
+    vector[index] = 1.0
+    return vector
+
+
+# Verifica que no prediga hasta tener ejemplos suficientes por etiqueta.
+def test_classifier_waits_for_min_examples() -> None:
+    async def _embed(_: str) -> list[float]:
+        return _vector(0)
+
+    classifier = RouteClassifier(min_examples=2, embedder=_embed)
+    asyncio.run(classifier.learn("a", "DATA_AGENT"))
+    asyncio.run(classifier.learn("b", "DATA_AGENT"))
+    classifier.learn_vector(np.array(_vector(1)), "DOCS_AGENT")
+
+    assert not classifier.is_ready
+    assert asyncio.run(classifier.predict("a")) is None
+
+    classifier.learn_vector(np.array(_vector(1)), "DOCS_AGENT")
+    prediction = asyncio.run(classifier.predict("a"))
+
+    assert prediction is not None
+    assert prediction.label == "DATA_AGENT"
+    assert prediction.confidence > 0.99
+
+
+# Verifica la persistencia y que otro modelo de embeddings descarte el archivo.
+def test_classifier_persists_and_checks_model_tag(tmp_path: Path) -> None:
+    path = str(tmp_path / "routes.json")
+    classifier = RouteClassifier(min_examples=1, path=path, model_tag="e5")
+    classifier.learn_vector(np.array(_vector(0)), "DATA_AGENT")
+    classifier.learn_vector(np.array(_vector(2)), "FINISH")
+    classifier.save()
+
+    reloaded = RouteClassifier(min_examples=1, path=path, model_tag="e5")
+    other_model = RouteClassifier(min_examples=1, path=path, model_tag="otro")
+
+    assert reloaded.counts() == {"DATA_AGENT": 1, "FINISH": 1}
+    assert reloaded.predict_vector(np.array(_vector(2))).label == "FINISH"
+    assert other_model.counts() == {}
+    # El temporal de la escritura atomica no queda en el directorio
+    assert [p.name for p in tmp_path.iterdir()] == ["routes.json"]
@@ -0,0 +1,98 @@
+import asyncio
+import math
+
+from app.core import corpus, observability
+from app.services.semantic_cache import SemanticCache, has_patient_context
+
+_VECTORS = {
+    "criterios diagnosticos de diabetes": [1.0, 0.0, 0.0],
+    "como se diagnostica la diabetes": [0.99, 0.05, 0.0],
+    "tratamiento de la hipertension": [0.0, 1.0, 0.0],
+}
+
+
+class _FakeEmbedder:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def __call__(self, text: str) -> list[float]:
+        self.calls.append(text)
+        return _VECTORS[text]
+
+
+def _build_cache(embedder: _FakeEmbedder, ttl_seconds: float = 60) -> SemanticCache:
+    return SemanticCache(
+        namespace="test",
+        threshold=0.95,
+        ttl_seconds=ttl_seconds,
+        max_items=10,
+        embedder=embedder,
+    )
+
+
+# Verifica que una pregunta casi identica reutilice la respuesta guardada.
+def test_similar_question_hits_cache() -> None:
+    observability.reset_counters()
+    cache = _build_cache(_FakeEmbedder())
+
+    async def _scenario() -> tuple[object, object]:
+        first = await cache.lookup("criterios diagnosticos de diabetes")
+        cache.store(first, {"answer": "HbA1c >= 6.5%"}, latency_seconds=4.0)
+        similar = await cache.lookup("como se diagnostica la diabetes")
+        other = await cache.lookup("tratamiento de la hipertension")
+        return similar.value, other.value
+
+    similar_value, other_value = asyncio.run(_scenario())
+
+    assert similar_value == {"answer": "HbA1c >= 6.5%"}
+    assert other_value is None
+    assert observability.get_counter_value(observability.SEMANTIC_CACHE_HITS_TOTAL) == 1
+    assert math.isclose(
+        observability.get_gauge_value(observability.SEMANTIC_CACHE_HIT_RATE), 1 / 3
+    )
+    saved = observability.get_histogram_summary(
+        observability.SEMANTIC_CACHE_LATENCY_SAVED_SECONDS
+    )
+    assert saved["sum"] == 4.0
+
+
+# Verifica que la ingesta de documentos (nueva generacion) vacie el cache.
+def test_corpus_generation_change_invalidates_entries() -> None:
+    cache = _build_cache(_FakeEmbedder())
+
+    async def _scenario() -> object:
+        lookup = await cache.lookup("criterios diagnosticos de diabetes")
+        cache.store(lookup, {"answer": "vieja"}, latency_seconds=1.0)
+        corpus.bump_corpus_generation()
+        return (await cache.lookup("criterios diagnosticos de diabetes")).value
+
+    assert asyncio.run(_scenario()) is None
+    assert len(cache) == 0
+
+
+# Verifica que las entradas expiren segun el TTL.
+def test_expired_entries_are_ignored() -> None:
+    cache = _build_cache(_FakeEmbedder(), ttl_seconds=0)
+
+    async def _scenario() -> object:
+        lookup = await cache.lookup("criterios diagnosticos de diabetes")
+        cache.store(lookup, {"answer": "expirada"}, latency_seconds=1.0)
+        return (await cache.lookup("criterios diagnosticos de diabetes")).value
+
+    assert asyncio.run(_scenario()) is None
+
+
+# Verifica que preguntas con contexto de paciente no usen el cache (ni el embedder).
+def test_patient_context_bypasses_cache() -> None:
+    embedder = _FakeEmbedder()
+    cache = _build_cache(embedder)
+
+    lookup = asyncio.run(cache.lookup("Historial del paciente 42"))
+    cache.store(lookup, {"answer": "datos privados"}, latency_seconds=1.0)
+
+    assert embedder.calls == []
+    assert len(cache) == 0
+    assert has_patient_context("Historial de Maria Lopez")
+    assert not has_patient_context("criterios diagnosticos de diabetes")
+    # Cifras clinicas sin paciente concreto si pueden reutilizarse
+    assert not has_patient_context("Es normal una glucosa en ayunas de 115?")
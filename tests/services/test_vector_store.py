@@ -0,0 +1,157 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import pytest
+
+from app.core import corpus
+from app.services.vector_store import NumpyVectorStore
+
+
+def _rows(vectors: np.ndarray, first_id: int = 1, version: int = 1) -> list[Any]:
+    return [
+        SimpleNamespace(
+            id=first_id + i,
+            title=f"doc {first_id + i}",
+            content="texto",
+            source="guia.pdf",
+            created_at=None,
+            embedding=vector.tolist(),
+            row_version=version,
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def _synced_store(store: NumpyVectorStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Sin Postgres: el refresco no trae filas nuevas
+    async def _noop_refresh(_: Any) -> None:
+        return None
+
+    monkeypatch.setattr(store, "refresh", _noop_refresh)
+
+
+# Verifica que el top-k coincida con la busqueda exacta por fuerza bruta.
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_search_matches_brute_force(
+    dtype: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    store = NumpyVectorStore(
+        dtype=dtype,  # type: ignore
+        path=str(tmp_path / "vectors.bin"),
+        dimensions=16,
+    )
+    _synced_store(store, monkeypatch)
+    store.add(_rows(vectors))
+    query = rng.normal(size=16).astype(np.float32)
+
+    docs = asyncio.run(store.search(None, [query.tolist()], limit=5))  # type: ignore
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5] + 1
+    assert [doc.id for doc in docs] == expected.tolist()
+    assert all(doc.embedding is None for doc in docs)
+    store.close()
+
+
+# Verifica que varias queries se fusionen sin duplicados (mejor distancia gana).
+def test_multi_query_results_are_deduplicated(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = NumpyVectorStore(dimensions=2)
+    _synced_store(store, monkeypatch)
+    store.add(_rows(np.array([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]])))
+
+    docs = asyncio.run(
+        store.search(None, [[1.0, 0.0], [0.0, 1.0]], limit=2)  # type: ignore
+    )
+
+    assert len(docs) == 3
+    assert {doc.id for doc in docs} == {1, 2, 3}
+    assert docs[-1].id == 3
+
+
+# Verifica que la matriz memory-mapped crezca conservando las filas previas.
+def test_memmap_grows_incrementally(tmp_path: Path) -> None:
+    path = tmp_path / "vectors.bin"
+    store = NumpyVectorStore(path=str(path), dimensions=4)
+
+    store.add(_rows(np.eye(4, dtype=np.float32)))
+    store.add(_rows(np.ones((2000, 4), dtype=np.float32), first_id=5))
+
+    assert len(store) == 2004
+    assert path.stat().st_size >= 2004 * 4 * 4
+    scores = asyncio.run(asyncio.to_thread(store._top_k, np.eye(4)[:1], 1))  # type: ignore
+    assert scores[0][0] == 1
+    store.close()
+    assert not path.exists()
+
+
+class _FakeResult:
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+    def all(self) -> list[Any]:
+        return self._value
+
+    def one(self) -> Any:
+        return self._value
+
+
+class _FakeDatabase:
+    # Tabla en memoria que responde las consultas del refresco (conteo + filas)
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+        self.queries: list[str] = []
+
+    async def connection(self) -> "_FakeDatabase":
+        return self
+
+    async def execute(self, statement: Any) -> _FakeResult:
+        sql = str(statement)
+        params = statement.compile().params
+        self.queries.append(sql)
+        if "count(" in sql:
+            loaded = [row for row in self.rows if row.id <= params["id_1"]]
+            return _FakeResult((len(loaded), sum(row.row_version for row in loaded)))
+        newer = [row for row in self.rows if row.id > params["id_1"]]
+        return _FakeResult(newer[: params["param_1"]])
+
+
+# Verifica que un cambio de generacion del corpus dispare el refresco.
+def test_search_refreshes_when_corpus_changes() -> None:
+    store = NumpyVectorStore(dimensions=2, sync_seconds=3600)
+    database = _FakeDatabase([])
+    asyncio.run(store.refresh(database))  # type: ignore
+
+    database.rows = _rows(np.array([[1.0, 0.0]]))
+    corpus.bump_corpus_generation()
+    docs = asyncio.run(store.search(database, [[1.0, 0.0]], limit=1))  # type: ignore
+
+    assert [doc.id for doc in docs] == [1]
+    # Sin cambios locales ni intervalo cumplido no se vuelve a consultar la BD
+    queries = len(database.queries)
+    asyncio.run(store.search(database, [[1.0, 0.0]], limit=1))  # type: ignore
+    assert len(database.queries) == queries
+
+
+# Verifica que borrados y updates (de cualquier proceso) reconstruyan la matriz.
+def test_deleted_and_updated_rows_trigger_a_rebuild(tmp_path: Path) -> None:
+    store = NumpyVectorStore(
+        dimensions=2, path=str(tmp_path / "vectors.bin"), sync_seconds=0
+    )
+    database = _FakeDatabase(_rows(np.array([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]])))
+    asyncio.run(store.refresh(database))  # type: ignore
+    assert len(store) == 3
+
+    # Otro worker borra el doc 1 y actualiza el doc 2 (nueva version de la fila)
+    updated = _rows(np.array([[1.0, 0.0]]), first_id=2, version=9)
+    database.rows = updated + database.rows[2:]
+    docs = asyncio.run(store.search(database, [[1.0, 0.0]], limit=3))  # type: ignore
+
+    assert len(store) == 2
+    assert [doc.id for doc in docs] == [2, 3]
+    assert [path.name for path in tmp_path.iterdir()] == ["vectors.bin"]
+    store.close()